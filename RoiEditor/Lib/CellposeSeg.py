@@ -0,0 +1,84 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+import os
+from typing import Iterable
+import numpy as np
+
+from .TinyLog import log
+
+# the arrays of the cellpose dict that NumpyToRoi uses
+SEG_KEYS: tuple[str, ...] = ("masks", "outlines")
+
+
+def sidecar_path(seg_path: str, key: str) -> str:
+    """ A_stitch_seg.npy -> A_stitch_seg.masks.npy
+        the name does not end in _seg.npy: the file choosers do not pick up the sidecars
+    """
+    base, _ = os.path.splitext(seg_path)
+    return f"{base}.{key}.npy"
+
+
+def load_seg(seg_path: str, keys: Iterable[str] = SEG_KEYS, use_sidecars: bool = True) -> dict[str, np.ndarray]:
+    """ loads only the given arrays of a cellpose _seg.npy file
+        the _seg.npy file is a pickled dict that also holds the flows and probabilities: it can only be read as a whole
+        -the first open unpickles the dict once and saves every requested array in a plain .npy sidecar
+        -later opens memory-map the sidecars: nothing is copied until a page is used
+        a sidecar older than the _seg.npy file (e.g. cellpose ran again) is rewritten
+        the memory-mapped arrays are read-only
+    """
+    keys = tuple(keys)
+    if use_sidecars:
+        data = _load_sidecars(seg_path, keys)
+        if data is not None:
+            return data
+
+    cellpose_dict = np.load(seg_path, allow_pickle=True).item()
+    data = {key: cellpose_dict[key] for key in keys}
+    # the flows and probabilities go as soon as possible
+    del cellpose_dict
+
+    if use_sidecars and _save_sidecars(seg_path, data):
+        # from now on the sidecars are used, also in this session
+        data = _load_sidecars(seg_path, keys) or data
+    return data
+
+
+def _load_sidecars(seg_path: str, keys: tuple[str, ...]):
+    """the memory-mapped sidecars, None if one of them is missing or outdated"""
+    seg_time = os.stat(seg_path).st_mtime_ns
+    data = {}
+    for key in keys:
+        path = sidecar_path(seg_path, key)
+        try:
+            if os.stat(path).st_mtime_ns < seg_time:
+                return None
+            data[key] = np.load(path, mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+    return data
+
+
+def _save_sidecars(seg_path: str, data: dict[str, np.ndarray]) -> bool:
+    for key, array in data.items():
+        path = sidecar_path(seg_path, key)
+        tmp_path = path + ".tmp"
+        try:
+            # write and rename: a crash never leaves a half written sidecar behind
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.asarray(array), allow_pickle=False)
+            os.replace(tmp_path, path)
+        except (OSError, ValueError) as e:
+            log(f"no sidecar for {key} of {seg_path}: {e}", type="warning")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+    return True
@@ -33,6 +33,16 @@ gvars["show_overlay"]=True      # (do not) fill the ROIs with color
 
 gvars["save_rois_num_threads"] = 12
 gvars["read_parallel_num_threads"] = 2
+gvars["roi_zip_incremental_save"] = True  # saving the ROIs updates the zip in place: only changed entries and tags.json are written
+gvars["roi_zip_max_dead_fraction"] = 0.5  # incremental save: the zip is written in full when more than half of it is dead space
+gvars["measurement_num_threads"] = 12  # Feret and geometry of the ROIs
+gvars["label_to_roi_backend"] = "diff"  # ROIs of a label image: see LabelToRoiBackends, "exact", "tiled", "diff"
+gvars["npy_to_roi_backend"] = "outlines"  # ROIs of a cellpose _seg.npy: "outlines" or a backend for label images
+gvars["label_to_roi_num_threads"] = 8  # contours of the regions in LabelToRoi
+gvars["simplify_tolerance"] = 0.0  # Douglas-Peucker tolerance in pixels for new ROIs, 0: no simplification
+gvars["label_tile_size"] = 4096  # tiled LabelToRoi: tiles of 4096x4096 pixels
+gvars["label_tile_overlap"] = 256  # tiled LabelToRoi: a label that fits in the overlap is cut from its tile
+gvars["seg_npy_sidecars"] = True  # keep the masks and outlines of a cellpose _seg.npy in memory-mappable .npy files next to it
 gvars["remove_at_edge"] = True
 gvars["roi_minimum_size"] = 100
 gvars["remove_small"] = True
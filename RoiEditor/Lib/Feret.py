@@ -13,12 +13,14 @@ The algorithms are borrowed from the Fiji Java implementation
 
 """
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from math import atan2, pi
 import numpy.typing as npt
 import cv2
 from numba import njit
 
 from .TinyLog import log
+from .RoiGeometry import chunk_bounds
 feret_index ={
         "Feret": 0,
         "FeretAngle": 1,
@@ -33,77 +35,344 @@ feret_quantities = ["length","angle","angle","length","length","length",""]
 feret_units = ["px","deg","deg","px","px","px",""]
 feret_scalers = [1.0,1.0,1.0,1.0,1.0,1.0,1.0]
 
+# shape descriptors, computed in the same pass as the Feret values (definitions as in ImageJ)
+shape_index ={
+        "Perimeter": 0,
+        "Circularity": 1,
+        "Solidity": 2,
+        "ConvexArea": 3,
+        "Roundness": 4,
+        "Major": 5,
+        "Minor": 6,
+        "EllipseAngle": 7,
+        "AspectRatio": 8,
+    }
+shape_msmts = ["Perimeter", "Circularity", "Solidity", "ConvexArea", "Roundness", "Major", "Minor", "EllipseAngle", "AspectRatio"]
+shape_quantities = ["length","","","area","","length","length","angle",""]
+shape_units = ["px","","","px","","px","px","deg",""]
+shape_scalers = [1.0,1.0,1.0,1.0,1.0,1.0,1.0,1.0,1.0]
+
 def get_values(x_points:npt.NDArray[np.int_], y_points:npt.NDArray[np.int_]):
     assert len(x_points) == len(y_points), "size of x_points and y_points must be the same"
     assert len(x_points) > 2, "Too few points for Feret calculations"
 
-    x_points = np.array(x_points,dtype=np.float32)
-    y_points = np.array(y_points,dtype=np.float32)
-    points = np.stack((x_points, y_points), axis=1)
+    coords = np.column_stack((x_points, y_points))
+    return get_values_batch(coords, np.array([0, len(coords)]))[0]
 
-    hull_pts = cv2.convexHull(points).squeeze()
 
-    p1 = hull_pts
-    p2 = np.roll(hull_pts, -1, axis=0)
-    dxy = p2 - p1
-    dx, dy = dxy[:, 0], dxy[:, 1]
-    h = np.hypot(dx, dy)
-    sin_a = -dy / h
-    cos_a = dx / h
+@njit(nogil=True, cache=True)
+def _convex_hull(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+        indices of the convex hull (monotone chain, no collinear points), in the order cv2.convexHull returns them:
+        counter clockwise (x right, y up), rotated so that the indices increase or decrease monotonically
+        (always the case for a contour), else starting at the point with the largest (x, y)
+        a point that occurs more than once is represented by its first index
+    """
+    n = len(x)
+    keys = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        keys[i] = (np.int64(x[i]) << 32) + (np.int64(y[i]) + 2147483648)
+    order = np.argsort(keys, kind="mergesort")
 
-    RTs = np.stack([
-        np.stack([cos_a, sin_a], axis=1),
-        np.stack([-sin_a, cos_a], axis=1)
-    ], axis=2)  # vorm: (n, 2, 2)
+    # unique points, sorted on (x, y)
+    pts = np.empty(n, dtype=np.int64)
+    m = 0
+    for k in range(n):
+        i = order[k]
+        if not m or keys[i] != keys[pts[m - 1]]:
+            pts[m] = i
+            m += 1
 
-    rotated = np.array([hull_pts @ R.T for R in RTs], dtype=np.float32)
-    x_proj = rotated[:, :, 0]
-    y_proj = rotated[:, :, 1]
+    hull = np.empty(2 * m, dtype=np.int64)
+    h = 0
+    for direction in range(2):
+        start = h
+        for k in range(m):
+            i = pts[k] if direction == 0 else pts[m - 1 - k]
+            while h >= start + 2:
+                o, a = hull[h - 2], hull[h - 1]
+                cross = (np.int64(x[a]) - x[o]) * (np.int64(y[i]) - y[o]) - (np.int64(y[a]) - y[o]) * (np.int64(x[i]) - x[o])
+                if cross > 0:
+                    break
+                h -= 1
+            hull[h] = i
+            h += 1
+        h -= 1  # the last point of 1 chain is the first of the other
+    if m < 3:
+        h = m
+    hull = hull[:h]
 
-    lengths = x_proj.max(axis=1) - x_proj.min(axis=1)
-    widths = y_proj.max(axis=1) - y_proj.min(axis=1)
+    first = 0
+    descents = 0
+    for k in range(h):
+        if keys[hull[k]] > keys[hull[first]]:
+            first = k
+        if hull[(k + 1) % h] < hull[k]:
+            descents += 1
+    if h > 2 and descents <= 1:
+        first = np.argmin(hull)
+    elif h > 2 and descents >= h - 1:
+        first = np.argmax(hull)
+    result = np.empty(h, dtype=np.int64)
+    for k in range(h):
+        result[k] = hull[(first + k) % h]
+    return result
 
-    idx_max = np.argmax(lengths)
-    idx_min = np.argmin(widths)
 
-    max_diameter = lengths[idx_max]
-    min_width = widths[idx_min]
+@njit(nogil=True, cache=True)
+def _project(x, y, a, b):
+    # x*a + y*b rounded like numpy's float32 matmul (hull_pts @ R.T) does it: fma(y, b, float32(x*a))
+    return np.float32(np.float64(np.float32(x * a)) + np.float64(y) * np.float64(b))
 
-    # Herbereken Feret-puntparen
-    proj = x_proj[idx_max]
-    i_max = np.argmax(proj)
-    i_min = np.argmin(proj)
-    pt1 = hull_pts[i_max]
-    pt2 = hull_pts[i_min]
 
-    if (pt1[0] < pt2[0]) or (pt1[0] == pt2[0] and pt1[1] < pt2[1]):
-        feret = pt1
-        vec = pt2 - pt1
-    else:
-        feret = pt2
-        vec = pt1 - pt2
+# relative rounding error bound of the float32 projections, with a wide margin
+_PROJECTION_TOLERANCE = 2.0**-18
+
+
+@njit(nogil=True, cache=True)
+def _advance(xi, yi, p, u, v):
+    """moves hull point p forward as long as the exact projection x*u + y*v does not decrease"""
+    h = len(xi)
+    for _ in range(h):
+        q = (p + 1) % h
+        if xi[q] * u + yi[q] * v < xi[p] * u + yi[p] * v:
+            break
+        p = q
+    return p
+
+
+@njit(nogil=True, cache=True)
+def _float_extreme(xi, yi, hx, hy, p, u, v, a, b, tol, sign):
+    """
+        float32 max (sign 1) or min (sign -1) of the projections _project(hx, hy, a, b) over the hull
+        p has the exact extreme of sign*(x*u + y*v): because of rounding the float extreme can also be at
+        a neighbour of p, but only at one whose exact projection is within tol of the extreme
+    """
+    h = len(xi)
+    ref = sign * (xi[p] * u + yi[p] * v)
+    best = _project(hx[p], hy[p], a, b)
+    for step in (1, h - 1):
+        k = p
+        for _ in range(h - 1):
+            k = (k + step) % h
+            if ref - sign * (xi[k] * u + yi[k] * v) > tol:
+                break
+            value = _project(hx[k], hy[k], a, b)
+            if sign * value > sign * best:
+                best = value
+    return best
+
+
+@njit(nogil=True, cache=True)
+def _polygon_shape(x: np.ndarray, y: np.ndarray, hull: np.ndarray, out: np.ndarray):
+    """
+        perimeter, convex area, area and the central 2nd order moments (mu20, mu11, mu02) per unit of area
+        of the polygon (Green's theorem), relative to the first point: no loss of precision far from the origin
+    """
+    n = len(x)
+    perimeter = a2 = sx = sy = sxx = sxy = syy = 0.0
+    for i in range(n):
+        j = (i + 1) % n
+        ui, vi = np.float64(x[i] - x[0]), np.float64(y[i] - y[0])
+        uj, vj = np.float64(x[j] - x[0]), np.float64(y[j] - y[0])
+        perimeter += np.hypot(uj - ui, vj - vi)
+        cross = ui * vj - uj * vi
+        a2 += cross
+        sx += (ui + uj) * cross
+        sy += (vi + vj) * cross
+        sxx += (ui * ui + ui * uj + uj * uj) * cross
+        syy += (vi * vi + vi * vj + vj * vj) * cross
+        sxy += (ui * vj + 2.0 * ui * vi + 2.0 * uj * vj + uj * vi) * cross
+    convex2 = 0
+    h = len(hull)
+    for k in range(h):
+        i, j = hull[k], hull[(k + 1) % h]
+        convex2 += np.int64(x[i]) * y[j] - np.int64(x[j]) * y[i]
+    out[:] = 0
+    out[0] = perimeter
+    out[1] = abs(convex2) / 2.0
+    out[2] = abs(a2) / 2.0
+    if a2 != 0:
+        cx = sx / (3.0 * a2)
+        cy = sy / (3.0 * a2)
+        out[3] = sxx / (6.0 * a2) - cx * cx
+        out[4] = sxy / (12.0 * a2) - cx * cy
+        out[5] = syy / (6.0 * a2) - cy * cy
 
-    angle_of_max =np.degrees(np.arctan2(vec[1], vec[0]) ) % 180
-    if min_width >= 1:
-        feret_ratio = max_diameter/min_width
+
+@njit(nogil=True, cache=True)
+def _feret_kernel(coords: np.ndarray, offsets: np.ndarray, out: np.ndarray, shape_out: np.ndarray):
+    """
+        per ROI: max diameter, min width, Feret start point and the vector to the end point,
+        in shape_out the raw numbers for the shape descriptors, from the same hull (see _polygon_shape)
+        same float32 steps as the projection of the whole hull on every edge direction,
+        but with rotating calipers: per edge only the points around the 3 extremes are projected
+        -A: max along the edge, B: max along the inward normal, C: min along the edge
+        -the calipers move forward in exact integer arithmetic, the float32 extremes are then
+         searched around them
+    """
+    for r in range(len(offsets) - 1):
+        x = coords[offsets[r]:offsets[r + 1], 0]
+        y = coords[offsets[r]:offsets[r + 1], 1]
+        hull = _convex_hull(x, y)
+        h = len(hull)
+        _polygon_shape(x, y, hull, shape_out[r])
+        out[r, :] = 0
+        if h < 2:
+            continue
+        xi = np.empty(h, dtype=np.int64)
+        yi = np.empty(h, dtype=np.int64)
+        hx = np.empty(h, dtype=np.float32)
+        hy = np.empty(h, dtype=np.float32)
+        for k in range(h):
+            xi[k] = x[hull[k]]
+            yi[k] = y[hull[k]]
+            hx[k] = np.float32(xi[k])
+            hy[k] = np.float32(yi[k])
+        scale = np.abs(xi).max() + np.abs(yi).max() + 1.0
+
+        a = b = c = 0
+        if h > 2:
+            dx_i, dy_i = xi[1] - xi[0], yi[1] - yi[0]
+            a = _advance(xi, yi, 1, dx_i, dy_i)
+            b = _advance(xi, yi, a, -dy_i, dx_i)
+            c = _advance(xi, yi, b, -dx_i, -dy_i)
+
+        max_length = np.float32(-np.inf)
+        min_width = np.float32(np.inf)
+        best_cos = np.float32(0)
+        best_sin = np.float32(0)
+        for e in range(h):
+            q = (e + 1) % h
+            dx_i, dy_i = xi[q] - xi[e], yi[q] - yi[e]
+            dx = hx[q] - hx[e]
+            dy = hy[q] - hy[e]
+            length_e = np.float32(np.hypot(dx, dy))
+            sin_a = -dy / length_e
+            cos_a = dx / length_e
+            if h > 2:
+                a = _advance(xi, yi, a, dx_i, dy_i)
+                b = _advance(xi, yi, b, -dy_i, dx_i)
+                c = _advance(xi, yi, c, -dx_i, -dy_i)
+                # the exact projections are length_e times the normalized ones
+                tol = _PROJECTION_TOLERANCE * scale * np.hypot(np.float64(dx_i), np.float64(dy_i))
+            else:
+                tol = np.inf
+            x_max = _float_extreme(xi, yi, hx, hy, a, dx_i, dy_i, cos_a, -sin_a, tol, 1)
+            x_min = _float_extreme(xi, yi, hx, hy, c, dx_i, dy_i, cos_a, -sin_a, tol, -1)
+            y_max = _float_extreme(xi, yi, hx, hy, b, -dy_i, dx_i, sin_a, cos_a, tol, 1)
+            y_min = _float_extreme(xi, yi, hx, hy, e, -dy_i, dx_i, sin_a, cos_a, tol, -1)
+            if x_max - x_min > max_length:
+                max_length = x_max - x_min
+                best_cos = cos_a
+                best_sin = sin_a
+            if y_max - y_min < min_width:
+                min_width = y_max - y_min
+
+        # the extreme points along the direction of the max diameter, first ones in hull order
+        i_max = i_min = 0
+        p_max = p_min = _project(hx[0], hy[0], best_cos, -best_sin)
+        for k in range(1, h):
+            xp = _project(hx[k], hy[k], best_cos, -best_sin)
+            if xp > p_max:
+                p_max = xp
+                i_max = k
+            if xp < p_min:
+                p_min = xp
+                i_min = k
+        pt1 = np.array((hx[i_max], hy[i_max]))
+        pt2 = np.array((hx[i_min], hy[i_min]))
+        feret, vec = arrange(pt1, pt2)
+        out[r, 0] = max_length
+        out[r, 3] = min_width
+        out[r, 4] = feret[0]
+        out[r, 5] = feret[1]
+        # temporarily: the Feret vector, the angles are computed outside the kernel
+        out[r, 1] = vec[0]
+        out[r, 2] = vec[1]
+
+
+def get_values_batch(coords: npt.NDArray[np.int32], offsets: npt.NDArray[np.int64], num_threads: int = 1) -> npt.NDArray[np.float32]:
+    """
+        Feret values of many ROIs in 1 call: the points of ROI i are coords[offsets[i]:offsets[i+1]] (x,y)
+        returns an (N, 7) float32 array, columns as in feret_index, the same values as get_values per ROI
+        with num_threads > 1 the kernel (nogil) runs on chunks of ROIs in parallel,
+        each ROI is computed on its own: the values do not depend on the number of threads
+    """
+    return get_values_and_shape_batch(coords, offsets, num_threads)[0]
+
+
+def get_values_and_shape_batch(coords: npt.NDArray[np.int32], offsets: npt.NDArray[np.int64],
+                               num_threads: int = 1) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.float64]]:
+    """
+        Feret values (see get_values_batch) and shape descriptors of many ROIs in 1 pass
+        returns the (N, 7) float32 Feret values and the (N, 9) float64 shape descriptors, columns as in shape_index
+    """
+    coords = np.ascontiguousarray(coords, dtype=np.int32)
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    out = np.empty((len(offsets) - 1, 7), dtype=np.float32)
+    shape_out = np.empty((len(offsets) - 1, 6), dtype=np.float64)
+    # more chunks than threads: a few big ROIs do not keep 1 thread busy while the others wait
+    chunks = chunk_bounds(offsets, 4 * num_threads) if num_threads > 1 else np.array([0, len(out)])
+    if len(chunks) <= 2:
+        _feret_kernel(coords, offsets, out, shape_out)
     else:
-        feret_ratio = max_diameter
-        log("ROI with zero min width in Feret calculations","warning")
-    angle_shifted = (angle_of_max + 90.0) % 180
+        def worker(first, last):
+            _feret_kernel(coords, offsets[first:last + 1], out[first:last], shape_out[first:last])
+
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(worker, chunks[:-1], chunks[1:]))
+    return _finish_batch(out), _finish_shape(shape_out)
+
+
+def _finish_shape(raw: np.ndarray) -> np.ndarray:
+    """
+        the shape descriptors from perimeter, convex area, area and central moments, like ImageJ:
+        -the ellipse has the same 2nd order moments as the polygon, scaled to the same area
+        -its angle, like the Feret angle, is measured in image coordinates, in [0, 180)
+        -circularity is clipped at 1, a ratio with a zero denominator is 0
+    """
+    perimeter, convex_area, area, mu20, mu11, mu02 = raw.T
+    half_sum = (mu20 + mu02) / 2
+    common = np.sqrt(((mu20 - mu02) / 2) ** 2 + mu11 ** 2)
+    major = 4 * np.sqrt(half_sum + common)
+    minor = 4 * np.sqrt(np.maximum(half_sum - common, 0))
+    ellipse_area = np.pi * major * minor / 4
+    scale = np.sqrt(np.divide(area, ellipse_area, out=np.zeros_like(area), where=ellipse_area > 0))
+    major *= scale
+    minor *= scale
+
+    shape = np.zeros((len(raw), len(shape_msmts)), dtype=np.float64)
+    shape[:, 0] = perimeter
+    np.divide(4 * np.pi * area, perimeter ** 2, out=shape[:, 1], where=perimeter > 0)
+    np.minimum(shape[:, 1], 1.0, out=shape[:, 1])
+    np.divide(area, convex_area, out=shape[:, 2], where=convex_area > 0)
+    shape[:, 3] = convex_area
+    np.divide(4 * area, np.pi * major ** 2, out=shape[:, 4], where=major > 0)
+    shape[:, 5] = major
+    shape[:, 6] = minor
+    shape[:, 7] = np.degrees(0.5 * np.arctan2(2 * mu11, mu20 - mu02)) % 180
+    np.divide(major, minor, out=shape[:, 8], where=minor > 0)
+    return shape
+
 
-    #return np.array([max_diameter, angle_of_max,angle_shifted, min_width, feret_x, feret_y,feret_ratio])
-    out = np.empty(7, dtype=np.float32)
-    out[0] = max_diameter
-    out[1] = angle_of_max
-    out[2] = angle_shifted
-    out[3] = min_width
-    out[4] = feret[0]
-    out[5] = feret[1]
-    out[6] = feret_ratio
+def _finish_batch(out: np.ndarray) -> np.ndarray:
+    # angles and ratio: the same float32 numpy operations as in get_values
+    vec_x = out[:, 1].copy()
+    vec_y = out[:, 2]
+    angle_of_max = np.degrees(np.arctan2(vec_y, vec_x)) % 180
+    out[:, 1] = angle_of_max
+    out[:, 2] = (angle_of_max + 90.0) % 180
+    max_diameter, min_width = out[:, 0], out[:, 3]
+    zero_width = min_width < 1
+    out[:, 6] = max_diameter
+    np.divide(max_diameter, min_width, out=out[:, 6], where=~zero_width)
+    if zero_width.any():
+        log(f"{int(zero_width.sum())} ROI(s) with zero min width in Feret calculations","warning")
     return out
 
 
-@njit(nogil=True)
+@njit(nogil=True, cache=True)
 def arrange(pt1, pt2):
     if (pt1[0] < pt2[0]) or (pt1[0] == pt2[0] and pt1[1] < pt2[1]):
         feret = pt1
@@ -0,0 +1,133 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+import numpy as np
+import cv2
+
+# measurements from the pixels of the label instead of the polygon of the ROI
+moments_index ={
+        "PixelArea": 0,
+        "CentroidX": 1,
+        "CentroidY": 2,
+        "Orientation": 3,
+        "Eccentricity": 4,
+    }
+moments_msmts = ["PixelArea", "CentroidX", "CentroidY", "Orientation", "Eccentricity"]
+moments_quantities = ["area","length","length","angle",""]
+moments_units = ["px","px","px","deg",""]
+moments_scalers = [1.0,1.0,1.0,1.0,1.0]
+
+
+def label_moments(label_image, block_rows: int = 1024) -> np.ndarray:
+    """
+        moments of the pixels of every label with np.bincount on the label ids, in 2 passes over the image
+        -pass 1: m00, m10, m01
+        -pass 2: the central moments mu20, mu11, mu02, around the centroid of each label
+         m20 of a label far from the origin is a large number: m20 - m10*m10/m00 would lose digits
+        a pixel is at its (column, row) index, like the points of the contours
+        the image is read in blocks of block_rows rows: the temporaries are block sized,
+        the label_image can also be a np.memmap or a LabelSource.TiffTileReader
+        returns float64 (max_label+1, 6): m00, m10, m01, mu20, mu11, mu02; row 0 is the background
+    """
+    height, width = label_image.shape[:2]
+    moments = np.zeros((1, 6), dtype=np.float64)
+    blocks = range(0, height, block_rows)
+    columns = np.arange(width, dtype=np.float64)
+
+    def block_of(top):
+        labels = np.asarray(label_image[top:top + block_rows, :]).ravel().astype(np.intp, copy=False)
+        rows = len(labels) // width
+        x = np.tile(columns, rows)
+        y = np.repeat(np.arange(top, top + rows, dtype=np.float64), width)
+        return labels, x, y
+
+    for top in blocks:
+        labels, x, y = block_of(top)
+        num = max(len(moments), int(labels.max()) + 1 if len(labels) else 0)
+        if num > len(moments):
+            moments = np.concatenate((moments, np.zeros((num - len(moments), 6))))
+        moments[:, 0] += np.bincount(labels, minlength=num)
+        moments[:, 1] += np.bincount(labels, weights=x, minlength=num)
+        moments[:, 2] += np.bincount(labels, weights=y, minlength=num)
+
+    m00 = np.where(moments[:, 0] > 0, moments[:, 0], 1.0)
+    cx, cy = moments[:, 1] / m00, moments[:, 2] / m00
+    num = len(moments)
+    for top in blocks:
+        labels, x, y = block_of(top)
+        dx = x - cx[labels]
+        dy = y - cy[labels]
+        moments[:, 3] += np.bincount(labels, weights=dx*dx, minlength=num)
+        moments[:, 4] += np.bincount(labels, weights=dx*dy, minlength=num)
+        moments[:, 5] += np.bincount(labels, weights=dy*dy, minlength=num)
+    return moments
+
+
+def moment_values(moments: np.ndarray) -> np.ndarray:
+    """
+        the measurements (columns as in moments_index) from rows of label_moments
+        -PixelArea: number of pixels, CentroidX/Y: mean pixel position
+        -Orientation: angle of the major axis of the ellipse with the same moments,
+         in image coordinates, in [0, 180) like EllipseAngle
+        -Eccentricity: sqrt(1 - minor^2/major^2), 0 for a circle
+        a pixel is a square: it adds 1/12 to the variance along x and y, so 1 pixel is a circle
+        a row without pixels gives 0 for everything
+    """
+    m00, m10, m01, mu20, mu11, mu02 = moments.T
+    has_pixels = m00 > 0
+    n = np.where(has_pixels, m00, 1.0)
+    var_x = mu20 / n + 1/12
+    var_y = mu02 / n + 1/12
+    cov = mu11 / n
+    half_sum = (var_x + var_y) / 2
+    common = np.sqrt(((var_x - var_y) / 2) ** 2 + cov ** 2)
+
+    values = np.zeros((len(moments), len(moments_msmts)), dtype=np.float64)
+    values[:, 0] = m00
+    values[:, 1] = m10 / n
+    values[:, 2] = m01 / n
+    values[:, 3] = np.degrees(0.5 * np.arctan2(2 * cov, var_x - var_y)) % 180
+    values[:, 4] = np.sqrt(np.clip(2 * common / (half_sum + common), 0.0, 1.0))
+    values[~has_pixels] = 0
+    return values
+
+
+def polygon_moments(coords: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+        moments (rows as in label_moments) of the pixels of filled polygons, polygon i is coords[offsets[i]:offsets[i+1]]
+        a contour through the centres of the border pixels of a label fills exactly the pixels of that label
+        every polygon is filled in a mask of its own bounding box: overlapping polygons each keep all their pixels
+    """
+    num = len(offsets) - 1
+    moments = np.zeros((num, 6), dtype=np.float64)
+    for i in range(num):
+        polygon = np.asarray(coords[offsets[i]:offsets[i + 1]], dtype=np.int32)
+        if not len(polygon):
+            continue
+        left, top = polygon.min(axis=0)
+        right, bottom = polygon.max(axis=0)
+        mask = np.zeros((bottom - top + 1, right - left + 1), dtype=np.uint8)
+        cv2.fillPoly(mask, [np.ascontiguousarray(polygon - (left, top)).reshape(-1, 1, 2)], color=1)
+        M = cv2.moments(mask, binaryImage=True)
+        # m10 and m01 back to image coordinates, the central moments do not move
+        moments[i] = (M["m00"], M["m10"] + left*M["m00"], M["m01"] + top*M["m00"], M["mu20"], M["mu11"], M["mu02"])
+    return moments
+
+
+def pixel_moments(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """moments (a row as in label_moments) of 1 group of pixels at (x, y)"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if not len(x):
+        return np.zeros(6, dtype=np.float64)
+    dx = x - x.mean()
+    dy = y - y.mean()
+    return np.array([len(x), x.sum(), y.sum(), dx @ dx, dx @ dy, dy @ dy])
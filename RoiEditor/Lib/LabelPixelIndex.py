@@ -0,0 +1,114 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+from typing import Optional
+import numpy as np
+from numba import njit
+
+
+class LabelPixelIndex:
+    """
+        index of the pixels of every label in a label image, built once at load
+        -CSR layout: the flat pixel indices of label l are pixels[offsets[l]:offsets[l+1]]
+        -bounding box per label (top, left, bottom, right), bottom and right exclusive
+        clearing or restoring a label only touches the pixels of that label,
+        not the whole image like np.isin(label_image, labels) does
+    """
+
+    def __init__(self, label_image: np.ndarray):
+        self.shape: tuple[int, int] = label_image.shape[:2]
+        flat = label_image.reshape(-1)
+        pixel_dtype = np.int32 if flat.size < np.iinfo(np.int32).max else np.int64
+        max_label = max(int(flat.max()), 0) if flat.size else 0
+
+        # counting sort: no temporaries beyond the index itself
+        counts = _count_labels(flat, max_label)
+        self.offsets: np.ndarray = np.zeros(max_label + 2, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.pixels: np.ndarray = np.empty(int(self.offsets[-1]), dtype=pixel_dtype)
+        self.bounds: np.ndarray = np.zeros((max_label + 1, 4), dtype=np.int32)
+        _scatter_pixels(flat, self.shape[1], self.offsets, self.pixels, self.bounds)
+
+    @property
+    def max_label(self) -> int:
+        return len(self.offsets) - 2
+
+    def count(self, label: int) -> int:
+        if 0 < label <= self.max_label:
+            return int(self.offsets[label + 1] - self.offsets[label])
+        return 0
+
+    def bbox(self, label: int) -> Optional[tuple[slice, slice]]:
+        """(row slice, column slice) of the bounding box of a label, None for a label without pixels"""
+        if not self.count(label):
+            return None
+        top, left, bottom, right = self.bounds[label]
+        return slice(int(top), int(bottom)), slice(int(left), int(right))
+
+    def pixels_of(self, labels) -> np.ndarray:
+        """flat pixel indices of all given labels, concatenated"""
+        labels = np.atleast_1d(np.asarray(labels, dtype=np.int64))
+        labels = labels[(labels > 0) & (labels <= self.max_label)]
+        starts = self.offsets[labels]
+        counts = self.offsets[labels + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=self.pixels.dtype)
+        # ragged arange: for every label the positions starts[i] .. starts[i]+counts[i]-1
+        shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return self.pixels[shift + np.arange(total)]
+
+    def clear(self, label_image: np.ndarray, labels):
+        """sets the pixels of the given labels to 0"""
+        np.put(label_image, self.pixels_of(labels), 0)
+
+    def restore(self, label_image: np.ndarray, labels):
+        """puts the given labels back in the image, e.g. after an undelete"""
+        labels = np.atleast_1d(np.asarray(labels, dtype=np.int64))
+        labels = labels[(labels > 0) & (labels <= self.max_label)]
+        counts = self.offsets[labels + 1] - self.offsets[labels]
+        np.put(label_image, self.pixels_of(labels), np.repeat(labels, counts))
+
+
+@njit(nogil=True, cache=True)
+def _count_labels(flat: np.ndarray, max_label: int) -> np.ndarray:
+    """number of pixels per label, label 0 (and negative values) not counted"""
+    counts = np.zeros(max_label + 1, dtype=np.int64)
+    for i in range(flat.size):
+        if flat[i] > 0:
+            counts[flat[i]] += 1
+    return counts
+
+
+@njit(nogil=True, cache=True)
+def _scatter_pixels(flat: np.ndarray, width: int, offsets: np.ndarray, pixels: np.ndarray, bounds: np.ndarray):
+    """
+        scatter pass of the counting sort, one sweep in raster order
+        -every pixel goes to the next free slot of its label: the pixels of a label stay in raster order
+        -the first pixel of a label sets its top row, the last one its bottom row
+    """
+    next_free = offsets[:-1].copy()
+    for i in range(flat.size):
+        label = flat[i]
+        if label <= 0:
+            continue
+        row = i // width
+        col = i - row * width
+        if next_free[label] == offsets[label]:
+            bounds[label, 0] = row
+            bounds[label, 1] = col
+            bounds[label, 3] = col + 1
+        else:
+            bounds[label, 1] = min(bounds[label, 1], col)
+            bounds[label, 3] = max(bounds[label, 3], col + 1)
+        bounds[label, 2] = row + 1
+        pixels[next_free[label]] = i
+        next_free[label] += 1
@@ -0,0 +1,121 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+import os
+import threading
+import numpy as np
+import cv2
+from tifffile import TiffFile, memmap as tiff_memmap
+
+from .TinyLog import log
+
+
+class TiffTileReader:
+    """
+        reads a rectangle of a (tiled or stripped) TIFF label image without reading the whole image
+        -only the tiles/strips that overlap the rectangle are read and decoded
+        -reader[top:bottom, left:right] like a numpy array, shape and dtype as well
+        -reader[rows, cols] with integer arrays: the pixels at those points, e.g. the labels under ROI centers
+        the file reads are serialized, the decoding runs in parallel
+    """
+
+    def __init__(self, path: str):
+        self._tiff = TiffFile(path)
+        self._page = self._tiff.pages[0]
+        if self._page.samplesperpixel != 1 or len(self._page.shape) != 2:
+            self.close()
+            raise ValueError(f"{path} is no 2D label image: shape {self._page.shape}")
+        self.shape: tuple[int, int] = self._page.shape
+        self.dtype = self._page.dtype
+        self.ndim = 2
+        # a tile or a strip: the page is a grid of chunks
+        self._chunk_h, self._chunk_w = self._page.chunks[:2]
+        self._chunks_across = -(-self.shape[1] // self._chunk_w)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._tiff.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getitem__(self, key) -> np.ndarray:
+        rows, cols = key
+        if not isinstance(rows, slice):
+            return self.values_at(rows, cols)
+        top, bottom, _ = rows.indices(self.shape[0])
+        left, right, _ = cols.indices(self.shape[1])
+        return self.read(top, left, bottom, right)
+
+    def values_at(self, rows, cols) -> np.ndarray:
+        """the pixels at (rows, cols), every chunk with points in it is read once"""
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        out = np.zeros(rows.shape, dtype=self.dtype)
+        chunk_rows, chunk_cols = rows // self._chunk_h, cols // self._chunk_w
+        chunk_ids = chunk_rows * self._chunks_across + chunk_cols
+        order = np.argsort(chunk_ids.ravel(), kind="stable")
+        ids, starts = np.unique(chunk_ids.ravel()[order], return_index=True)
+        for points in np.split(order, starts[1:]) if len(ids) else []:
+            at = np.unravel_index(points, rows.shape)
+            row0 = int(chunk_rows[at][0]) * self._chunk_h
+            col0 = int(chunk_cols[at][0]) * self._chunk_w
+            chunk = self.read(row0, col0, min(row0 + self._chunk_h, self.shape[0]), min(col0 + self._chunk_w, self.shape[1]))
+            out[at] = chunk[rows[at] - row0, cols[at] - col0]
+        return out
+
+    def read(self, top: int, left: int, bottom: int, right: int) -> np.ndarray:
+        """the pixels [top:bottom, left:right]"""
+        out = np.zeros((max(bottom - top, 0), max(right - left, 0)), dtype=self.dtype)
+        if not out.size:
+            return out
+        page = self._page
+        fh = self._tiff.filehandle
+        for chunk_row in range(top // self._chunk_h, (bottom - 1) // self._chunk_h + 1):
+            for chunk_col in range(left // self._chunk_w, (right - 1) // self._chunk_w + 1):
+                index = chunk_row * self._chunks_across + chunk_col
+                if not page.databytecounts[index]:
+                    # a sparse file leaves empty tiles out: background
+                    continue
+                with self._lock:
+                    fh.seek(page.dataoffsets[index])
+                    data = fh.read(page.databytecounts[index])
+                chunk, _, _ = page.decode(data, index)
+                chunk = chunk.reshape(chunk.shape[-3:-1])
+                row0, col0 = chunk_row * self._chunk_h, chunk_col * self._chunk_w
+                # the overlap of the chunk and the rectangle
+                r0, r1 = max(top, row0), min(bottom, row0 + chunk.shape[0])
+                c0, c1 = max(left, col0), min(right, col0 + chunk.shape[1])
+                out[r0 - top:r1 - top, c0 - left:c1 - left] = chunk[r0 - row0:r1 - row0, c0 - col0:c1 - col0]
+        return out
+
+
+def open_label_source(path: str):
+    """
+        a label image that can be read in parts
+        -.npy: memory-mapped
+        -.tif/.tiff: memory-mapped if uncompressed and contiguous, else read tile by tile
+        -any other image is read in memory
+    """
+    _, file_extension = os.path.splitext(path)
+    file_extension = file_extension.lower()
+    if file_extension == ".npy":
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+    if file_extension in (".tif", ".tiff"):
+        try:
+            return tiff_memmap(path, mode="r")
+        except ValueError:
+            return TiffTileReader(path)
+    log(f"{path} is read in memory, use .npy or .tif for large label images", type="warning")
+    return cv2.imread(path, cv2.IMREAD_UNCHANGED)
@@ -11,19 +11,19 @@ I left the (GitHub) url of the original code next to the derived code.
 """
 import numpy as np
 import cv2
-from skimage.measure import regionprops
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from numba import njit
 
 from .Roi import Roi
 from .TinyRoiManager import TinyRoiManager
 from .TinyLog import log
+from .RoiClassify import classify, edge_labels
+from .Context import gvars
+from .LabelSource import open_label_source
 
-state_and_tags = {0: (Roi.ROI_STATE_ACTIVE,set()),
-        1: (Roi.ROI_STATE_DELETED, set(["edge.image"])),
-        2: (Roi.ROI_STATE_DELETED,set(["small"])),
-        3: (Roi.ROI_STATE_DELETED, set(["edge.image"]))
-}
-
-def process_label_image(rm: TinyRoiManager, label_image: np.ndarray, remove_edges: bool = True, remove_small: bool = True, size_threshold: int = 100) -> None:
+def process_label_image(rm: TinyRoiManager, label_image: np.ndarray, remove_edges: bool = True, remove_small: bool = True, size_threshold: int = 100,
+                        num_threads: Optional[int] = None) -> None:
     """ this implementation of does not require creating gaps with background value between the ROIs/labels, so the area exactly reflects the area
         exactly matches the label generated by cellpose
     Parameters:
@@ -31,81 +31,204 @@ def process_label_image(rm: TinyRoiManager, label_image: np.ndarray, remove_edge
     - remove_edges: do labels at the image edge have to be excluded?
     - remove_small: do small labels < size_threshold have to be excluded?
     - size_threshold:
+    - num_threads: the regions are processed in chunks on a thread pool, None: gvars["label_to_roi_num_threads"]
     """
     manager: TinyRoiManager = rm
+    if num_threads is None:
+        num_threads = gvars["label_to_roi_num_threads"]
 
-    # use regionprops directly on the label_image; each unique value identifies 1 label
-    regions = np.array(regionprops(label_image=label_image,cache=True))
-    max_label= max(r.label for r in regions)
-    max_digits: int = len(str(max_label))
-    height, width = label_image.shape
-    edge_h: int = width-1
-    edge_v: int = height-1
+    # 1 pass over the label_image gives the bounding box of every label; each unique value identifies 1 label
+    bounds, counts = label_bounds(label_image)
+    labels = np.flatnonzero(counts)
+    max_label= int(labels[-1])
     roi_array = np.full(max_label+1,None,dtype=Roi)
 
-    edge_set= set()
-    if remove_edges:
-        edge_set = set(get_edge_labels(label_image))
-
-    for region in regions:
-        idx = region.label
-        if not idx:
-            continue
-
-        mask: np.ndarray = region.image.astype(np.uint8)
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if not contours:
-            log(f"No contour found for {roi_name}",type="warning")
-            continue
-        contour = contours[-1]
-        coords = np.array(contour.squeeze())
-        area=cv2.contourArea(contour)
-
-        if coords.ndim != 2 or len(coords) < 3:
-            log(f"Contour is no polygon for {roi_name} : ndim= {coords.ndim}, #coords= {len(coords)}, #contours={len(contours)}",type="warning")
-            continue
-
-        min_row, min_col, max_row, max_col = region.bbox
-        bounds=(min_row, min_col,max_row,max_col)
-        coords = np.add(coords, np.array([min_col, min_row]))
-        is_on_edge = idx in edge_set
-        is_small =  remove_small and area < size_threshold
-
-        key = int(is_on_edge) * 1 + int(is_small) * 2
-
-        coords = np.asarray(coords).reshape(-1, 2)
-        xpoints = np.array(coords[:, 0].astype(int))
-        ypoints = np.array(coords[:, 1].astype(int))
-
-        M = cv2.moments(contour)
-        cx = int(M['m10']/M['m00'])
-        cy = int(M['m01']/M['m00']) 
-        center =(cx,cy)
-
-        n = len(xpoints)
-        (state, tags) = state_and_tags[key]
-        roi_name: str = f"L{region.label:0{max_digits}d}"
-
-        roi = Roi(xpoints, ypoints, name=roi_name, state=state,tags=tags,
-                  bounds=bounds,
-                  center =center,
-                  n=n,
-                  area=area)
-        roi_array[region.label]=roi
-    
+    edge_set = edge_labels(label_image, remove_edges)
+
+    def worker(chunk):
+        return [region_to_roi(label_image, label, bounds[label], edge_set, remove_small, size_threshold) for label in chunk]
+
+    # opencv releases the GIL: the chunks of regions run in parallel
+    labels = labels.tolist()
+    num_threads = max(1, min(num_threads, len(labels)))
+    chunk_size = (len(labels) + num_threads - 1) // num_threads
+    chunks = [labels[i:i + chunk_size] for i in range(0, len(labels), chunk_size)]
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        # map keeps the order of the chunks: the warnings are logged in label order
+        for chunk_result in executor.map(worker, chunks):
+            for roi, warning in chunk_result:
+                if warning:
+                    log(warning,type="warning")
+                if roi is not None:
+                    roi_array[roi.label]=roi
+
+    manager.add_from_list_unchecked(roi_array)
+
+
+def process_label_image_tiled(rm: TinyRoiManager, source, remove_edges: bool = True, remove_small: bool = True, size_threshold: int = 100,
+                              tile_size: Optional[int] = None, overlap: Optional[int] = None, num_threads: Optional[int] = None) -> None:
+    """ process_label_image for label images that do not fit in memory, it gives the same ROIs
+        the label image is read in tiles of tile_size x tile_size pixels, twice:
+        -pass 1: the bounding box of every label, tile by tile
+        -pass 2: a label belongs to the tile with the top left corner of its bounding box
+                 and its contour is found in that tile, extended with overlap pixels to the bottom and the right
+                 a label that does not fit in there is read separately, only its bounding box
+        a label that crosses a seam between tiles is traced once, on the complete label
+        memory: num_threads tiles of (tile_size+overlap)^2 pixels, the bounding boxes and the ROIs
+    Parameters:
+    - source: path of a label image (see LabelSource.open_label_source) or an array that can be sliced, e.g. a np.memmap
+    - tile_size, overlap: None: gvars["label_tile_size"], gvars["label_tile_overlap"]
+    - the other parameters: see process_label_image
+    """
+    manager: TinyRoiManager = rm
+    tile_size = tile_size or gvars["label_tile_size"]
+    overlap = gvars["label_tile_overlap"] if overlap is None else overlap
+    num_threads = num_threads or gvars["label_to_roi_num_threads"]
+    opened = isinstance(source, str)
+    if opened:
+        source = open_label_source(source)
+
+    height, width = source.shape[:2]
+    tiles_across = -(-width // tile_size)
+    tiles = [(top, left) for top in range(0, height, tile_size) for left in range(0, width, tile_size)]
+
+    def bounds_worker(tile):
+        top, left = tile
+        tile_bounds, tile_counts = label_bounds(np.asarray(source[top:top + tile_size, left:left + tile_size]))
+        present = np.flatnonzero(tile_counts)
+        tile_bounds = tile_bounds[present] + np.array([top, left, top, left])
+        return present, tile_bounds, tile_counts[present]
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        # pass 1: the bounding boxes of the tiles are merged per label
+        bounds, counts = _empty_bounds(0, (height, width))
+        for present, tile_bounds, tile_counts in executor.map(bounds_worker, tiles):
+            if not len(present):
+                continue
+            if present[-1] >= len(counts):
+                more_bounds, more_counts = _empty_bounds(present[-1] - len(counts), (height, width))
+                bounds, counts = np.concatenate((bounds, more_bounds)), np.concatenate((counts, more_counts))
+            np.minimum.at(bounds[:, 0], present, tile_bounds[:, 0])
+            np.minimum.at(bounds[:, 1], present, tile_bounds[:, 1])
+            np.maximum.at(bounds[:, 2], present, tile_bounds[:, 2])
+            np.maximum.at(bounds[:, 3], present, tile_bounds[:, 3])
+            counts[present] += tile_counts
+
+        labels = np.flatnonzero(counts)
+        if not len(labels):
+            log("label image does not contain labels", type="warning")
+            return None
+        roi_array = np.full(int(labels[-1])+1,None,dtype=Roi)
+
+        # only the 4 borders are read
+        edge_set = edge_labels(source, remove_edges)
+
+        # pass 2: the labels grouped per tile, in label order within a tile
+        owner = (bounds[labels, 0] // tile_size) * tiles_across + bounds[labels, 1] // tile_size
+        order = np.argsort(owner, kind="stable")
+        owners, starts = np.unique(owner[order], return_index=True)
+        groups = zip(owners.tolist(), np.split(labels[order], starts[1:]))
+
+        def roi_worker(group):
+            tile, tile_labels = group
+            top, left = (tile // tiles_across) * tile_size, (tile % tiles_across) * tile_size
+            bottom, right = min(top + tile_size + overlap, height), min(left + tile_size + overlap, width)
+            window = None
+            results = []
+            for label in tile_labels.tolist():
+                min_row, min_col, max_row, max_col = bounds[label].tolist()
+                if max_row <= bottom and max_col <= right:
+                    if window is None:
+                        window = np.asarray(source[top:bottom, left:right])
+                    results.append((label, *region_to_roi(window, label, bounds[label], edge_set, remove_small, size_threshold, origin=(top, left))))
+                else:
+                    crop = np.asarray(source[min_row:max_row, min_col:max_col])
+                    results.append((label, *region_to_roi(crop, label, bounds[label], edge_set, remove_small, size_threshold, origin=(min_row, min_col))))
+            return results
+
+        results = [result for tile_results in executor.map(roi_worker, groups) for result in tile_results]
+
+    if opened and hasattr(source, "close"):
+        source.close()
+    # the warnings in label order, like process_label_image
+    results.sort(key=lambda result: result[0])
+    for label, roi, warning in results:
+        if warning:
+            log(warning,type="warning")
+        if roi is not None:
+            roi_array[label]=roi
+
     manager.add_from_list_unchecked(roi_array)
 
 
-def get_edge_labels(label_image: np.ndarray) -> np.ndarray:
+def label_bounds(label_image: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ bounding box and number of pixels of every label in 1 pass over the label_image
+        -bounds[label] = (min_row, min_col, max_row, max_col), max exclusive like the skimage bbox
+        -counts[label] = 0 for a label without pixels, counts[0] = 0: background
+    """
+    max_label = int(label_image.max()) if label_image.size else 0
+    bounds, counts = _empty_bounds(max(max_label, 0), label_image.shape)
+    _add_label_bounds(label_image, bounds, counts)
+    return bounds, counts
+
+
+def _empty_bounds(max_label: int, shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+    """the bounds and counts of labels 0..max_label without pixels: min at the far end, max 0"""
+    bounds = np.zeros((max_label + 1, 4), dtype=np.int64)
+    bounds[:, 0] = shape[0]
+    bounds[:, 1] = shape[1]
+    return bounds, np.zeros(max_label + 1, dtype=np.int64)
+
 
-  top = label_image[0, :]
-  bottom = label_image[-1, :]
-  left = label_image[:, 0]
-  right = label_image[:, -1]
-  
-  border_values = np.concatenate([top, bottom, left, right])
-  
-  unique_labels = np.unique(border_values)
-  unique_labels = unique_labels[unique_labels != 0]
-  
-  return unique_labels
\ No newline at end of file
+@njit(nogil=True, cache=True)
+def _add_label_bounds(label_image, bounds, counts):
+    height, width = label_image.shape
+    for row in range(height):
+        for col in range(width):
+            label = label_image[row, col]
+            if label <= 0:
+                continue
+            counts[label] += 1
+            if row < bounds[label, 0]:
+                bounds[label, 0] = row
+            if col < bounds[label, 1]:
+                bounds[label, 1] = col
+            if row >= bounds[label, 2]:
+                bounds[label, 2] = row + 1
+            if col >= bounds[label, 3]:
+                bounds[label, 3] = col + 1
+
+
+def region_to_roi(label_image: np.ndarray, idx: int, bbox: np.ndarray, edge_set: set, remove_small: bool, size_threshold: int,
+                  origin: tuple[int, int] = (0, 0)) -> tuple[Optional[Roi], Optional[str]]:
+    """ the ROI of 1 label, or None and the reason why there is none
+        -bbox: (min_row, min_col, max_row, max_col) as in label_bounds
+        -origin: (row, col) of label_image[0, 0] when label_image is a tile of the image
+        no logging here: this runs on the worker threads
+    """
+    min_row, min_col, max_row, max_col = bbox.tolist()
+    row0, col0 = origin
+    mask: np.ndarray = (label_image[min_row-row0:max_row-row0, min_col-col0:max_col-col0] == idx).astype(np.uint8)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None, f"No contour found for {Roi.label_to_name(idx)}"
+    contour = contours[-1]
+    coords = np.array(contour.squeeze())
+    area=cv2.contourArea(contour)
+
+    if coords.ndim != 2 or len(coords) < 3:
+        return None, f"Contour is no polygon for {Roi.label_to_name(idx)} : ndim= {coords.ndim}, #coords= {len(coords)}, #contours={len(contours)}"
+
+    bounds=(min_row, min_col,max_row,max_col)
+    coords = np.add(coords, np.array([min_col, min_row]))
+    coords = np.asarray(coords).reshape(-1, 2)
+    xpoints = np.array(coords[:, 0].astype(int))
+    ypoints = np.array(coords[:, 1].astype(int))
+
+    n = len(xpoints)
+    (state, tags) = classify(idx, area, edge_set, remove_small, size_threshold)
+    roi = Roi(xpoints, ypoints, label=idx, state=state,tags=tags,
+              bounds=bounds,
+              n=n,
+              area=area)
+    return roi, None
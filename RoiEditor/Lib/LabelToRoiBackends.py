@@ -0,0 +1,79 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+from typing import Callable
+
+from .TinyRoiManager import TinyRoiManager
+from .TinyLog import log
+from . import LabelToRoi, LabelToRoiDiff, LabelToRoiTrace, NumpyToRoi
+
+
+class LabelToRoiBackend:
+    """
+        a way to turn a label image into ROIs
+        -process(rm, data, remove_edges=..., remove_small=..., size_threshold=...)
+        -data: {"masks": label image, "outlines": outlines image, only in a cellpose _seg.npy}
+        -out_of_core: data["masks"] can be a label image that is read in parts (LabelSource.open_label_source),
+         the caller does not need to load it in full
+    """
+    def __init__(self, name: str, process: Callable[..., None], needs_outlines: bool = False, description: str = "", out_of_core: bool = False):
+        self.name = name
+        self.process = process
+        self.needs_outlines = needs_outlines
+        self.description = description
+        self.out_of_core = out_of_core
+
+    def __repr__(self):
+        return f"<LabelToRoiBackend name={self.name}: {self.description}>"
+
+
+# the backends by name, gvars["label_to_roi_backend"] and gvars["npy_to_roi_backend"] select one
+backends: dict[str, LabelToRoiBackend] = {}
+
+# used when the selected backend does not exist or cannot handle the data
+DEFAULT_BACKEND = "diff"
+
+
+def register_backend(name: str, process: Callable[..., None], needs_outlines: bool = False, description: str = "", out_of_core: bool = False) -> None:
+    backends[name] = LabelToRoiBackend(name, process, needs_outlines, description, out_of_core)
+
+
+def is_out_of_core(backend: str) -> bool:
+    """True when the backend reads the label image in parts: it is opened with LabelSource.open_label_source"""
+    selected = backends.get(backend)
+    return selected is not None and selected.out_of_core
+
+
+def process_labels(rm: TinyRoiManager, data: dict, backend: str, remove_edges: bool = True, remove_small: bool = True, size_threshold: int = 100) -> None:
+    """ creates the ROIs of data["masks"] with the given backend
+        an unknown backend or a backend that needs outlines the data does not have falls back on DEFAULT_BACKEND
+    """
+    selected = backends.get(backend)
+    if selected is None:
+        log(f"unknown label to ROI backend '{backend}', using '{DEFAULT_BACKEND}'", type="warning")
+        selected = backends[DEFAULT_BACKEND]
+    elif selected.needs_outlines and data.get("outlines") is None:
+        log(f"label to ROI backend '{backend}' needs the outlines of a cellpose _seg.npy, using '{DEFAULT_BACKEND}'", type="warning")
+        selected = backends[DEFAULT_BACKEND]
+    log(f"label to ROI backend: {selected.name}")
+    selected.process(rm, data, remove_edges=remove_edges, remove_small=remove_small, size_threshold=size_threshold)
+
+
+register_backend("exact", lambda rm, data, **kwargs: LabelToRoi.process_label_image(rm, data["masks"], **kwargs),
+                 description="1 contour per label, the area is the area of the cellpose label")
+register_backend("tiled", lambda rm, data, **kwargs: LabelToRoi.process_label_image_tiled(rm, data["masks"], **kwargs),
+                 description="exact, with the label image read in tiles: for images that do not fit in memory", out_of_core=True)
+register_backend("trace", lambda rm, data, **kwargs: LabelToRoiTrace.process_label_image(rm, data["masks"], **kwargs),
+                 description="exact, all contours traced in 1 compiled pass over the label image")
+register_backend("diff", lambda rm, data, **kwargs: LabelToRoiDiff.process_label_image(rm, data["masks"], **kwargs),
+                 description="1 contour search on the whole image, labels shrink by 1 pixel")
+register_backend("outlines", lambda rm, data, **kwargs: NumpyToRoi.process_label_image(rm, data, **kwargs), needs_outlines=True,
+                 description="contours of the masks without the cellpose outlines")
@@ -11,39 +11,57 @@ I left the (GitHub) url of the original code next to the derived code.
 """
 import numpy as np
 import cv2
+from numba import njit
 
 from .Roi import Roi
 from .TinyRoiManager import TinyRoiManager
 from .TinyLog import log
-
-state_and_tags = {0: (Roi.ROI_STATE_ACTIVE,set()),
-        1: (Roi.ROI_STATE_DELETED, set(["edge.image"])),
-        2: (Roi.ROI_STATE_DELETED,set(["small"])),
-        3: (Roi.ROI_STATE_DELETED, set(["edge.image"]))
-}
+from .RoiClassify import classify, edge_labels
 
 def remove_internal_edges(label_img):
     """
         creates openings between adjacent labels or
         transitions from background to a label
         so findContours can be applied to the complete image
+        the labels keep their value and dtype, written in 1 pass: no full size mask or temporaries
     """
-    img = label_img.copy()
-
-    h1 = img[:, :-1]
-    h2 = img[:, 1:]
-    hor_edge = (h1 != h2) #(h1 != 0) & (h2 != 0) & (h1 != h2)
-
-    v1 = img[:-1, :]
-    v2 = img[1:, :]
-    ver_edge = (v1 != v2) #(v1 != 0) & (v2 != 0) & (v1 != v2)
-
-    img[:, :-1][hor_edge] = 0
-    img[:, 1:][hor_edge] = 0
-    img[:-1, :][ver_edge] = 0
-    img[1:, :][ver_edge] = 0
+    out = np.empty(label_img.shape, dtype=label_img.dtype)
+    _edge_free_foreground(label_img, out, True)
+    return out
 
-    return img.astype(np.uint8)
+def edge_free_foreground(label_img: np.ndarray) -> np.ndarray:
+    """
+        the binary image (0/255, uint8) for findContours, in 1 pass without full size temporaries
+        a pixel is foreground if it has a label and its 4 neighbours have the same label,
+        so there is an opening between adjacent labels and labels touching the background shrink by 1 pixel
+        the labels are compared in their own dtype: no label gets lost above 255 or 65535
+    """
+    out = np.empty(label_img.shape, dtype=np.uint8)
+    _edge_free_foreground(label_img, out, False)
+    return out
+
+@njit(nogil=True, cache=True)
+def _edge_free_foreground(label_img, out, keep_labels):
+    """out: the label (keep_labels) or 255 where the pixel is kept, 0 elsewhere"""
+    height, width = label_img.shape
+    for row in range(height):
+        for col in range(width):
+            label = label_img[row, col]
+            keep = label != 0
+            if keep and col > 0:
+                keep = label_img[row, col - 1] == label
+            if keep and col < width - 1:
+                keep = label_img[row, col + 1] == label
+            if keep and row > 0:
+                keep = label_img[row - 1, col] == label
+            if keep and row < height - 1:
+                keep = label_img[row + 1, col] == label
+            if not keep:
+                out[row, col] = 0
+            elif keep_labels:
+                out[row, col] = label
+            else:
+                out[row, col] = 255
 
 def erase_label_edges(label_img):
     """
@@ -74,17 +92,14 @@ def process_label_image(rm: TinyRoiManager, label_image: np.ndarray, remove_edge
     - remove_small: do small labels < size_threshold have to be excluded?
     - size_threshold:
     """    
-    edge_set= set()
-    if remove_edges:
-        edge_set = set(get_edge_labels(label_image))
+    edge_set = edge_labels(label_image, remove_edges)
+
+    lbl_img = edge_free_foreground(label_image)
 
-    lbl_img = remove_internal_edges(label_image)
-    lbl_img = (lbl_img > 0).astype(np.uint8) * 255
-    
     contours, _ = cv2.findContours(lbl_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-    roi_array = np.full(shape=len(contours)+100,fill_value=None,dtype=Roi)
-    max_digits=len(str( len(roi_array) ))
+    # indexed by label: the labels can be sparse and go far beyond the number of contours
+    roi_array = np.full(shape=int(label_image.max())+1,fill_value=None,dtype=Roi)
     corr = np.sqrt(1.00215)
 
     if not contours:
@@ -128,36 +143,17 @@ def process_label_image(rm: TinyRoiManager, label_image: np.ndarray, remove_edge
 
         area=cv2.contourArea(contour)
 
-        is_on_edge = label_value in edge_set
-        is_small = remove_small and area < size_threshold
-        key = int(is_on_edge) * 1 + int(is_small) * 2
-        (state, tags) = state_and_tags[key]
-        roi_name: str = f"L{label_value:0{max_digits}d}"
+        (state, tags) = classify(label_value, area, edge_set, remove_small, size_threshold)
 
         roi = Roi(
             xpoints=xpoints,
             ypoints=ypoints,
-            name=roi_name,
+            label=int(label_value),
             state=state,
             tags = tags,
             bounds =(top,left,bottom,right),
-            center =(cx,cy),
             n=n,
             area=area
         )
         roi_array[label_value]=roi
     rm.add_from_list_unchecked(roi_array)
-
-def get_edge_labels(label_image: np.ndarray) -> np.ndarray:
-
-  top = label_image[0, :]
-  bottom = label_image[-1, :]
-  left = label_image[:, 0]
-  right = label_image[:, -1]
-  
-  border_values = np.concatenate([top, bottom, left, right])
-  
-  unique_labels = np.unique(border_values)
-  unique_labels = unique_labels[unique_labels != 0]
-  
-  return unique_labels
\ No newline at end of file
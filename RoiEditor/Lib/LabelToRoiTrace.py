@@ -0,0 +1,168 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from numba import njit
+
+from .Roi import Roi
+from .TinyRoiManager import TinyRoiManager
+from .TinyLog import log
+from .RoiClassify import classify, edge_labels
+from .RoiGeometry import chunk_bounds, polygon_geometry
+from .LabelToRoi import label_bounds
+from .Context import gvars
+
+# the 8 neighbours of a pixel, counterclockwise on the screen from the right, as the chain codes of opencv
+_DROW = np.array([0, -1, -1, -1, 0, 1, 1, 1], dtype=np.int64)
+_DCOL = np.array([1, 1, 0, -1, -1, -1, 0, 1], dtype=np.int64)
+
+
+def process_label_image(rm: TinyRoiManager, label_image: np.ndarray, remove_edges: bool = True, remove_small: bool = True, size_threshold: int = 100,
+                        num_threads: Optional[int] = None) -> None:
+    """ the same ROIs as LabelToRoi.process_label_image, without a crop and a cv2.findContours per label:
+        the outer contour of every label is traced on the label image itself, all contours end up in 1 ragged buffer
+    Parameters:
+    - label_image: 2D NumPy-array with integer labels (0 = background)
+    - remove_edges: do labels at the image edge have to be excluded?
+    - remove_small: do small labels < size_threshold have to be excluded?
+    - size_threshold:
+    - num_threads: the labels are traced in chunks on a thread pool, None: gvars["label_to_roi_num_threads"]
+    """
+    if num_threads is None:
+        num_threads = gvars["label_to_roi_num_threads"]
+
+    bounds, counts = label_bounds(label_image)
+    labels, coords, offsets = trace_label_contours(label_image, bounds, counts, num_threads=num_threads)
+    areas = polygon_geometry(coords, offsets, num_threads=num_threads)["area"]
+    edge_set = edge_labels(label_image, remove_edges)
+
+    roi_array = np.full(int(labels[-1]) + 1 if len(labels) else 1, None, dtype=Roi)
+    for i, label in enumerate(labels.tolist()):
+        points = coords[offsets[i]:offsets[i + 1]]
+        if len(points) < 3:
+            log(f"Contour is no polygon for {Roi.label_to_name(label)} : #coords= {len(points)}", type="warning")
+            continue
+        area = float(areas[i])
+        (state, tags) = classify(label, area, edge_set, remove_small, size_threshold)
+        roi_array[label] = Roi(points[:, 0], points[:, 1], label=label, state=state, tags=tags,
+                               bounds=tuple(bounds[label].tolist()),
+                               n=len(points),
+                               area=area)
+
+    rm.add_from_list_unchecked(roi_array)
+
+
+def trace_label_contours(label_image: np.ndarray, bounds: Optional[np.ndarray] = None, counts: Optional[np.ndarray] = None,
+                         num_threads: int = 1) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+        the outer contour of every label, like cv2.findContours(RETR_EXTERNAL, CHAIN_APPROX_SIMPLE) on the mask of that label:
+        through the centres of the border pixels, only the corners, 8-connected
+        a label in more than 1 piece: the contour of the piece with the first pixel in raster order (contours[-1] of opencv)
+        -bounds, counts: as in LabelToRoi.label_bounds, computed when not given
+        returns (labels, coords, offsets): the points (x, y) of labels[i] are coords[offsets[i]:offsets[i+1]]
+        the labels are traced twice, counting and writing, with num_threads > 1 chunks of labels in parallel
+    """
+    if bounds is None or counts is None:
+        bounds, counts = label_bounds(label_image)
+    labels = np.flatnonzero(counts)
+    # chunks with about the same number of pixels
+    pixel_offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum(counts[labels], out=pixel_offsets[1:])
+    chunks = chunk_bounds(pixel_offsets, num_threads) if num_threads > 1 else np.array([0, len(labels)])
+
+    def run(worker):
+        if len(chunks) <= 2:
+            worker(chunks[0], chunks[-1])
+            return
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(worker, chunks[:-1], chunks[1:]))
+
+    num_points = np.zeros(len(labels), dtype=np.int64)
+    run(lambda first, last: _count_contours(label_image, labels[first:last], bounds, num_points[first:last]))
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum(num_points, out=offsets[1:])
+    coords = np.empty((offsets[-1], 2), dtype=np.int32)
+    run(lambda first, last: _write_contours(label_image, labels[first:last], bounds, offsets[first:last + 1], coords))
+    return labels, coords, offsets
+
+
+@njit(nogil=True, cache=True)
+def _count_contours(label_image, labels, bounds, num_points):
+    dummy = np.empty((0, 2), dtype=np.int32)
+    for i in range(len(labels)):
+        num_points[i] = _trace(label_image, labels[i], bounds[labels[i]], dummy, 0, False)
+
+
+@njit(nogil=True, cache=True)
+def _write_contours(label_image, labels, bounds, offsets, coords):
+    for i in range(len(labels)):
+        _trace(label_image, labels[i], bounds[labels[i]], coords, offsets[i], True)
+
+
+@njit(nogil=True, cache=True)
+def _is_label(label_image, row, col, label):
+    return 0 <= row < label_image.shape[0] and 0 <= col < label_image.shape[1] and label_image[row, col] == label
+
+
+@njit(nogil=True, cache=True)
+def _trace(label_image, label, bbox, coords, pos, write):
+    """
+        border following of Suzuki and Abe as in opencv (icvFetchContour), on the pixels == label
+        starts at the first pixel of the label in raster order: on the top row of its bbox
+        only the points where the direction changes are kept (CHAIN_APPROX_SIMPLE)
+        returns the number of points, with write: also stores them in coords[pos:]
+    """
+    row0 = bbox[0]
+    col0 = bbox[1]
+    while label_image[row0, col0] != label:
+        col0 += 1
+
+    # clockwise from the left neighbour to the first neighbour of the label
+    s = 4
+    while True:
+        s = (s - 1) & 7
+        if s == 4 or _is_label(label_image, row0 + _DROW[s], col0 + _DCOL[s], label):
+            break
+    if s == 4:
+        # a single pixel
+        if write:
+            coords[pos, 0] = col0
+            coords[pos, 1] = row0
+        return 1
+
+    row1 = row0 + _DROW[s]
+    col1 = col0 + _DCOL[s]
+    row3 = row0
+    col3 = col0
+    prev_s = s ^ 4
+    n = 0
+    while True:
+        # counterclockwise from the previous point to the next point
+        while True:
+            s = (s + 1) & 7
+            if _is_label(label_image, row3 + _DROW[s], col3 + _DCOL[s], label):
+                break
+        if s != prev_s:
+            if write:
+                coords[pos + n, 0] = col3
+                coords[pos + n, 1] = row3
+            n += 1
+            prev_s = s
+        row4 = row3 + _DROW[s]
+        col4 = col3 + _DCOL[s]
+        if row4 == row0 and col4 == col0 and row3 == row1 and col3 == col1:
+            break
+        row3 = row4
+        col3 = col4
+        s = (s + 4) & 7
+    return n
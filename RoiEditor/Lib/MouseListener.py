@@ -15,7 +15,7 @@ from typing import Callable
 from .Roi import Roi
 from .TinyLog import log
 
-def dummy_callback(str) -> None:
+def dummy_callback(str, changed_rows=None) -> None:
     log("MouseListener: no callback connected")
 
 class ROIClickListener(QObject):
@@ -24,7 +24,6 @@ class ROIClickListener(QObject):
         self.label_array = label_array
         self.roi_window = roi_window
         self.rm = rm
-        self.name_digits = len(str(self.rm.num_of_rois))
         self.height, self.width = label_array.shape
         self.on_any_change=on_any_change
 
@@ -42,25 +41,26 @@ class ROIClickListener(QObject):
                 log("Click outside image bounds")
                 return True
 
-            label_val = int(self.label_array[y, x])
-            if label_val <= 0:
+            # hit-test on the ROI polygons: also right when the ROIs do not match the label image
+            roi = self.rm.get_roi_at(x, y)
+            if roi is None:
                 log("Background clicked")
                 return True
 
-            roi_name = "L" + str(label_val).zfill(self.name_digits)
+            roi_name = roi.name
 
-            state = self.rm.get_state(roi_name)
+            state = roi.state
             if state == Roi.ROI_STATE_DELETED:
                 log(f"ROI {roi_name} already deleted")
                 return True
 
             if a1.modifiers() & Qt.KeyboardModifier.AltModifier:
-                self.rm.delete(roi_name)
-                self.on_any_change(f"Alt + Click → deleting {roi_name}")
+                changed_rows = self.rm.delete(roi)
+                self.on_any_change(f"Alt + Click → deleting {roi_name}", changed_rows)
                 return True
             else:
-                self.rm.toggle(roi_name)
-                self.on_any_change(f"Click → toggling {roi_name}")
+                changed_rows = self.rm.toggle(roi)
+                self.on_any_change(f"Click → toggling {roi_name}", changed_rows)
                 return True
 
         return False
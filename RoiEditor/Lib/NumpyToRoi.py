@@ -16,12 +16,7 @@ from .Roi import Roi
 from .StopWatch import *
 from .TinyRoiManager import TinyRoiManager
 from .TinyLog import log
-
-state_and_tags = {0: (Roi.ROI_STATE_ACTIVE,set()),
-        1: (Roi.ROI_STATE_DELETED, set(["edge.image"])),
-        2: (Roi.ROI_STATE_DELETED,set(["small"])),
-        3: (Roi.ROI_STATE_DELETED, set(["edge.image"]))
-}
+from .RoiClassify import classify, edge_labels
 
 def process_label_image(rm: TinyRoiManager, data: dict, remove_edges: bool = True, remove_small: bool = True, size_threshold: int = 100) -> None:
     """this implementation starts from the outlines image in the dictionary saved by cellpose
@@ -44,9 +39,7 @@ def process_label_image(rm: TinyRoiManager, data: dict, remove_edges: bool = Tru
     masks = data["masks"]
     outlines = data["outlines"]
 
-    edge_set= set()
-    if remove_edges:
-        edge_set = set(get_edge_labels(masks))
+    edge_set = edge_labels(masks, remove_edges)
 
     assert outlines.ndim == 2, "Outlines is not a 2D array"
 
@@ -65,7 +58,6 @@ def process_label_image(rm: TinyRoiManager, data: dict, remove_edges: bool = Tru
     contours, _ = cv2.findContours(cleaned, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
     roi_array = np.full(shape=len(contours)+100,fill_value=None,dtype=Roi)
-    max_digits=len(str( len(roi_array) ))
     corr = np.sqrt(1.00215)
 
 
@@ -107,36 +99,17 @@ def process_label_image(rm: TinyRoiManager, data: dict, remove_edges: bool = Tru
 
         area=cv2.contourArea(contour)
 
-        is_on_edge = label_value in edge_set
-        is_small = remove_small and area < size_threshold
-        key = int(is_on_edge) * 1 + int(is_small) * 2
-        (state, tags) = state_and_tags[key]
-        roi_name: str = f"L{label_value:0{max_digits}d}"
+        (state, tags) = classify(label_value, area, edge_set, remove_small, size_threshold)
 
         roi = Roi(
             xpoints=xpoints,
             ypoints=ypoints,
-            name=roi_name,
+            label=int(label_value),
             state=state,
             tags = tags,
             bounds =(top,left,bottom,right),
-            center =(cx,cy),
             n=n,
             area=area
         )
         roi_array[label_value]=roi
     rm.add_from_list_unchecked(roi_array)
-
-def get_edge_labels(label_image: np.ndarray) -> np.ndarray:
-
-  top = label_image[0, :]
-  bottom = label_image[-1, :]
-  left = label_image[:, 0]
-  right = label_image[:, -1]
-  
-  border_values = np.concatenate([top, bottom, left, right])
-  
-  unique_labels = np.unique(border_values)
-  unique_labels = unique_labels[unique_labels != 0]
-  
-  return unique_labels
\ No newline at end of file
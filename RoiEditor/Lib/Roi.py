@@ -10,56 +10,190 @@ I left the (GitHub) url of the original code next to the derived code.
 
 """
 import numpy as np
-from typing import Optional,Tuple
+from typing import Optional,Tuple,Iterable
 import numpy.typing as npt
 
 import warnings
 warnings.simplefilter("error")
 
-from .Feret import get_values
+from .Feret import get_values, get_values_and_shape_batch
+from .RoiGeometry import polygon_geometry
 
 class Roi:
+    # no __dict__ per instance: there can be 100k's of ROIs
+    __slots__ = ("_store", "_row", "_xpoints", "_ypoints", "_label", "_name", "_state", "_tags",
+                 "_reason_of_selection", "_n", "_bounds", "_center", "_area", "_feret_values", "_shape_values")
+
     ROI_STATE_ACTIVE = 0
     ROI_STATE_DELETED = 255
     ROI_STATE_SELECTED = +1
 
     ROI_STATES = {ROI_STATE_ACTIVE,ROI_STATE_SELECTED,ROI_STATE_DELETED}
 
-    def __init__(self, xpoints: npt.NDArray[np.int_],
-                 ypoints: npt.NDArray[np.int_],
+    # tag sets are interned: all ROIs with the same tags share 1 frozenset
+    _tag_sets: dict[frozenset, frozenset] = {frozenset(): frozenset()}
+
+    def __init__(self, xpoints: npt.NDArray[np.int32],
+                 ypoints: npt.NDArray[np.int32],
                  name: Optional[str] = None,
                  state: Optional[int]= None,
-                 tags: Optional[set[str]]= set(),
+                 tags: Optional[Iterable[str]]= None,
                  bounds: Optional[Tuple[int, int, int, int]] = None,  # (top, left, bottom, right)
                  center: Optional[Tuple[float, float]] = None,      # (cx, cy)
                  n: Optional[int]= None,
-                 area: Optional[float]=None
+                 area: Optional[float]=None,
+                 label: Optional[int]=None
                  ):
 
         assert len(xpoints) == len(ypoints), "Aantal x- en y-punten moet gelijk zijn"
-        self.xpoints: npt.NDArray[np.int_] = xpoints
-        self.ypoints: npt.NDArray[np.int_] = ypoints
-        self.name: str = name or "Polygon"
-        self.state: Optional[int] = state
-        self.tags: Optional[set[str]]= tags
-        self.reason_of_selection:str=None
+        # a Roi is either detached (owns its values) or a view on a row of a RoiStore
+        self._store = None
+        self._row: int = -1
+        self._xpoints: npt.NDArray[np.int32] = Roi.as_coords(xpoints)
+        self._ypoints: npt.NDArray[np.int32] = Roi.as_coords(ypoints)
+        # the label (value in the label image) identifies the ROI, the name "Lxxxx" is derived from it
+        self._label: Optional[int] = label if label is not None else Roi.name_to_label(name)
+        self._name: Optional[str] = name
+        self._state: Optional[int] = state
+        self._tags: frozenset[str] = Roi.intern_tags(tags)
+        self._reason_of_selection:str=None
 
         if n:
-            self.n=n
+            self._n=n
+        else:
+            self._n: int = len(xpoints)
+        self._bounds=bounds
+        self._center=center
+        self._area=area
+        self._feret_values=None
+        self._shape_values=None
+
+    @classmethod
+    def _as_view(cls, store, row: int) -> "Roi":
+        roi = cls.__new__(cls)
+        roi._attach(store, row)
+        return roi
+
+    def _attach(self, store, row: int):
+        self._store = store
+        self._row = row
+        # the values now live in the store
+        self._xpoints = self._ypoints = None
+        self._tags = self._bounds = self._center = self._area = self._feret_values = self._shape_values = None
+
+    def _detach(self):
+        store, row = self._store, self._row
+        self._xpoints = store.xpoints(row).copy()
+        self._ypoints = store.ypoints(row).copy()
+        self._label = int(store.label[row])
+        self._name = store.name(row)
+        self._state = int(store.state[row])
+        self._tags = Roi.intern_tags(store.tags(row))
+        self._reason_of_selection = store.reason(row)
+        self._n = store.n(row)
+        self._area, self._bounds, self._center, self._feret_values, self._shape_values = store.known_geometry(row)
+        self._store = None
+        self._row = -1
+
+    def _known_geometry(self):
+        """the geometry a detached Roi already has: (area, bounds, center, feret, shape), None if unknown"""
+        if self._store is not None:
+            return self._store.known_geometry(self._row)
+        return self._area, self._bounds, self._center, self._feret_values, self._shape_values
+
+    @property
+    def xpoints(self) -> npt.NDArray[np.int32]:
+        if self._store is not None:
+            return self._store.xpoints(self._row)
+        return self._xpoints
+
+    @property
+    def ypoints(self) -> npt.NDArray[np.int32]:
+        if self._store is not None:
+            return self._store.ypoints(self._row)
+        return self._ypoints
+
+    @property
+    def n(self) -> int:
+        if self._store is not None:
+            return self._store.n(self._row)
+        return self._n
+
+    @property
+    def label(self) -> Optional[int]:
+        if self._store is not None:
+            return int(self._store.label[self._row])
+        return self._label
+
+    @label.setter
+    def label(self, value: int):
+        if self._store is not None:
+            self._store.relabel(self._row, value)
+        else:
+            self._label = value
+            self._name = None
+
+    @property
+    def name(self) -> str:
+        if self._store is not None:
+            return self._store.name(self._row)
+        if self._name:
+            return self._name
+        return Roi.label_to_name(self._label) if self._label is not None else "Polygon"
+
+    @name.setter
+    def name(self, value: str):
+        self.label = Roi.name_to_label(value)
+        if self._store is None:
+            self._name = value
+
+    @property
+    def state(self) -> Optional[int]:
+        if self._store is not None:
+            return int(self._store.state[self._row])
+        return self._state
+
+    @state.setter
+    def state(self, value: int):
+        if self._store is not None:
+            self._store.state[self._row] = value
+        else:
+            self._state = value
+
+    @property
+    def tags(self) -> frozenset[str]:
+        if self._store is not None:
+            return self._store.tags(self._row)
+        return self._tags
+
+    @tags.setter
+    def tags(self, value: Optional[Iterable[str]]):
+        if self._store is not None:
+            self._store.set_tags(self._row, value)
+        else:
+            self._tags = Roi.intern_tags(value)
+
+    @property
+    def reason_of_selection(self) -> str:
+        if self._store is not None:
+            return self._store.reason(self._row)
+        return self._reason_of_selection
+
+    @reason_of_selection.setter
+    def reason_of_selection(self, value: str):
+        if self._store is not None:
+            self._store.set_reason(self._row, value)
         else:
-            self.n: int = len(xpoints)
-        if bounds:
-            self._bounds=bounds
-        if center:
-            self._center=center
-        if area:
-            self._area=area
+            self._reason_of_selection = value
 
     @property
     def area(self) -> float:
-        if not hasattr(self, '_area') or self._area is None:
-            x = np.asarray(self.xpoints)
-            y = np.asarray(self.ypoints)
+        if self._store is not None:
+            return self._store.area(self._row)
+        if self._area is None:
+            # int64: the products overflow int32 on large images
+            x = np.asarray(self.xpoints, dtype=np.int64)
+            y = np.asarray(self.ypoints, dtype=np.int64)
             R1= np.dot(x, np.roll(y, 1))
             R2= np.dot(y, np.roll(x, 1))
             self._area = 0.5 * np.abs( R1-R2 )
@@ -69,32 +203,94 @@ class Roi:
 
     @property
     def bounds(self) -> Tuple[int, int, int, int]:
-        if not hasattr(self, '_bounds') or self._bounds is None:
+        if self._store is not None:
+            return self._store.bounds(self._row)
+        if self._bounds is None:
             #(top, left, bottom, right)
             self._bounds=(np.min(self.ypoints), np.min(self.xpoints), np.max(self.ypoints), np.max(self.xpoints))
         return self._bounds
     
     @property
     def center(self) -> Tuple[int, int]:
-        if not hasattr(self, '_box') or self._center is None:
-            # (cx,cy)
+        if self._store is not None:
+            return self._store.center(self._row)
+        if self._center is None:
+            # (cx,cy): mean of the vertices
             self._center=(np.mean(self.xpoints),np.mean(self.ypoints))
         return self._center
 
-    
+
+    @property
+    def centroid(self) -> Tuple[float, float]:
+        """area weighted centroid (cx,cy) of the polygon"""
+        if self._store is not None:
+            return self._store.centroid(self._row)
+        points = np.column_stack((self.xpoints, self.ypoints))
+        cx, cy = polygon_geometry(points, np.array([0, len(points)]))["centroid"][0]
+        return (float(cx), float(cy))
+
     @property
     def feret_values(self):
-        if not hasattr(self, '_feret_values') or self._feret_values is None:
+        if self._store is not None:
+            return self._store.feret(self._row)
+        if self._feret_values is None:
             self._feret_values = get_values(self.xpoints, self.ypoints)
         return self._feret_values
 
     @feret_values.setter
     def feret_values(self, value: np.ndarray):
-        self._feret_values = value
+        if self._store is not None:
+            self._store.set_feret(self._row, value)
+        else:
+            self._feret_values = value
+
+    @property
+    def shape_values(self) -> np.ndarray:
+        """the shape descriptors, columns as in Feret.shape_index"""
+        if self._store is not None:
+            return self._store.shape(self._row)
+        if self._shape_values is None:
+            points = np.column_stack((self.xpoints, self.ypoints))
+            feret, shape = get_values_and_shape_batch(points, np.array([0, len(points)]))
+            if self._feret_values is None:
+                self._feret_values = feret[0]
+            self._shape_values = shape[0]
+        return self._shape_values
+
+    @shape_values.setter
+    def shape_values(self, value: np.ndarray):
+        if self._store is not None:
+            self._store.set_shape(self._row, value)
+        else:
+            self._shape_values = value
 
     def __repr__(self):
         return f"<Roi name={self.name} state={self.state}  tags={self.tags}>"
     
+    @staticmethod
+    def as_coords(points) -> np.ndarray:
+        """integer coordinates are kept as int32, like in the RoiStore"""
+        points = np.asarray(points)
+        if points.dtype.kind in "iu":
+            return points.astype(np.int32, copy=False)
+        return points
+
+    @staticmethod
+    def intern_tags(tags: Optional[Iterable[str]]) -> frozenset[str]:
+        key = frozenset(tags) if tags else frozenset()
+        return Roi._tag_sets.setdefault(key, key)
+
+    @staticmethod
+    def label_to_name(label: int, num_digits: int = 0) -> str:
+        return f"L{label:0{num_digits}d}"
+
+    @staticmethod
+    def name_to_label(name: Optional[str]) -> Optional[int]:
+        """the label in a name like L0042, None for any other name"""
+        if name and name.startswith("L") and name[1:].isdigit():
+            return int(name[1:])
+        return None
+
     @staticmethod
     def state_to_str(state):
         if state == Roi.ROI_STATE_DELETED:
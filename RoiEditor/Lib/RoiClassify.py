@@ -0,0 +1,46 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+import numpy as np
+
+from .Roi import Roi
+
+# the state and tags of a new ROI, key: 1 * on the edge of the image + 2 * small
+state_and_tags = {0: (Roi.ROI_STATE_ACTIVE,set()),
+        1: (Roi.ROI_STATE_DELETED, set(["edge.image"])),
+        2: (Roi.ROI_STATE_DELETED,set(["small"])),
+        3: (Roi.ROI_STATE_DELETED, set(["edge.image"]))
+}
+
+def classify(label: int, area: float, edge_set: set, remove_small: bool, size_threshold: int) -> tuple[int, set]:
+    """ (state, tags) of a new ROI: a ROI on the edge of the image or a small ROI starts deleted
+        -edge_set: the labels on the edge, empty if they are not removed (see edge_labels)
+    """
+    is_on_edge = label in edge_set
+    is_small = remove_small and area < size_threshold
+    key = int(is_on_edge) * 1 + int(is_small) * 2
+    return state_and_tags[key]
+
+def edge_labels(label_image, remove_edges: bool = True) -> set:
+    return set(get_edge_labels(label_image)) if remove_edges else set()
+
+def get_edge_labels(label_image) -> np.ndarray:
+    """ the labels on the 4 borders of the image
+        only the borders are read: the label_image can also be a np.memmap or a LabelSource.TiffTileReader
+    """
+    height, width = label_image.shape[:2]
+    borders = (label_image[0:1, :], label_image[height-1:height, :], label_image[:, 0:1], label_image[:, width-1:width])
+    border_values = np.concatenate([np.asarray(values).ravel() for values in borders])
+
+    unique_labels = np.unique(border_values)
+    unique_labels = unique_labels[unique_labels != 0]
+
+    return unique_labels
@@ -342,6 +342,18 @@ class RoiEditorControlPanel(QMainWindow):
             return
         self.workbench.on_delete_key_pressed(argument)
 
+    def on_undo(self,argument):
+        if not self.workbench:
+            log("No files opened",type="warning")
+            return
+        self.workbench.on_undo(argument)
+
+    def on_redo(self,argument):
+        if not self.workbench:
+            log("No files opened",type="warning")
+            return
+        self.workbench.on_redo(argument)
+
     def on_f1_key_pressed(self,argument):
         if not self.workbench:
             log("No files opened",type="warning")
@@ -433,7 +445,9 @@ class RoiEditorControlPanel(QMainWindow):
 
         interceptor_key_action = {      Qt.Key.Key_Escape: (self.on_escape_key_pressed,None, True),
                                         Qt.Key.Key_Delete: (self.on_delete_key_pressed,None, True),
-                                        Qt.Key.Key_F1: (self.on_f1_key_pressed,None, True)
+                                        Qt.Key.Key_F1: (self.on_f1_key_pressed,None, True),
+                                        (Qt.Key.Key_Z, Qt.KeyboardModifier.ControlModifier): (self.on_undo,None, True),
+                                        (Qt.Key.Key_Y, Qt.KeyboardModifier.ControlModifier): (self.on_redo,None, True)
             }
         for name,label in key_to_label_map.items():
             interceptor_key_action[name_to_code[name]] = (self.on_tagged_delete,label,True)
@@ -0,0 +1,82 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def ragged_index(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """starts[0]..starts[0]+counts[0]-1, starts[1]..starts[1]+counts[1]-1,... in 1 array"""
+    total = int(counts.sum())
+    shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return shift + np.arange(total)
+
+
+def chunk_bounds(offsets: np.ndarray, num_chunks: int) -> np.ndarray:
+    """
+        splits the polygons in chunks with about the same number of points
+        chunk k holds the polygons chunks[k]..chunks[k+1]-1
+    """
+    num = len(offsets) - 1
+    targets = np.linspace(offsets[0], offsets[-1], max(num_chunks, 1) + 1)[1:-1]
+    return np.unique(np.concatenate(([0], np.searchsorted(offsets, targets), [num])))
+
+
+def polygon_geometry(coords: np.ndarray, offsets: np.ndarray, num_threads: int = 1) -> dict[str, np.ndarray]:
+    """
+        geometry of many polygons in 1 pass over a ragged coordinate buffer
+        the points of polygon i are coords[offsets[i]:offsets[i+1]] (x,y), every polygon has at least 1 point
+        returns per polygon:
+            area: shoelace area
+            center: mean of the vertices (cx, cy)
+            centroid: area weighted centroid (cx, cy), the center for polygons without area
+            bounds: (top, left, bottom, right), inclusive
+        with num_threads > 1 chunks of polygons are done in parallel, every polygon is computed
+        on its own: the result does not depend on the number of threads
+    """
+    chunks = chunk_bounds(offsets, num_threads) if num_threads > 1 else np.array([0, len(offsets) - 1])
+    if len(chunks) <= 2:
+        return _polygon_geometry(coords, offsets)
+
+    def worker(first, last):
+        return _polygon_geometry(coords[offsets[first]:offsets[last]], offsets[first:last + 1] - offsets[first])
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        parts = list(executor.map(worker, chunks[:-1], chunks[1:]))
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+def _polygon_geometry(coords: np.ndarray, offsets: np.ndarray) -> dict[str, np.ndarray]:
+    starts = offsets[:-1]
+    counts = np.diff(offsets)
+    # int64: the shoelace products overflow int32 on large images
+    x = coords[:, 0].astype(np.int64)
+    y = coords[:, 1].astype(np.int64)
+
+    # index of the next point, wrapping around at the end of each polygon
+    nxt = np.arange(1, len(x) + 1)
+    nxt[offsets[1:] - 1] = starts
+    cross = x * y[nxt] - x[nxt] * y
+
+    signed_area = 0.5 * np.add.reduceat(cross, starts)
+    center = np.column_stack((np.add.reduceat(x, starts) / counts, np.add.reduceat(y, starts) / counts))
+
+    centroid = center.copy()
+    has_area = signed_area != 0
+    if has_area.any():
+        cx = np.add.reduceat((x + x[nxt]) * cross, starts)
+        cy = np.add.reduceat((y + y[nxt]) * cross, starts)
+        centroid[has_area, 0] = cx[has_area] / (6.0 * signed_area[has_area])
+        centroid[has_area, 1] = cy[has_area] / (6.0 * signed_area[has_area])
+
+    bounds = np.column_stack((np.minimum.reduceat(y, starts), np.minimum.reduceat(x, starts),
+                              np.maximum.reduceat(y, starts), np.maximum.reduceat(x, starts)))
+    return {"area": np.abs(signed_area), "center": center, "centroid": centroid, "bounds": bounds}
@@ -129,6 +129,8 @@ class RoiImageWindow(QMainWindow):
 
         self._roi_polygon_cache: Dict[Roi, QGraphicsPolygonItem] = {}
         self._roi_text_cache: Dict[Roi,QGraphicsTextItem] = {}
+        # (roi, polygon, text) in the row order of the ROI manager
+        self._row_items: list[tuple[Roi, QGraphicsPolygonItem, QGraphicsTextItem]] = []
         self.selected_measurement=None
 
 
@@ -158,9 +160,8 @@ class RoiImageWindow(QMainWindow):
 
 
     def _on_rect_drawn(self,rect):
-        self.rm.select_within(rect, additive=True)
-        self.draw_image()
-        self.on_any_change("Rectangle select")
+        changed_rows = self.rm.select_within(rect, additive=True)
+        self.on_any_change("Rectangle select", changed_rows)
 
     def on_select_measurement(self,msmt_name :str):
         if self.selected_measurement != msmt_name:
@@ -173,6 +174,7 @@ class RoiImageWindow(QMainWindow):
 
         self._roi_polygon_cache.clear()
         self._roi_text_cache.clear()
+        self._row_items.clear()
 
         #text = QGraphicsTextItem("L0001")
         roi_sample = self.rm.get_sample()
@@ -196,6 +198,7 @@ class RoiImageWindow(QMainWindow):
             text.setZValue(self.z_on_top)
             text.setPos(cx - bw2, cy - bh2)
             self._roi_text_cache[roi]=text
+            self._row_items.append((roi, item, text))
 
 
         for item in self._roi_polygon_cache.values():
@@ -205,37 +208,38 @@ class RoiImageWindow(QMainWindow):
 
 
 
-    def _update_scene(self):
+    def _update_scene(self, rows=None):
         dict_roi_visibility_fn={True : (lambda roi: True),
                            False: (lambda roi: roi.state != Roi.ROI_STATE_DELETED)}
         deleted_visible = gvars.get("show_deleted", True)
         roi_visibility_fn=dict_roi_visibility_fn[deleted_visible]
         text_visible = gvars.get("show_names", True)
         show_overlay = self.selected_measurement and gvars.get("show_overlay", True)
-        for roi, text in self._roi_text_cache.items():
-             text.setVisible(text_visible and roi_visibility_fn(roi))
-        if show_overlay:
-            for roi, item  in self._roi_polygon_cache.items():
-                style = self.state_style_map[roi.state]
-                item.setPen(style["pen"])
-                item.setZValue(style["z"])
-                item.setVisible(roi_visibility_fn(roi))
-                item.setBrush(self.msmts.qbrush["ALL"][self.selected_measurement][self.msmts.idx["ALL"][roi]])
+        if rows is None:
+            row_items = self._row_items
         else:
-            for roi, item  in self._roi_polygon_cache.items():
-                style = self.state_style_map[roi.state]
-                item.setPen(style["pen"])
-                item.setZValue(style["z"])
-                item.setVisible(roi_visibility_fn(roi))
-                item.setBrush(self.transparent)
+            row_items = [self._row_items[row] for row in rows]
+        if show_overlay:
+            qbrush = self.msmts.qbrush["ALL"][self.selected_measurement]
+            idx = self.msmts.idx["ALL"]
+        for roi, item, text in row_items:
+            visible = roi_visibility_fn(roi)
+            text.setVisible(text_visible and visible)
+            style = self.state_style_map[roi.state]
+            item.setPen(style["pen"])
+            item.setZValue(style["z"])
+            item.setVisible(visible)
+            item.setBrush(qbrush[idx[roi]] if show_overlay else self.transparent)
 
 
-    def draw_image(self):
+    def draw_image(self, rows=None):
+        """redraws all ROIs or only the ROIs in the given rows of the ROI manager"""
 
         if not self._roi_polygon_cache and self.rm:
             self._build_and_add_items()
+            rows = None
 
-        self._update_scene()
+        self._update_scene(rows)
 
         from PyQt6.QtCore import QTimer
         if not self.initialized:
@@ -0,0 +1,222 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+from typing import Optional, BinaryIO
+from collections import deque
+import json
+import os
+import threading
+import numpy as np
+
+from .RoiStore import RoiStore
+from .TinyLog import log
+
+
+class RoiJournal:
+    """
+        append-only journal of the state, tag and reason changes made through a TinyRoiManager
+        -1 action (keypress, click,...) == 1 transaction == 1 array of DELTA_DTYPE records, 1 record per changed ROI
+        -tags and reasons are written as the interned ids of the store, the first time an id is used
+         its tag set/reason is written to the file too
+        -the in-memory transactions drive undo/redo, the file allows to replay the changes on top of the last full save
+        -a full save that is written on a thread only becomes the base once it is on disk (start_after),
+         till then the journal keeps its file and the previous base
+        file layout: frames of 1 byte kind + uint32 length + payload
+            B: path of the base ROI zip (utf-8)
+            T: uint32 tag id + json list of tags
+            R: uint32 reason id + reason (utf-8)
+            D: 1 transaction, DELTA_DTYPE records
+    """
+    DELTA_DTYPE = np.dtype([("label", "<i4"),
+                            ("old_state", "u1"), ("new_state", "u1"),
+                            ("old_tags", "<u4"), ("new_tags", "<u4"),
+                            ("old_reason", "<u4"), ("new_reason", "<u4")])
+    FRAME_HEADER = np.dtype([("kind", "S1"), ("length", "<u4")])
+
+    def __init__(self, max_undo: int = 1000):
+        self._file: Optional[BinaryIO] = None
+        self.path: Optional[str] = None
+        self._undo: deque[np.ndarray] = deque(maxlen=max_undo)
+        self._redo: list[np.ndarray] = []
+        self._written_tags: set[int] = set()
+        self._written_reasons: set[int] = set()
+        # a full save that is still being written: (thread, path, base, store, transactions since the save)
+        self._pending: Optional[tuple[threading.Thread, str, str, RoiStore, list[np.ndarray]]] = None
+
+    # file
+    def start(self, path: str, base: str):
+        """(re)starts the journal file on top of the full save in base"""
+        self._pending = None
+        self.close()
+        self.path = path
+        self._file = open(path, "wb")
+        self._written_tags = {0}
+        self._written_reasons = {0}
+        self._write_frame(b"B", base.encode("utf-8"))
+
+    def start_after(self, save: threading.Thread, path: str, base: str, store: RoiStore):
+        """
+            restarts the journal on top of the full save in base once the thread that writes it is done
+            -till then a crash replays the current file on the previous base: nothing is truncated before base is on disk
+            -the changes made after the save was taken are written again to the new file
+        """
+        self._pending = (save, path, base, store, [])
+        self._switch()
+
+    def _switch(self, wait: bool = False):
+        """moves the journal to the pending full save when it is written"""
+        if self._pending is None:
+            return
+        save, path, base, store, transactions = self._pending
+        if wait:
+            save.join()
+        if save.is_alive():
+            return
+        self._pending = None
+        if not os.path.exists(base):
+            log(f"Journal: {base} was not written, the journal stays on top of the previous save", type="error")
+            return
+        self.start(path, base)
+        for delta in transactions:
+            self._write(store, delta)
+
+    def wait_for_save(self):
+        """waits until a pending full save is written and the journal is on top of it"""
+        self._switch(wait=True)
+
+    def close(self, remove: bool = False):
+        """closes the file after a pending full save is written, remove: the changes are saved, the file is no longer needed"""
+        self._switch(wait=True)
+        if self._file:
+            self._file.close()
+            self._file = None
+            if remove and self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def clear(self):
+        """forgets undo/redo history, e.g. when a new set of ROIs is loaded"""
+        self._undo.clear()
+        self._redo.clear()
+
+    def _write_frame(self, kind: bytes, payload: bytes):
+        header = np.array([(kind, len(payload))], dtype=self.FRAME_HEADER)
+        self._file.write(header.tobytes() + payload)
+
+    def _write(self, store: RoiStore, delta: np.ndarray):
+        self._switch()
+        if self._pending is not None:
+            self._pending[4].append(delta)
+        if not self._file:
+            return
+        for tag_id in np.unique(np.concatenate((delta["old_tags"], delta["new_tags"]))):
+            if int(tag_id) not in self._written_tags:
+                tags = json.dumps(sorted(store.tag_set(tag_id)))
+                self._write_frame(b"T", np.uint32(tag_id).tobytes() + tags.encode("utf-8"))
+                self._written_tags.add(int(tag_id))
+        for reason_id in np.unique(np.concatenate((delta["old_reason"], delta["new_reason"]))):
+            if int(reason_id) not in self._written_reasons:
+                self._write_frame(b"R", np.uint32(reason_id).tobytes() + store.reason_text(reason_id).encode("utf-8"))
+                self._written_reasons.add(int(reason_id))
+        self._write_frame(b"D", delta.tobytes())
+        # no fsync: a crash of the program does not lose what the OS already got
+        self._file.flush()
+
+    # transactions
+    def record(self, store: RoiStore, rows: np.ndarray, old_state: np.ndarray, old_tags: np.ndarray, old_reason: np.ndarray):
+        """
+            records the changes of the given rows, old_state/old_tags/old_reason are their values before the change
+            -a row that is given more than once keeps its first (oldest) values
+            -rows that end up unchanged are left out
+        """
+        rows, first = np.unique(rows, return_index=True)
+        old_state, old_tags, old_reason = old_state[first], old_tags[first], old_reason[first]
+        state, tags, reason = store.state[rows], store.tag_id[rows], store.reason_id[rows]
+        changed = (state != old_state) | (tags != old_tags) | (reason != old_reason)
+        if not changed.any():
+            return
+        delta = np.empty(int(changed.sum()), dtype=self.DELTA_DTYPE)
+        delta["label"] = store.label[rows[changed]]
+        delta["old_state"] = old_state[changed]
+        delta["new_state"] = state[changed]
+        delta["old_tags"] = old_tags[changed]
+        delta["new_tags"] = tags[changed]
+        delta["old_reason"] = old_reason[changed]
+        delta["new_reason"] = reason[changed]
+        self._undo.append(delta)
+        self._redo.clear()
+        self._write(store, delta)
+
+    @staticmethod
+    def inverse(delta: np.ndarray) -> np.ndarray:
+        inverse = delta.copy()
+        for field in ("state", "tags", "reason"):
+            inverse["old_" + field] = delta["new_" + field]
+            inverse["new_" + field] = delta["old_" + field]
+        return inverse
+
+    def undo(self, store: RoiStore) -> Optional[np.ndarray]:
+        """the transaction that undoes the last one, None if there is nothing to undo"""
+        if not self._undo:
+            return None
+        delta = self._undo.pop()
+        self._redo.append(delta)
+        inverse = RoiJournal.inverse(delta)
+        self._write(store, inverse)
+        return inverse
+
+    def redo(self, store: RoiStore) -> Optional[np.ndarray]:
+        """the last undone transaction, None if there is nothing to redo"""
+        if not self._redo:
+            return None
+        delta = self._redo.pop()
+        self._undo.append(delta)
+        self._write(store, delta)
+        return delta
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    # recovery
+    @staticmethod
+    def read(path: str) -> tuple[Optional[str], list[np.ndarray], dict[int, frozenset], dict[int, str]]:
+        """
+            the base zip, the transactions and the tag sets/reasons the ids in the transactions refer to
+            an incomplete last frame (crash while writing) is skipped
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        base = None
+        tag_sets: dict[int, frozenset] = {0: frozenset()}
+        reasons: dict[int, str] = {0: ""}
+        transactions = []
+        header_size = RoiJournal.FRAME_HEADER.itemsize
+        pos = 0
+        while pos + header_size <= len(data):
+            kind, length = np.frombuffer(data, dtype=RoiJournal.FRAME_HEADER, count=1, offset=pos)[0]
+            payload = data[pos + header_size:pos + header_size + int(length)]
+            if len(payload) < length:
+                log(f"Journal {path}: incomplete last change skipped", type="warning")
+                break
+            pos += header_size + int(length)
+            if kind == b"B":
+                base = payload.decode("utf-8")
+            elif kind == b"T":
+                tag_sets[int(np.frombuffer(payload[:4], dtype="<u4")[0])] = frozenset(json.loads(payload[4:].decode("utf-8")))
+            elif kind == b"R":
+                reasons[int(np.frombuffer(payload[:4], dtype="<u4")[0])] = payload[4:].decode("utf-8")
+            elif kind == b"D":
+                transactions.append(np.frombuffer(payload, dtype=RoiJournal.DELTA_DTYPE))
+        return base, transactions, tag_sets, reasons
@@ -20,6 +20,8 @@ from .Roi import Roi
 from .TinyLog import log
 from .TinyColor import map_values_to_qbrush
 from .Feret import feret_msmts,feret_quantities,feret_units,feret_scalers
+from .Feret import shape_msmts,shape_quantities,shape_units,shape_scalers
+from .LabelMoments import moments_msmts,moments_quantities,moments_units,moments_scalers
 
 from .MsmtToFile import attach_extension_methods
 
@@ -29,12 +31,12 @@ class RoiMeasurements(QObject):
         calculates the measurement values, calculates statistics
         saves the numbers to a .csv file
     """
-    measurement_names_wo_area = feret_msmts
+    measurement_names_wo_area = feret_msmts + shape_msmts + moments_msmts
 
-    measurement_names = ["Area"] + feret_msmts
-    measurement_quantities = ["area"] + feret_quantities
-    measurement_units= ["px"] + feret_units
-    measurement_scalers = [1.0*1.0] + feret_scalers
+    measurement_names = ["Area"] + feret_msmts + shape_msmts + moments_msmts
+    measurement_quantities = ["area"] + feret_quantities + shape_quantities + moments_quantities
+    measurement_units= ["px"] + feret_units + shape_units + moments_units
+    measurement_scalers = [1.0*1.0] + feret_scalers + shape_scalers + moments_scalers
 
     default_unit_and_scale = {"length": {"scaler": 1.0, "unit": "px"},"area": {"scaler": 1.0*1.0, "unit": "px"}}
 
@@ -166,18 +166,11 @@ def select_outer_rois_vdb5(rm: TinyRoiManager, filtered_label_image: np.ndarray)
     roi_labels_on_edge = roi_labels_on_edge[roi_labels_on_edge > 0]  # verwijder achtergrond
 
     # Step 5: convert label idx to actual ROIs
-    selected_rois =[]
-    for label in roi_labels_on_edge:
-        roi =rm.get_roi(rm.idx_to_name(label))
-        if roi:
-            selected_rois.append(roi)
-        else:
-            log(f"No roi found for label: {label}/{rm.idx_to_name(label)}",type="warning")
-
-    selected_rois = np.array(selected_rois)
-
-    #selected_rois = np.array([rm.get_roi(rm.idx_to_name(label)) for label in roi_labels_on_edge])
+    found = rm.store.rows_of_labels(roi_labels_on_edge) >= 0
+    for label in roi_labels_on_edge[~found]:
+        log(f"No roi found for label: {label}/{rm.idx_to_name(label)}",type="warning")
+    selected_labels = roi_labels_on_edge[found]
 
     # Step 6: select ROIs
-    rm.select(selected_rois, reason_of_selection="edge.outer", additive=True)
-    log(f"Selected {len(selected_rois)} ROIs from outer contour.")
+    rm.select(selected_labels, reason_of_selection="edge.outer", additive=True)
+    log(f"Selected {len(selected_labels)} ROIs from outer contour.")
@@ -0,0 +1,150 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from numba import njit
+
+from .RoiGeometry import chunk_bounds
+from .RoiStore import RoiStore
+from .TinyLog import log
+from .Feret import feret_index, get_values_batch
+
+
+def simplify_batch(coords: np.ndarray, offsets: np.ndarray, tolerance: float, num_threads: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Douglas-Peucker simplification of many closed polygons in a ragged coordinate buffer
+        the points of polygon i are coords[offsets[i]:offsets[i+1]] (x,y)
+        -a point is dropped when it lies within tolerance pixels of the line through the points that are kept
+        -the points that are kept are original points, in their original order
+        -a polygon that would keep less than 3 points is kept as it is
+        returns (coords, offsets) of the simplified polygons
+    """
+    keep = np.zeros(len(coords), dtype=np.bool_)
+    chunks = chunk_bounds(offsets, 4 * num_threads) if num_threads > 1 else np.array([0, len(offsets) - 1])
+
+    def worker(first, last):
+        a, b = offsets[first], offsets[last]
+        _simplify(coords[a:b], offsets[first:last + 1] - a, float(tolerance)**2, keep[a:b])
+
+    if len(chunks) <= 2:
+        worker(chunks[0], chunks[-1])
+    else:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(worker, chunks[:-1], chunks[1:]))
+
+    kept = np.zeros(len(coords) + 1, dtype=np.int64)
+    np.cumsum(keep, out=kept[1:])
+    return coords[keep], kept[offsets]
+
+
+@njit(nogil=True, cache=True)
+def _simplify(coords, offsets, tolerance2, keep):
+    max_count = 0
+    for i in range(len(offsets) - 1):
+        max_count = max(max_count, offsets[i + 1] - offsets[i])
+    # (first, last) chains still to split, last == end of the polygon means the first point again
+    stack = np.empty((max_count + 1, 2), dtype=np.int64)
+    for i in range(len(offsets) - 1):
+        a, b = offsets[i], offsets[i + 1]
+        if b - a <= 3:
+            keep[a:b] = True
+            continue
+        # the point farthest from the first point splits the closed polygon in 2 chains
+        x0, y0 = coords[a, 0], coords[a, 1]
+        far, best = a, -1
+        for j in range(a + 1, b):
+            dx, dy = coords[j, 0] - x0, coords[j, 1] - y0
+            d = dx*dx + dy*dy
+            if d > best:
+                far, best = j, d
+        keep[a] = True
+        keep[far] = True
+        top = 0
+        stack[top, 0], stack[top, 1] = a, far
+        top += 1
+        stack[top, 0], stack[top, 1] = far, b
+        top += 1
+        while top:
+            top -= 1
+            s, e = stack[top, 0], stack[top, 1]
+            if e - s < 2:
+                continue
+            xs, ys = float(coords[s, 0]), float(coords[s, 1])
+            end = e if e < b else a
+            dx, dy = float(coords[end, 0]) - xs, float(coords[end, 1]) - ys
+            length2 = dx*dx + dy*dy
+            worst, worst_d = -1, -1.0
+            for j in range(s + 1, e):
+                px, py = coords[j, 0] - xs, coords[j, 1] - ys
+                if length2 > 0:
+                    # squared distance to the line, times length2
+                    cross = dx*py - dy*px
+                    d = cross*cross
+                else:
+                    d = px*px + py*py
+                if d > worst_d:
+                    worst, worst_d = j, d
+            if worst_d > tolerance2 * (length2 if length2 > 0 else 1.0):
+                keep[worst] = True
+                stack[top, 0], stack[top, 1] = s, worst
+                top += 1
+                stack[top, 0], stack[top, 1] = worst, e
+                top += 1
+        num_kept = 0
+        for j in range(a, b):
+            if keep[j]:
+                num_kept += 1
+        if num_kept < 3:
+            keep[a:b] = True
+
+
+def simplify_rois(store: RoiStore, tolerance: float, feret_sample: int = 0) -> dict[str, float]:
+    """
+        simplifies all ROIs of the store in 1 batch and logs what it did
+        the bounds, area, Feret values and shape descriptors of the simplified ROIs are computed again when asked for
+        returns the statistics:
+        -num_points, num_points_simplified: number of vertices before and after
+        -area_error_mean, area_error_max: relative change of the area
+        -feret_error_mean, feret_error_max: relative change of the (max) Feret diameter of feret_sample ROIs
+         spread over the store, only when feret_sample > 0: Feret is the expensive part, not worth a pass over all ROIs
+        -time: ms for the simplification itself
+    """
+    if not len(store) or tolerance <= 0:
+        return {}
+    areas = store.areas().copy()
+    sample = np.unique(np.linspace(0, len(store) - 1, min(feret_sample, len(store))).astype(np.int64))
+    ferets = get_values_batch(*store.coords_of(sample))[:, feret_index["Feret"]].astype(np.float64)
+    num_points = len(store.coords)
+
+    start = time.perf_counter()
+    coords, offsets = simplify_batch(store.coords, store.offsets, tolerance, num_threads=store.num_threads)
+    store.set_coords(coords, offsets)
+    time_ms = (time.perf_counter() - start) * 1000.0
+
+    def relative_error(new, old):
+        error = np.abs(new - old) / np.where(old > 0, old, 1.0)
+        return float(error.mean()), float(error.max())
+
+    stats = {"num_points": num_points, "num_points_simplified": len(store.coords), "time": time_ms}
+    stats["area_error_mean"], stats["area_error_max"] = relative_error(store.areas(), areas)
+    log(f"simplified {len(store)} ROIs with a tolerance of {tolerance} pixels in {time_ms:.0f} milliseconds: "
+        f"{stats['num_points']} -> {stats['num_points_simplified']} points")
+    log(f"relative error of the area: mean {stats['area_error_mean']:.2%}, max {stats['area_error_max']:.2%}")
+    if len(sample):
+        # the sampled ROIs keep their Feret values, they are needed for the measurements anyway
+        store.fill_feret(sample)
+        simplified = np.array([store.feret(row)[feret_index["Feret"]] for row in sample])
+        stats["feret_error_mean"], stats["feret_error_max"] = relative_error(simplified, ferets)
+        log(f"relative error of the Feret diameter ({len(sample)} ROIs): "
+            f"mean {stats['feret_error_mean']:.2%}, max {stats['feret_error_max']:.2%}")
+    return stats
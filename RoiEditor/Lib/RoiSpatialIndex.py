@@ -0,0 +1,125 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+from typing import Optional
+import numpy as np
+import cv2
+
+from .RoiStore import RoiStore
+
+
+class RoiSpatialIndex:
+    """
+        uniform grid over the bounds column of a RoiStore
+        -every ROI is registered in each grid cell its bounding box overlaps,
+         CSR layout: the rows in cell c are cell_rows[cell_offsets[c]:cell_offsets[c+1]]
+        -a query only tests the ROIs registered in the cells it overlaps
+        -ROIs added or replaced after the build are kept as pending rows that every query tests,
+         the grid is rebuilt once there are too many of them
+        bounds are (top, left, bottom, right), all inclusive, like in the store
+    """
+
+    def __init__(self, store: RoiStore, cell_size: Optional[int] = None):
+        self.store: RoiStore = store
+        self.rebuild(cell_size)
+
+    def rebuild(self, cell_size: Optional[int] = None):
+        bounds = self.store.all_bounds().astype(np.int64)
+        n = len(bounds)
+        top, left, bottom, right = bounds.T
+        if cell_size is None:
+            # about 2 ROIs per cell side: most ROIs overlap at most 4 cells
+            extent = np.maximum(bottom - top, right - left) + 1
+            cell_size = max(8, 2 * int(np.median(extent))) if n else 8
+        self.cell_size: int = cell_size
+        self._num_indexed: int = n
+        self._stale = np.zeros(n, dtype=bool)
+        self._pending: list[int] = []
+
+        if n == 0:
+            self._y0 = self._x0 = 0
+            self._num_cell_rows = self._num_cell_cols = 0
+            self._cell_offsets = np.zeros(1, dtype=np.int64)
+            self._cell_rows = np.empty(0, dtype=np.int64)
+            return
+
+        self._y0, self._x0 = int(top.min()), int(left.min())
+        r0 = (top - self._y0) // cell_size
+        r1 = (bottom - self._y0) // cell_size
+        c0 = (left - self._x0) // cell_size
+        c1 = (right - self._x0) // cell_size
+        self._num_cell_rows = int(r1.max()) + 1
+        self._num_cell_cols = int(c1.max()) + 1
+
+        # one entry per (ROI, overlapped cell)
+        nx = c1 - c0 + 1
+        counts = (r1 - r0 + 1) * nx
+        total = int(counts.sum())
+        rows = np.repeat(np.arange(n), counts)
+        k = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        nx = np.repeat(nx, counts)
+        cells = (np.repeat(r0, counts) + k // nx) * self._num_cell_cols + np.repeat(c0, counts) + k % nx
+
+        order = np.argsort(cells, kind="stable")
+        self._cell_rows = rows[order]
+        num_cells = self._num_cell_rows * self._num_cell_cols
+        self._cell_offsets = np.zeros(num_cells + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=num_cells), out=self._cell_offsets[1:])
+
+    def update(self, rows):
+        """the bounds of these rows changed or they were appended to the store"""
+        for row in np.atleast_1d(rows):
+            row = int(row)
+            if row < self._num_indexed:
+                self._stale[row] = True
+            self._pending.append(row)
+        if len(self._pending) > max(64, self._num_indexed // 8):
+            self.rebuild(self.cell_size)
+
+    def _candidates(self, top: int, left: int, bottom: int, right: int) -> np.ndarray:
+        parts = []
+        if self._num_indexed:
+            cs = self.cell_size
+            r0 = max((top - self._y0) // cs, 0)
+            r1 = min((bottom - self._y0) // cs, self._num_cell_rows - 1)
+            c0 = max((left - self._x0) // cs, 0)
+            c1 = min((right - self._x0) // cs, self._num_cell_cols - 1)
+            # the cells of 1 grid row are contiguous in the CSR buffer
+            for r in range(r0, r1 + 1):
+                first = r * self._num_cell_cols
+                parts.append(self._cell_rows[self._cell_offsets[first + c0]:self._cell_offsets[first + c1 + 1]])
+        rows = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        if self._pending:
+            rows = np.union1d(rows[~self._stale[rows]], self._pending)
+        return rows
+
+    def _bounds_of(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return self.store.all_bounds()[rows].T
+
+    def within(self, top: int, left: int, bottom: int, right: int) -> np.ndarray:
+        """rows of the ROIs whose bounds are fully within the rectangle"""
+        rows = self._candidates(top, left, bottom, right)
+        t, l, b, r = self._bounds_of(rows)
+        return rows[(top <= t) & (left <= l) & (bottom >= b) & (right >= r)]
+
+    def intersects(self, top: int, left: int, bottom: int, right: int) -> np.ndarray:
+        """rows of the ROIs whose bounds overlap with the rectangle"""
+        rows = self._candidates(top, left, bottom, right)
+        t, l, b, r = self._bounds_of(rows)
+        return rows[(top <= b) & (left <= r) & (bottom >= t) & (right >= l)]
+
+    def contains_point(self, x: float, y: float) -> np.ndarray:
+        """rows of the ROIs whose polygon contains (x,y), the outline counts as inside"""
+        store = self.store
+        rows = self.intersects(int(np.floor(y)), int(np.floor(x)), int(np.ceil(y)), int(np.ceil(x)))
+        hits = [row for row in rows
+                if cv2.pointPolygonTest(store.coords[store.offsets[row]:store.offsets[row + 1]], (float(x), float(y)), False) >= 0]
+        return np.array(hits, dtype=np.int64)
@@ -0,0 +1,575 @@
+"""RoiEditor
+
+Author: Bart Vanderbeke & Elisa
+Copyright: © 2025
+License: MIT
+
+Parts of the code in this project have been derived from chatGPT suggestions.
+When code has been explicitly derived from someone else's code,
+I left the (GitHub) url of the original code next to the derived code.
+
+"""
+from typing import Optional, Iterable
+import numpy as np
+
+from .Roi import Roi
+from .Feret import get_values, get_values_and_shape_batch, shape_msmts
+from .RoiGeometry import polygon_geometry, ragged_index
+from .LabelMoments import moments_msmts
+from .TinyLog import log
+
+
+class RoiStore:
+    """
+        columnar (struct-of-arrays) storage for the ROIs of a TinyRoiManager
+        1 row == 1 ROI, rows are kept in insertion order
+        -the label (value in the label image) is the primary key: label_to_row gives the row of a label in O(1)
+         the "Lxxxx" names are only formatted when asked for (UI, export)
+        -state: uint8 column
+        -area, center, centroid, bounds, feret, shape: one column each (see flags),
+         area, center, centroid and bounds are computed for all new rows at once when they are added,
+         feret and shape (descriptors) together, in 1 batch
+        -moments: the measurements from the pixels of a ROI, filled by TinyRoiManager.moments (they need the label image)
+        -the coordinates of all ROIs live in 1 concatenated int32 buffer (x,y),
+         the points of row i are coords[offsets[i]:offsets[i+1]]
+        -tags are interned: each row refers to a shared frozenset of tags
+        -the reason of selection is interned too: 0 == no reason
+        Roi objects handed out by the store are thin views on a row
+    """
+    HAS_AREA: int = 1
+    HAS_BOUNDS: int = 2
+    HAS_CENTER: int = 4
+    HAS_FERET: int = 8
+    HAS_CENTROID: int = 16
+    HAS_SHAPE: int = 32
+    HAS_MOMENTS: int = 64
+    GEOMETRY: int = HAS_AREA | HAS_BOUNDS | HAS_CENTER | HAS_CENTROID
+
+    def __init__(self, capacity: int = 0, point_capacity: int = 0, num_threads: int = 1):
+        # threads for the batched geometry and Feret computations
+        self.num_threads: int = num_threads
+        self._n: int = 0
+        self._m: int = 0
+        self._state = np.zeros(capacity, dtype=np.uint8)
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._area = np.zeros(capacity, dtype=np.float64)
+        self._center = np.zeros((capacity, 2), dtype=np.float64)   # (cx, cy), mean of the vertices
+        self._centroid = np.zeros((capacity, 2), dtype=np.float64) # (cx, cy), area weighted
+        self._bounds = np.zeros((capacity, 4), dtype=np.int32)     # (top, left, bottom, right)
+        self._feret = np.zeros((capacity, 7), dtype=np.float32)
+        self._shape = np.zeros((capacity, len(shape_msmts)), dtype=np.float64)
+        self._moments = np.zeros((capacity, len(moments_msmts)), dtype=np.float64)
+        self._label = np.zeros(capacity, dtype=np.int32)
+        self._tag_id = np.zeros(capacity, dtype=np.uint32)
+        self._reason_id = np.zeros(capacity, dtype=np.uint32)
+        self._offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._coords = np.zeros((point_capacity, 2), dtype=np.int32)
+        self._views: list[Optional[Roi]] = []
+        self._label_to_row = np.full(capacity + 1, -1, dtype=np.int64)
+        self._num_digits: int = 1
+        self._tag_sets: list[frozenset] = [frozenset()]
+        self._tag_set_to_id: dict[frozenset, int] = {frozenset(): 0}
+        self._reason_table: list[str] = [""]
+        self._reason_to_id: dict[str, int] = {"": 0}
+
+    def __len__(self):
+        return self._n
+
+    # column access: views on the used part of the buffers
+    @property
+    def state(self) -> np.ndarray:
+        return self._state[:self._n]
+
+    @property
+    def flags(self) -> np.ndarray:
+        return self._flags[:self._n]
+
+    @property
+    def tag_id(self) -> np.ndarray:
+        return self._tag_id[:self._n]
+
+    @property
+    def reason_id(self) -> np.ndarray:
+        return self._reason_id[:self._n]
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self._offsets[:self._n + 1]
+
+    @property
+    def coords(self) -> np.ndarray:
+        return self._coords[:self._m]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def label(self) -> np.ndarray:
+        return self._label[:self._n]
+
+    @property
+    def label_to_row(self) -> np.ndarray:
+        """row of each label value, -1 when there is no ROI with that label"""
+        return self._label_to_row
+
+    @property
+    def num_digits(self) -> int:
+        """all names are zero-padded to the number of digits of the largest label"""
+        return self._num_digits
+
+    @property
+    def names(self) -> list[str]:
+        num_digits = self._num_digits
+        return [f"L{label:0{num_digits}d}" for label in self.label.tolist()]
+
+    def name(self, row: int) -> str:
+        return Roi.label_to_name(int(self._label[row]), self._num_digits)
+
+    def label_to_name(self, label: int) -> str:
+        return Roi.label_to_name(int(label), self._num_digits)
+
+    def _reserve(self, num_rows: int, num_points: int):
+        if num_rows > len(self._state):
+            new_cap = max(num_rows, 2 * len(self._state), 16)
+            for attr in ("_state", "_flags", "_area", "_center", "_centroid", "_bounds", "_feret", "_shape", "_moments", "_label", "_tag_id", "_reason_id"):
+                old = getattr(self, attr)
+                new = np.zeros((new_cap,) + old.shape[1:], dtype=old.dtype)
+                new[:self._n] = old[:self._n]
+                setattr(self, attr, new)
+            offsets = np.zeros(new_cap + 1, dtype=np.int64)
+            offsets[:self._n + 1] = self._offsets[:self._n + 1]
+            self._offsets = offsets
+        if num_points > len(self._coords):
+            new_cap = max(num_points, 2 * len(self._coords), 1024)
+            coords = np.zeros((new_cap, 2), dtype=np.int32)
+            coords[:self._m] = self._coords[:self._m]
+            self._coords = coords
+
+    def intern_tags(self, tags: Optional[Iterable[str]]) -> int:
+        key = frozenset(tags) if tags else frozenset()
+        tag_id = self._tag_set_to_id.get(key)
+        if tag_id is None:
+            tag_id = len(self._tag_sets)
+            self._tag_sets.append(key)
+            self._tag_set_to_id[key] = tag_id
+        return tag_id
+
+    def intern_reason(self, reason: Optional[str]) -> int:
+        if not reason:
+            return 0
+        reason_id = self._reason_to_id.get(reason)
+        if reason_id is None:
+            reason_id = len(self._reason_table)
+            self._reason_table.append(reason)
+            self._reason_to_id[reason] = reason_id
+        return reason_id
+
+    def extend(self, rois: list[Roi]) -> np.ndarray:
+        """appends a batch of ROIs in 1 go, the ROIs become views on their new row"""
+        rois = [roi for roi in rois if roi]
+        num = len(rois)
+        first = self._n
+        if not num:
+            return np.arange(first, first, dtype=np.int64)
+        counts = np.fromiter((roi.n for roi in rois), dtype=np.int64, count=num)
+        total = int(counts.sum())
+        self._reserve(first + num, self._m + total)
+
+        rows = np.arange(first, first + num, dtype=np.int64)
+        labels = self._labels_for(rois)
+        self._label[first:first + num] = labels
+        self._index_labels(labels, rows)
+        self._offsets[first + 1:first + num + 1] = self._m + np.cumsum(counts)
+        if total:
+            block = self._coords[self._m:self._m + total]
+            block[:, 0] = np.concatenate([np.asarray(roi.xpoints) for roi in rois])
+            block[:, 1] = np.concatenate([np.asarray(roi.ypoints) for roi in rois])
+        self._m += total
+        self._n += num
+
+        for row, roi in zip(rows, rois):
+            self._copy_row_values(int(row), roi)
+            self._views.append(None)
+            self._adopt(int(row), roi)
+        self.fill_geometry(rows)
+        return rows
+
+    def extend_buffers(self, labels: np.ndarray, coords: np.ndarray, offsets: np.ndarray, state: Optional[np.ndarray] = None,
+                       tags: Optional[list] = None, bounds: Optional[np.ndarray] = None, center: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+            appends a batch of ROIs straight from a ragged coordinate buffer, no Roi objects are made
+            the points of new row i are coords[offsets[i]:offsets[i+1]] (x,y)
+            -state, bounds, center: 1 value per row, when known
+            -tags: 1 iterable of tags (or None) per row
+        """
+        num = len(offsets) - 1
+        first = self._n
+        if not num:
+            return np.arange(first, first, dtype=np.int64)
+        counts = np.diff(offsets)
+        total = int(offsets[-1] - offsets[0])
+        self._reserve(first + num, self._m + total)
+
+        rows = np.arange(first, first + num, dtype=np.int64)
+        labels = np.asarray(labels, dtype=np.int64)
+        self._label[rows] = labels
+        self._index_labels(labels, rows)
+        self._offsets[first + 1:first + num + 1] = self._m + np.cumsum(counts)
+        self._coords[self._m:self._m + total] = coords[offsets[0]:offsets[-1]]
+        self._m += total
+        self._n += num
+
+        self._state[rows] = Roi.ROI_STATE_ACTIVE if state is None else state
+        self._tag_id[rows] = 0 if tags is None else [self.intern_tags(row_tags) for row_tags in tags]
+        self._reason_id[rows] = 0
+        self._flags[rows] = 0
+        if bounds is not None:
+            self._bounds[rows] = bounds
+            self._flags[rows] |= self.HAS_BOUNDS
+        if center is not None:
+            self._center[rows] = center
+            self._flags[rows] |= self.HAS_CENTER
+        self._views.extend([None] * num)
+        self.fill_geometry(rows)
+        return rows
+
+    def append(self, roi: Roi) -> int:
+        return int(self.extend([roi])[0])
+
+    def replace(self, row: int, roi: Roi):
+        """overwrites a row with another ROI; the coordinate buffer is repacked when the number of points changes"""
+        old_view = self._views[row]
+        if old_view is not None and old_view is not roi:
+            old_view._detach()
+        a, b = int(self._offsets[row]), int(self._offsets[row + 1])
+        xs = np.asarray(roi.xpoints)
+        ys = np.asarray(roi.ypoints)
+        if len(xs) == b - a:
+            self._coords[a:b, 0] = xs
+            self._coords[a:b, 1] = ys
+        else:
+            new_points = np.column_stack((xs, ys)).astype(np.int32)
+            coords = np.concatenate((self._coords[:a], new_points, self._coords[b:self._m]))
+            self._m = len(coords)
+            self._coords = coords
+            self._offsets[row + 1:self._n + 1] += len(xs) - (b - a)
+        self._flags[row] = 0
+        self._copy_row_values(row, roi)
+        label = roi.label
+        if label is not None and label != self._label[row]:
+            self.relabel(row, label)
+        self._adopt(row, roi)
+
+    def set_coords(self, coords: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """
+            replaces the points of all rows at once, e.g. by simplified polygons
+            rows with another number of points lose their bounds, area, center, centroid, Feret, shape and moments values
+            (computed again when asked for)
+            returns the rows that changed
+        """
+        assert len(offsets) == self._n + 1, "1 polygon per row"
+        changed = np.flatnonzero(np.diff(offsets) != self.counts)
+        self._coords = np.array(coords, dtype=np.int32)
+        self._m = len(self._coords)
+        self._offsets[:self._n + 1] = offsets
+        self._flags[changed] = 0
+        return changed
+
+    def _copy_row_values(self, row: int, roi: Roi):
+        self._state[row] = roi.state if roi.state is not None else Roi.ROI_STATE_ACTIVE
+        self._tag_id[row] = self.intern_tags(roi.tags)
+        self._reason_id[row] = self.intern_reason(roi.reason_of_selection)
+        flags = 0
+        area, bounds, center, feret, shape = roi._known_geometry()
+        if area is not None:
+            self._area[row] = area
+            flags |= self.HAS_AREA
+        if bounds is not None:
+            self._bounds[row] = bounds
+            flags |= self.HAS_BOUNDS
+        if center is not None:
+            self._center[row] = center
+            flags |= self.HAS_CENTER
+        if feret is not None:
+            self._feret[row] = feret
+            flags |= self.HAS_FERET
+        if shape is not None:
+            self._shape[row] = shape
+            flags |= self.HAS_SHAPE
+        self._flags[row] = flags
+
+    def _adopt(self, row: int, roi: Roi):
+        owner = roi._store
+        if owner is not None and owner is not self:
+            owner._views[roi._row] = None
+        roi._attach(self, row)
+        self._views[row] = roi
+
+    def view(self, row: int) -> Roi:
+        roi = self._views[row]
+        if roi is None:
+            roi = Roi._as_view(self, row)
+            self._views[row] = roi
+        return roi
+
+    def views(self, rows: Optional[Iterable[int]] = None) -> list[Roi]:
+        if rows is None:
+            rows = range(self._n)
+        return [self.view(int(row)) for row in rows]
+
+    def row_of_label(self, label: int) -> Optional[int]:
+        if 0 <= label < len(self._label_to_row):
+            row = self._label_to_row[label]
+            if row >= 0:
+                return int(row)
+        return None
+
+    def rows_of_labels(self, labels) -> np.ndarray:
+        """rows for an array of labels, -1 for labels without ROI"""
+        labels = np.asarray(labels, dtype=np.int64)
+        rows = np.full(labels.shape, -1, dtype=np.int64)
+        valid = (labels >= 0) & (labels < len(self._label_to_row))
+        rows[valid] = self._label_to_row[labels[valid]]
+        return rows
+
+    def row_of(self, name: str) -> Optional[int]:
+        label = Roi.name_to_label(name)
+        return self.row_of_label(label) if label is not None else None
+
+    def relabel(self, row: int, label: Optional[int]):
+        if label is None:
+            log(f"Invalid label for ROI {self.name(row)}: not changed", type="warning")
+            return
+        old_label = int(self._label[row])
+        if self._label_to_row[old_label] == row:
+            self._label_to_row[old_label] = -1
+        self._label[row] = label
+        self._index_labels(np.array([label]), np.array([row]))
+        # other label, other pixels
+        self._flags[row] &= 0xFF ^ self.HAS_MOMENTS
+
+    def _labels_for(self, rois: list[Roi]) -> np.ndarray:
+        """labels of new ROIs, ROIs without a label get the next free one"""
+        labels = np.fromiter((-1 if roi.label is None else roi.label for roi in rois), dtype=np.int64, count=len(rois))
+        missing = labels < 0
+        if missing.any():
+            next_label = max(int(labels.max()), int(self.label.max()) if self._n else 0) + 1
+            labels[missing] = np.arange(next_label, next_label + int(missing.sum()))
+        return labels
+
+    def _index_labels(self, labels: np.ndarray, rows: np.ndarray):
+        max_label = int(labels.max())
+        if max_label >= len(self._label_to_row):
+            grown = np.full(max(max_label + 1, 2 * len(self._label_to_row)), -1, dtype=np.int64)
+            grown[:len(self._label_to_row)] = self._label_to_row
+            self._label_to_row = grown
+        self._label_to_row[labels] = rows
+        self._num_digits = max(self._num_digits, len(str(max_label)))
+
+    # per row access, used by the Roi views
+    def xpoints(self, row: int) -> np.ndarray:
+        return self._coords[self._offsets[row]:self._offsets[row + 1], 0]
+
+    def ypoints(self, row: int) -> np.ndarray:
+        return self._coords[self._offsets[row]:self._offsets[row + 1], 1]
+
+    def n(self, row: int) -> int:
+        return int(self._offsets[row + 1] - self._offsets[row])
+
+    def tags(self, row: int) -> frozenset:
+        return self._tag_sets[self._tag_id[row]]
+
+    def set_tags(self, row: int, tags: Optional[Iterable[str]]):
+        self._tag_id[row] = self.intern_tags(tags)
+
+    def add_tag(self, rows, tag: str):
+        """adds 1 tag to the tags of all given rows"""
+        rows = np.atleast_1d(rows)
+        old_ids = self._tag_id[rows]
+        unique_ids, inverse = np.unique(old_ids, return_inverse=True)
+        new_ids = np.array([self.intern_tags(self._tag_sets[i] | {tag}) for i in unique_ids], dtype=np.uint32)
+        self._tag_id[rows] = new_ids[inverse]
+
+    def tag_with_reason(self, rows):
+        """adds the reason of selection of each given row to its tags"""
+        rows = np.atleast_1d(rows)
+        rows = rows[self._reason_id[rows] != 0]
+        if not len(rows):
+            return
+        # 1 new tag set per unique (tags, reason) combination
+        pairs = (self._tag_id[rows].astype(np.uint64) << np.uint64(32)) | self._reason_id[rows].astype(np.uint64)
+        unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+        new_ids = np.array([self.intern_tags(self._tag_sets[int(p >> np.uint64(32))] | {self._reason_table[int(p & np.uint64(0xFFFFFFFF))]})
+                            for p in unique_pairs], dtype=np.uint32)
+        self._tag_id[rows] = new_ids[inverse]
+
+    def reason(self, row: int) -> str:
+        return self._reason_table[self._reason_id[row]]
+
+    def tag_set(self, tag_id: int) -> frozenset:
+        return self._tag_sets[tag_id]
+
+    def reason_text(self, reason_id: int) -> str:
+        return self._reason_table[reason_id]
+
+    def set_reason(self, rows, reason: Optional[str]):
+        self._reason_id[rows] = self.intern_reason(reason)
+
+    def area(self, row: int) -> float:
+        if not self._flags[row] & self.HAS_AREA:
+            x = self.xpoints(row).astype(np.int64)
+            y = self.ypoints(row).astype(np.int64)
+            self._area[row] = 0.5 * np.abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1)))
+            self._flags[row] |= self.HAS_AREA
+        return float(self._area[row])
+
+    def bounds(self, row: int) -> tuple[int, int, int, int]:
+        if not self._flags[row] & self.HAS_BOUNDS:
+            x = self.xpoints(row)
+            y = self.ypoints(row)
+            self._bounds[row] = (y.min(), x.min(), y.max(), x.max())
+            self._flags[row] |= self.HAS_BOUNDS
+        top, left, bottom, right = self._bounds[row]
+        return (int(top), int(left), int(bottom), int(right))
+
+    def center(self, row: int) -> tuple[float, float]:
+        if not self._flags[row] & self.HAS_CENTER:
+            self._center[row] = (np.mean(self.xpoints(row)), np.mean(self.ypoints(row)))
+            self._flags[row] |= self.HAS_CENTER
+        cx, cy = self._center[row]
+        return (float(cx), float(cy))
+
+    def centroid(self, row: int) -> tuple[float, float]:
+        if not self._flags[row] & self.HAS_CENTROID:
+            self.fill_geometry(np.array([row]))
+        cx, cy = self._centroid[row]
+        return (float(cx), float(cy))
+
+    def fill_geometry(self, rows: Optional[np.ndarray] = None):
+        """area, center, centroid and bounds of the given rows (None: all rows) in 1 pass, values that are known are kept"""
+        rows = np.arange(self._n) if rows is None else np.asarray(rows, dtype=np.int64)
+        starts = self._offsets[rows]
+        counts = self._offsets[rows + 1] - starts
+        todo = ((self._flags[rows] & self.GEOMETRY) != self.GEOMETRY) & (counts > 0)
+        rows, starts, counts = rows[todo], starts[todo], counts[todo]
+        if not len(rows):
+            return
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        geometry = polygon_geometry(self._coords[ragged_index(starts, counts)], offsets, num_threads=self.num_threads)
+        flags = self._flags[rows]
+        for flag, column, name in ((self.HAS_AREA, self._area, "area"),
+                                   (self.HAS_BOUNDS, self._bounds, "bounds"),
+                                   (self.HAS_CENTER, self._center, "center"),
+                                   (self.HAS_CENTROID, self._centroid, "centroid")):
+            missing = (flags & flag) == 0
+            column[rows[missing]] = geometry[name][missing]
+        self._flags[rows] = flags | self.GEOMETRY
+
+    def coords_of(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """the points of the given rows packed in a new (coords, offsets) buffer"""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self._offsets[rows]
+        counts = self._offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return self._coords[ragged_index(starts, counts)], offsets
+
+    def fill_feret(self, rows: Optional[np.ndarray] = None):
+        """(re)computes the Feret values and shape descriptors of the given rows (None: all rows) in 1 batch"""
+        rows = np.arange(self._n) if rows is None else np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        self._feret[rows], self._shape[rows] = get_values_and_shape_batch(*self.coords_of(rows), num_threads=self.num_threads)
+        self._flags[rows] |= self.HAS_FERET | self.HAS_SHAPE
+
+    def feret(self, row: int) -> np.ndarray:
+        if not self._flags[row] & self.HAS_FERET:
+            self.set_feret(row, get_values(self.xpoints(row), self.ypoints(row)))
+        return self._feret[row]
+
+    def shape(self, row: int) -> np.ndarray:
+        """the shape descriptors of a row, columns as in Feret.shape_index"""
+        if not self._flags[row] & self.HAS_SHAPE:
+            self.fill_feret(np.array([row]))
+        return self._shape[row]
+
+    def set_feret(self, row: int, values: np.ndarray):
+        self._feret[row] = values
+        self._flags[row] |= self.HAS_FERET
+
+    def set_shape(self, row: int, values: np.ndarray):
+        self._shape[row] = values
+        self._flags[row] |= self.HAS_SHAPE
+
+    def moments(self) -> np.ndarray:
+        """the moments column, only rows with HAS_MOMENTS are filled in"""
+        return self._moments[:self._n]
+
+    def set_moments(self, rows, values: np.ndarray):
+        self._moments[rows] = values
+        self._flags[rows] |= self.HAS_MOMENTS
+
+    def known_geometry(self, row: int):
+        flags = self._flags[row]
+        area = float(self._area[row]) if flags & self.HAS_AREA else None
+        bounds = self.bounds(row) if flags & self.HAS_BOUNDS else None
+        center = self.center(row) if flags & self.HAS_CENTER else None
+        feret = self._feret[row].copy() if flags & self.HAS_FERET else None
+        shape = self._shape[row].copy() if flags & self.HAS_SHAPE else None
+        return area, bounds, center, feret, shape
+
+    # whole column access, missing values are computed first
+    def areas(self) -> np.ndarray:
+        self.fill_geometry(np.flatnonzero((self.flags & self.HAS_AREA) == 0))
+        return self._area[:self._n]
+
+    def ferets(self) -> np.ndarray:
+        self.fill_feret(np.flatnonzero((self.flags & self.HAS_FERET) == 0))
+        return self._feret[:self._n]
+
+    def shapes(self) -> np.ndarray:
+        self.fill_feret(np.flatnonzero((self.flags & self.HAS_SHAPE) == 0))
+        return self._shape[:self._n]
+
+    def all_bounds(self) -> np.ndarray:
+        self.fill_geometry(np.flatnonzero((self.flags & self.HAS_BOUNDS) == 0))
+        return self._bounds[:self._n]
+
+    def centers(self) -> np.ndarray:
+        self.fill_geometry(np.flatnonzero((self.flags & self.HAS_CENTER) == 0))
+        return self._center[:self._n]
+
+    def centroids(self) -> np.ndarray:
+        self.fill_geometry(np.flatnonzero((self.flags & self.HAS_CENTROID) == 0))
+        return self._centroid[:self._n]
+
+
+class RoiArray:
+    """
+        the ROIs of a RoiStore indexed by label, like an array with None where there is no ROI
+        a Roi view is only made when a ROI is asked for
+        TinyRoiManager.add_from_list_unchecked takes the store as it is (once), without Roi objects
+    """
+    def __init__(self, store: RoiStore, size: int):
+        self.store: RoiStore = store
+        self._size: int = size
+        self.taken: bool = False
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        index = int(index)
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(f"label {index} out of range")
+        row = self.store.row_of_label(index)
+        return None if row is None else self.store.view(row)
+
+    def __iter__(self):
+        return (self[i] for i in range(self._size))
@@ -16,6 +16,10 @@ from .TinyLog import log
 
 
 class RoyalKeyInterceptor(QObject):
+    """
+        maps key presses to actions: mapping[key] = (action, argument, should_block)
+        a key can also be mapped together with its modifiers: mapping[(key, modifiers)], that mapping goes first
+    """
     def __init__(self, mapping=None, parent=None):
         super(RoyalKeyInterceptor, self).__init__(parent)
         self.mapping = mapping if mapping else {}
@@ -23,6 +27,8 @@ class RoyalKeyInterceptor(QObject):
     def eventFilter(self, obj, event):
         if event.type() == QEvent.Type.KeyPress:
             key = event.key()
+            if (key, event.modifiers()) in self.mapping:
+                key = (key, event.modifiers())
             if key in self.mapping:
                 action, argument, should_block = self.mapping[key]
                 try:
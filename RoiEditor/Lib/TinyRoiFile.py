@@ -10,14 +10,29 @@ I left the (GitHub) url of the original code next to the derived code.
 
 """
 import zipfile
+import hashlib
+import threading
+import mmap
+import zlib
+import os
+import io
+import time
+import struct
+from collections import namedtuple
 from typing import List, Optional
 from typing import Final
 from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 from .Roi import Roi
+from .RoiStore import RoiStore, RoiArray
+from .RoiGeometry import chunk_bounds, ragged_index
+from .Feret import shape_msmts
 from .TinyLog import log
 
+# 1 entry of the central directory of a zip, the raw record is copied as it is for entries that stay
+_ZipRecord = namedtuple("_ZipRecord", "name method crc size header_offset local_size raw")
+
 class TinyRoiFile:
     """
         TinyRoiFile implements a reader and writer for Fiji compatible ROI/zip files
@@ -27,6 +42,9 @@ class TinyRoiFile:
         d=digit, the number of digits is derived from the number of Rois in the zip file
         TinyRoiFile can read ROI zip files generated by cellpose if they belong to the types described above
         TinyRoiFile adds a tags.json file to the zip in which the state and the tags of the ROI are stored
+        TinyRoiFile adds a measurements.npy file to the zip with the Feret values and shape descriptors that are known,
+        1 record per ROI with a hash of its coordinates: on reading only the values of unchanged ROIs are used
+        Fiji only reads the .roi files in the zip
         TinyRoiFile is a stripped version of https://pypi.org/project/roifile/  (Christoph Gohlke)
     """
     HEADER_SIZE: Final[int] = 64
@@ -34,28 +52,132 @@ class TinyRoiFile:
     ROI_TYPE_TRACED: Final[int] = 8
     ROI_TYPE_FREEHAND: Final[int] = 7
     SUPPORTED_ROI_TYPES: Final[set[int]] = {ROI_TYPE_POLYGON, ROI_TYPE_TRACED, ROI_TYPE_FREEHAND}
+    # the fixed part of the header of a .roi file, big-endian
+    ROI_HEADER_DTYPE: Final[np.dtype] = np.dtype([("magic", "S4"), ("version", ">i2"), ("roi_type", "u1"), ("unused", "u1"),
+                                                  ("top", ">i2"), ("left", ">i2"), ("bottom", ">i2"), ("right", ">i2"),
+                                                  ("n", ">u2"), ("size", ">i4"), ("unused2", "V12"),
+                                                  ("stroke_width", ">i2"), ("shape_roi_size", ">i4"), ("stroke_color", "V4"), ("fill_color", "V4"),
+                                                  ("subtype", ">i2"), ("options", ">i2"), ("arrow", "V4"), ("position", ">i4"),
+                                                  ("header2_offset", ">i4")])
+    # large images: the 16 bit fields hold -5000..60535 (wrapped, as Fiji reads them),
+    # beyond that the absolute float32 coordinates of the subpixel block are used
+    MIN_INT_COORD: Final[int] = -5000
+    MAX_INT_COORD: Final[int] = 60535
+    SUB_PIXEL_RESOLUTION: Final[int] = 128
+    SUB_PIXEL_VERSION: Final[int] = 228
+    # 1 save at a time: a save thread may still be writing when the next save starts
+    _save_lock: Final[threading.Lock] = threading.Lock()
+    MEASUREMENTS_NAME: Final[str] = "measurements.npy"
+    MEASUREMENTS_DTYPE: Final[np.dtype] = np.dtype([("label", "<i4"), ("hash", "<u8"),
+                                                    ("feret", "<f4", (7,)), ("shape", "<f8", (len(shape_msmts),))])
+    # the records of a zip (APPNOTE.TXT), for update_parallel
+    ZIP_LOCAL_HEADER: Final[struct.Struct] = struct.Struct("<4s5H3L2H")     # 30 bytes + name
+    ZIP_CENTRAL_HEADER: Final[struct.Struct] = struct.Struct("<4s6H3L5H2L") # 46 bytes + name + extra + comment
+    ZIP_END: Final[struct.Struct] = struct.Struct("<4s4H2LH")               # 22 bytes + comment
+    ZIP64_END: Final[struct.Struct] = struct.Struct("<4sQ2H2L4Q")           # more than 65535 entries
+    ZIP64_END_LOCATOR: Final[struct.Struct] = struct.Struct("<4sLQL")
+
+    @staticmethod
+    def coordinate_hash(xpoints: np.ndarray, ypoints: np.ndarray) -> int:
+        """64 bit hash of the coordinates of a ROI"""
+        points = np.empty((len(xpoints), 2), dtype="<i4")
+        points[:, 0] = xpoints
+        points[:, 1] = ypoints
+        return int.from_bytes(hashlib.blake2b(points.tobytes(), digest_size=8).digest(), "little")
+
+    @staticmethod
+    def write_parallel(zip_path: str, roi_list: List[Optional[Roi]], num_threads: int = 4) -> threading.Thread:
+        """
+            the zip is written to disk on a separate thread, join it to wait until the file is complete
+            -ROIs of large images (coordinates beyond MIN_INT_COORD..MAX_INT_COORD, e.g. stitched mosaics) get the
+             float32 subpixel coordinate block of ImageJ, ROIs with more than 65535 points the int32 point count
+        """
+        zip_bytes = TinyRoiFile._zip_bytes(TinyRoiFile._encode_entries(roi_list, num_threads))
+
+        def save():
+            with TinyRoiFile._save_lock:
+                TinyRoiFile._save_zip(zip_path, zip_bytes)
+
+        # Fire & Forget: no need to wait for data to be saved
+        # daemon=False --> makes sure that the thread is not stopped when the program is stopped
+        thread = threading.Thread(target=save, daemon=False)
+        thread.start()
+        return thread
 
     @staticmethod
-    def write_parallel(zip_path: str, roi_list: List[Optional[Roi]], num_threads: int = 4) -> None:
-        def encode_roi(roi: Roi) -> tuple[str, bytes]:
-            top, left, bottom, right = roi.bounds
+    def update_parallel(zip_path: str, roi_list: List[Optional[Roi]], num_threads: int = 4, max_dead_fraction: float = 0.5) -> threading.Thread:
+        """
+            saves like write_parallel, but a zip that is already there is updated in place
+            -entries that did not change (same size and CRC) stay where they are: only the changed and new .roi files,
+             tags.json and measurements.npy are written after the end of the zip, followed by the new central directory
+            -the end record is written last: a save that does not finish leaves the previous zip as it was
+            -entries that are gone or changed and the previous central directory remain as dead space, the last character
+             of their local name becomes '~': Fiji reads the local headers one after the other and only takes the names
+             that end in .roi, the previous central directory gets a local header to be skipped like that
+            -the zip is written in full (compacted) when the dead space would be more than max_dead_fraction of it,
+             or when it is no zip with stored entries
+            join the thread to wait until the file is complete
+        """
+        entries = TinyRoiFile._encode_entries(roi_list, num_threads)
+
+        def save():
+            with TinyRoiFile._save_lock:
+                if not TinyRoiFile._update_zip(zip_path, entries, max_dead_fraction):
+                    TinyRoiFile._save_zip(zip_path, TinyRoiFile._zip_bytes(entries))
+
+        thread = threading.Thread(target=save, daemon=False)
+        thread.start()
+        return thread
 
-            x = (np.asarray(roi.xpoints, dtype=np.int16) - left).astype('>i2')  # big-endian int16
-            y = (np.asarray(roi.ypoints, dtype=np.int16) - top ).astype('>i2')
+    @staticmethod
+    def _encode_entries(roi_list: List[Optional[Roi]], num_threads: int) -> list[tuple[str, bytes]]:
+        """the (name, data) entries of a ROI zip: a .roi file per ROI, tags.json, measurements.npy when measurements are known"""
+        def int16_field(value) -> bytes:
+            # big-endian, values above 32767 wrap around as an unsigned 16 bit value
+            return (int(value) & 0xFFFF).to_bytes(2, byteorder='big')
+
+        def encode_roi(roi: Roi) -> tuple[str, bytes, Optional[tuple]]:
+            top, left, bottom, right = (int(value) for value in roi.bounds)
+            xpoints = np.asarray(roi.xpoints, dtype=np.int64)
+            ypoints = np.asarray(roi.ypoints, dtype=np.int64)
+            n = len(xpoints)
+
+            # the choice follows the size of the image the ROI is in
+            low = min(top, left, int(xpoints.min()), int(ypoints.min()))
+            high = max(bottom, right, int(xpoints.max()), int(ypoints.max()))
+            subpixel = low < TinyRoiFile.MIN_INT_COORD or high > TinyRoiFile.MAX_INT_COORD
+
+            x = ((xpoints - left) & 0xFFFF).astype('>u2')  # big-endian int16, wrapped
+            y = ((ypoints - top) & 0xFFFF).astype('>u2')
 
             header = bytearray(TinyRoiFile.HEADER_SIZE)
             header[0:4] = b'Iout'
             header[6] = TinyRoiFile.ROI_TYPE_POLYGON
-            header[8:10]  = int(top).to_bytes(2, byteorder='big', signed=True)
-            header[10:12] = int(left).to_bytes(2, byteorder='big', signed=True)
-            header[12:14] = int(bottom).to_bytes(2, byteorder='big', signed=True)
-            header[14:16] = int(right).to_bytes(2, byteorder='big', signed=True)
-            header[16:18] = int(roi.n).to_bytes(2, byteorder='big', signed=True)
+            header[8:10]  = int16_field(top)
+            header[10:12] = int16_field(left)
+            header[12:14] = int16_field(bottom)
+            header[14:16] = int16_field(right)
+            if n < 2**16:
+                header[16:18] = n.to_bytes(2, byteorder='big')
+            else:
+                # more points than fit in 16 bits: n is 0, the number of points is an int32 at 18
+                header[18:22] = n.to_bytes(4, byteorder='big', signed=True)
 
             x_bytes = x.tobytes()
             y_bytes = y.tobytes()
+            if subpixel:
+                header[4:6] = TinyRoiFile.SUB_PIXEL_VERSION.to_bytes(2, byteorder='big')
+                header[50:52] = TinyRoiFile.SUB_PIXEL_RESOLUTION.to_bytes(2, byteorder='big')
+                # float32 holds the pixel positions exactly up to 2**24
+                y_bytes += xpoints.astype('>f4').tobytes() + ypoints.astype('>f4').tobytes()
+
+            # only the measurements that are known: saving does not compute them
+            _, _, _, feret, shape = roi._known_geometry()
+            measurement = None
+            if feret is not None and shape is not None and roi.label is not None:
+                measurement = (roi.label, TinyRoiFile.coordinate_hash(roi.xpoints, roi.ypoints), feret, shape)
 
-            return roi.name + ".roi", header + x_bytes + y_bytes
+            return roi.name + ".roi", header + x_bytes + y_bytes, measurement
 
         roi_tasks = [roi for roi in roi_list if roi]
         num_tasks = len(roi_tasks)
@@ -71,35 +193,230 @@ class TinyRoiFile:
             for chunk_result in executor.map(worker, chunks):
                 results.extend(chunk_result)
 
+        import json
+        entries = [(name, data) for name, data, _ in results]
+        tag_json = {}
+        for roi in roi_list:
+            if roi:
+                json_value = [Roi.state_to_str(roi.state)] + list(roi.tags)
+                tag_json[roi.name] = json_value
+        entries.append(("tags.json", json.dumps(tag_json).encode("utf-8")))
+        measurements = [measurement for _, _, measurement in results if measurement]
+        if measurements:
+            entries.append((TinyRoiFile.MEASUREMENTS_NAME,
+                            TinyRoiFile._to_npy(np.array(measurements, dtype=TinyRoiFile.MEASUREMENTS_DTYPE))))
+        return entries
 
-        # Step 1: construct zip in memory
+    @staticmethod
+    def _zip_bytes(entries: list[tuple[str, bytes]]) -> bytes:
+        """the full zip, constructed in memory"""
         # ZIP_STORED = no compression, zip is only used for Fiji compatibility
         import io
-        import json
         mem_zip = io.BytesIO()
         with zipfile.ZipFile(mem_zip, 'w', compression=zipfile.ZIP_STORED) as zipf:
-            tag_json = {}
-            for name, data in results:
+            for name, data in entries:
                 zipf.writestr(name, data)
-            for roi in roi_list:
-                if roi:
-                    json_value = [Roi.state_to_str(roi.state)] + list(roi.tags)
-                    tag_json[roi.name] = json_value
-            json_data = json.dumps(tag_json)
-            zipf.writestr("tags.json", json_data.encode("utf-8"))
+        return mem_zip.getvalue()
 
-        #Step 2: flush it in 1 move
-        # with open(zip_path, 'wb') as f:
-            # f.write(mem_zip.getvalue())
+    @staticmethod
+    def _save_zip(zip_path: str, zip_bytes: bytes):
+        # flush it in 1 move, next to the zip: the zip is only replaced by a complete file
+        temp_path = zip_path + ".tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(zip_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, zip_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
 
-        def save_zip(path, data):
-            with open(path, 'wb') as f:
-                f.write(data)
+    @staticmethod
+    def _update_zip(zip_path: str, entries: list[tuple[str, bytes]], max_dead_fraction: float) -> bool:
+        """the in place update of update_parallel, False when the zip has to be written in full (it is not touched then)"""
+        if not os.path.isfile(zip_path):
+            return False
+        with open(zip_path, "r+b") as f:
+            directory = TinyRoiFile._zip_directory(f, f.seek(0, os.SEEK_END))
+            if directory is None:
+                return False
+            end, start_dir, records = directory
+            if any(record.method != zipfile.ZIP_STORED or 0xFFFFFFFF in (record.size, record.header_offset) for record in records):
+                return False
+            new_data = dict(entries)
+            kept = [record for record in records
+                    if record.name in new_data
+                    and record.size == len(new_data[record.name])
+                    and record.crc == zlib.crc32(new_data[record.name])]
+            kept_names = {record.name for record in kept}
+            dead = [record for record in records if record.name not in kept_names]
+            written = [(name, data) for name, data in entries if name not in kept_names]
+            # Fiji (Opener) takes a zip for a ROI zip when the first local header is a .roi file
+            if any(record.header_offset == 0 for record in dead):
+                return False
+
+            # the previous central directory becomes dead space too, it needs room for a local header
+            LOCAL = TinyRoiFile.ZIP_LOCAL_HEADER
+            written_size = sum(LOCAL.size + len(name.encode()) + len(data) for name, data in written)
+            dead_size = end - sum(record.local_size for record in kept)
+            if end - start_dir < LOCAL.size + 1 or dead_size > max_dead_fraction * (end + written_size):
+                return False
+
+            now = time.localtime()
+            dos_time = now.tm_hour << 11 | now.tm_min << 5 | now.tm_sec // 2
+            dos_date = (now.tm_year - 1980) << 9 | now.tm_mon << 5 | now.tm_mday
+            local_parts, central_parts = [], [record.raw for record in kept]
+            position = end
+            for name, data in written:
+                try:
+                    encoded, flags = name.encode("ascii"), 0
+                except UnicodeEncodeError:
+                    encoded, flags = name.encode("utf-8"), 0x800
+                crc = zlib.crc32(data)
+                local_parts += [LOCAL.pack(b"PK\x03\x04", 20, flags, zipfile.ZIP_STORED, dos_time, dos_date,
+                                           crc, len(data), len(data), len(encoded), 0), encoded, data]
+                # made by: version 2.0 on unix, read/write for the owner, like zipfile.writestr
+                central_parts += [TinyRoiFile.ZIP_CENTRAL_HEADER.pack(b"PK\x01\x02", 3 << 8 | 20, 20, flags, zipfile.ZIP_STORED,
+                                                                      dos_time, dos_date, crc, len(data), len(data), len(encoded),
+                                                                      0, 0, 0, 0, 0o600 << 16, position), encoded]
+                position += LOCAL.size + len(encoded) + len(data)
+            central = b"".join(central_parts)
+            if position + len(central) > 0xFFFFFFFF:
+                return False
+            end_records = TinyRoiFile._zip_end_records(len(kept) + len(written), position, len(central))
+
+            # anything after the end of the zip is a save that did not finish
+            f.truncate(end)
+            f.seek(end)
+            f.write(b"".join(local_parts))
+            f.write(central)
+            f.flush()
+            os.fsync(f.fileno())
+            # the commit: from here on the new central directory is the one that is found
+            f.write(end_records)
+            f.flush()
+            os.fsync(f.fileno())
+
+            # hidden from Fiji: the dead entries and the previous central directory
+            for record in dead:
+                f.seek(record.header_offset + 26)
+                name_length = int.from_bytes(f.read(2), "little")
+                f.seek(record.header_offset + 30 + name_length - 1)
+                f.write(b'~')
+            hidden = start_dir + LOCAL.size + 1
+            f.seek(hidden)
+            crc = zlib.crc32(f.read(end - hidden))
+            f.seek(start_dir)
+            f.write(LOCAL.pack(b"PK\x03\x04", 20, 0, zipfile.ZIP_STORED, 0, 0x21, crc, end - hidden, end - hidden, 1, 0) + b'~')
+        return True
 
-        # Fire & Forget: no need to wait for data to be saved
-        # daemon=False --> makes sure that the thread is not stopped when the program is stopped
-        import threading
-        threading.Thread(target=save_zip, args=(zip_path, mem_zip.getvalue()), daemon=False).start()
+    @staticmethod
+    def _zip_end_records(count: int, start_dir: int, size_dir: int) -> bytes:
+        """the end of central directory record, after a zip64 end record and locator for more than 65535 entries"""
+        if count <= 0xFFFF:
+            return TinyRoiFile.ZIP_END.pack(b"PK\x05\x06", 0, 0, count, count, size_dir, start_dir, 0)
+        end64 = TinyRoiFile.ZIP64_END.pack(b"PK\x06\x06", TinyRoiFile.ZIP64_END.size - 12, 45, 45, 0, 0, count, count, size_dir, start_dir)
+        locator = TinyRoiFile.ZIP64_END_LOCATOR.pack(b"PK\x06\x07", 0, start_dir + size_dir, 1)
+        return end64 + locator + TinyRoiFile.ZIP_END.pack(b"PK\x05\x06", 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+
+    @staticmethod
+    def _zip_directory(f, size: int, block_size: int = 1 << 20) -> Optional[tuple[int, int, list[_ZipRecord]]]:
+        """
+            the last complete zip in the file: (end, start of its central directory, its records), None if there is none
+            anything after end is a save that did not finish
+            the end records are searched from the back of the file, the first one with a valid central directory is used
+        """
+        signature = b"PK\x05\x06"
+        position = size
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            # a signature across 2 blocks
+            data = f.read(min(position + len(signature) - 1, size) - start)
+            at = len(data)
+            while (at := data.rfind(signature, 0, at)) >= 0:
+                if start + at < position:
+                    directory = TinyRoiFile._zip_directory_at(f, size, start + at)
+                    if directory is not None:
+                        return directory
+            position = start
+        return None
+
+    @staticmethod
+    def _zip_directory_at(f, size: int, at: int) -> Optional[tuple[int, int, list[_ZipRecord]]]:
+        """the zip with its end record at position at, see _zip_directory"""
+        END, END64, LOCATOR, CENTRAL = TinyRoiFile.ZIP_END, TinyRoiFile.ZIP64_END, TinyRoiFile.ZIP64_END_LOCATOR, TinyRoiFile.ZIP_CENTRAL_HEADER
+        f.seek(at)
+        record = f.read(END.size)
+        if len(record) < END.size:
+            return None
+        _, _, _, _, count, size_dir, start_dir, comment_length = END.unpack(record)
+        end = at + END.size + comment_length
+        directory_end = at
+        if end > size:
+            return None
+        if count == 0xFFFF or size_dir == 0xFFFFFFFF or start_dir == 0xFFFFFFFF:
+            directory_end = at - LOCATOR.size - END64.size
+            if directory_end < 0:
+                return None
+            f.seek(directory_end)
+            record = f.read(END64.size + LOCATOR.size)
+            end64, locator = END64.unpack(record[:END64.size]), LOCATOR.unpack(record[END64.size:])
+            if end64[0] != b"PK\x06\x06" or locator[0] != b"PK\x06\x07" or locator[2] != directory_end:
+                return None
+            count, size_dir, start_dir = end64[7], end64[8], end64[9]
+        if start_dir + size_dir != directory_end:
+            return None
+        f.seek(start_dir)
+        data = f.read(size_dir)
+        records = []
+        pos = 0
+        for _ in range(count):
+            if pos + CENTRAL.size > len(data):
+                return None
+            (signature, _, _, flags, method, _, _, crc, compressed_size, file_size,
+             name_length, extra_length, comment_length, _, _, _, header_offset) = CENTRAL.unpack_from(data, pos)
+            if signature != b"PK\x01\x02":
+                return None
+            name = data[pos + CENTRAL.size:pos + CENTRAL.size + name_length].decode("utf-8" if flags & 0x800 else "cp437")
+            length = CENTRAL.size + name_length + extra_length + comment_length
+            records.append(_ZipRecord(name, method, crc, file_size, header_offset,
+                                      TinyRoiFile.ZIP_LOCAL_HEADER.size + name_length + compressed_size, data[pos:pos + length]))
+            pos += length
+        if pos != len(data):
+            return None
+        return end, start_dir, records
+
+    @staticmethod
+    def _to_npy(records: np.ndarray) -> bytes:
+        import io
+        buffer = io.BytesIO()
+        np.save(buffer, records, allow_pickle=False)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _attach_measurements(store: RoiStore, data: bytes):
+        """gives the ROIs whose coordinates did not change the Feret values and shape descriptors of the zip"""
+        import io
+        try:
+            records = np.load(io.BytesIO(data), allow_pickle=False)
+        except ValueError as e:
+            log(f"{TinyRoiFile.MEASUREMENTS_NAME} can not be read, measurements will be recomputed: {e}", type="warning")
+            return
+        if records.dtype != TinyRoiFile.MEASUREMENTS_DTYPE:
+            log(f"{TinyRoiFile.MEASUREMENTS_NAME} has an other layout, measurements will be recomputed", type="warning")
+            return
+        by_label = {int(label): i for i, label in enumerate(records["label"])}
+        num_used = 0
+        for label, i in by_label.items():
+            row = store.row_of_label(label)
+            if row is None or int(records["hash"][i]) != TinyRoiFile.coordinate_hash(store.xpoints(row), store.ypoints(row)):
+                continue
+            store.set_feret(row, records["feret"][i].copy())
+            store.set_shape(row, records["shape"][i].copy())
+            num_used += 1
+        log(f"Measurements read from zip: {num_used}, to recompute: {len(store) - num_used}")
 
     @staticmethod
     # works on filename without extension!
@@ -114,105 +431,198 @@ class TinyRoiFile:
         return all(TinyRoiFile._is_valid_roi_name(n) for n in entry_list)
     
     @staticmethod
-    def read_parallel(zip_path: str, label_image,num_threads: int = 4) -> List[Optional[Roi]]:
-        import io
-        with  open(zip_path, "rb") as zipf:
-                zip_bytes = zipf.read()
-        zip_buffer = io.BytesIO(zip_bytes)  # ← hier komt het verschil
-        with zipfile.ZipFile(zip_buffer, 'r') as zipf:
-            name_list= zipf.namelist()
-            roi_data_dict = {
-                name[:-4]: zipf.read(name) # drop '.roi'
-                for name in name_list
-                if name.lower().endswith('.roi')
-            }
-            tag_json=None
+    def read_parallel(zip_path: str, label_image, num_threads: int = 4) -> RoiArray:
+        """
+            all ROIs of the zip in 1 RoiStore, handed out as a RoiArray: the ROIs by label, None where there is no ROI
+            -the .roi entries are found in the central directory, when they are stored (not compressed, as Fiji and
+             write_parallel do) they are decoded straight from the memory mapped zip, without a copy per entry
+            -the headers are parsed in 1 go (ROI_HEADER_DTYPE), the points of all ROIs go in 1 int32 buffer,
+             in chunks of about the same number of points on num_threads threads
+            -ROIs named Ldddd get label dddd, other ROIs get the label under their center in the label_image
+            -16 bit coordinates above 32767 are unwrapped, ROIs with subpixel coordinates take those, rounded to the pixel
+            -a save (update_parallel) that did not finish is skipped: the zip before it is read
+        """
+        import json
+        with open(zip_path, "rb") as f, TinyRoiFile._open_zip(f, zip_path) as zipf:
+            name_list = zipf.namelist()
+            infos = [info for info in zipf.infolist() if info.filename.lower().endswith('.roi')]
+            names = [info.filename[:-4] for info in infos] # drop '.roi'
+            measurements_data = None
+            if TinyRoiFile.MEASUREMENTS_NAME in name_list:
+                measurements_data = zipf.read(TinyRoiFile.MEASUREMENTS_NAME)
+            tag_json = None
             has_json = "tags.json" in name_list
             if has_json:
-                json_tags_data=zipf.read("tags.json")
+                json_tags_data = zipf.read("tags.json")
                 log("json detected")
-                import json
                 tag_json = json.loads(json_tags_data.decode("utf-8"))
 
-
-        names = list(roi_data_dict.keys())
-        all_l =TinyRoiFile._all_L_names(names)
-
-        if all_l:
-            roi_indices = [int(n[1:]) for n in names]
-            max_index = np.max(roi_indices)
-            l = len(names)
-            if l != max_index:
-                log(f"Mismatch between #ROI-files and indices: #ROI-files: {l} <> max. index: {max_index} ",type="error")
-                full = set(range(min(roi_indices), max(roi_indices) + 1))
-                missing = sorted(full - set(roi_indices))
-                log(f"Missing labels: {missing} ",type="error")
-            num_to_use = max(max_index,l)+1
-            roi_array=np.array([None] * (num_to_use),dtype=object) #List[Optional[Roi]] = [None] * (num_to_use)
-
-            if has_json:
-                for roi_name in names:
-                    data = roi_data_dict[roi_name]
-                    roi: Roi = TinyRoiFile._decode(data, roi_name)
-                    idx = int(roi_name[1:]) # number
-                    roi_array[idx] = roi
-                    values = tag_json.get(roi_name, None)
-                    if values:
-                        roi.state = Roi.str_to_state(values[0])
-                        roi.tags = set(values[1:])
+            sizes = np.array([info.file_size for info in infos], dtype=np.int64)
+            if infos and all(info.compress_type == zipfile.ZIP_STORED for info in infos):
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    buffer = np.frombuffer(mapped, dtype=np.uint8)
+                    starts = TinyRoiFile._data_starts(buffer, np.array([info.header_offset for info in infos], dtype=np.int64))
+                    decoded = TinyRoiFile._decode_entries(buffer, starts, sizes, names, num_threads)
+                    # the mmap can only be closed without views on it
+                    del buffer
             else:
-                for roi_name in names:
-                    data = roi_data_dict[roi_name]
-                    roi = TinyRoiFile._decode(data,roi_name)
-                    idx = int(roi_name[1:])
-                    roi_array[idx] = roi
+                # compressed entries are inflated into 1 buffer first
+                buffer = np.frombuffer(b"".join(zipf.read(info) for info in infos), dtype=np.uint8)
+                starts = np.zeros(len(infos), dtype=np.int64)
+                np.cumsum(sizes[:-1], out=starts[1:])
+                decoded = TinyRoiFile._decode_entries(buffer, starts, sizes, names, num_threads)
+        entries, coords, offsets, bounds = decoded
+
+        all_l = TinyRoiFile._all_L_names(names)
+        if all_l:
+            roi_indices = np.array([int(n[1:]) for n in names], dtype=np.int64)
+            labels = roi_indices[entries]
         else:
-            roi_dict = {}
-            for name in names:
-                data = roi_data_dict[name]
-                roi: Roi = TinyRoiFile._decode(data,name)
-                (cx,cy) = (roi.center)
-                idx = label_image[int(cy),int(cx)]
-                roi_dict[idx] = roi
-            kys = list(roi_dict.keys())
-            max_index = np.max(kys)
-            l = len(kys)
-            num_to_use = max(max_index,l)+1
-            max_digits = len(str(num_to_use))
-            labels = [f"L{idx:0{max_digits}d}" for idx in range(num_to_use)]
-            roi_array=np.array([None] * (num_to_use),dtype=object)
-            for idx,roi in roi_dict.items(): 
-                roi_array[idx]=roi
-                roi.name=labels[idx]
+            # the label under the center (mean of the points)
+            counts = np.diff(offsets)
+            center = np.add.reduceat(coords.astype(np.float64), offsets[:-1], axis=0) / counts[:, None] if len(entries) else np.zeros((0, 2))
+            labels = np.asarray(label_image[center[:, 1].astype(np.int64), center[:, 0].astype(np.int64)], dtype=np.int64)
+            roi_indices = np.unique(labels)
+        num_to_use = 1
+        if len(roi_indices):
+            max_index = int(np.max(roi_indices))
+            l = len(roi_indices)
+            num_to_use = max(max_index, l) + 1
             if l != max_index:
                 log(f"Mismatch between #ROI-files and indices: #ROI-files: {l} <> max. index: {max_index} ",type="error")
-                full = set(range(min(kys), max_index + 1))
-                missing = sorted(full - set(kys))
+                full = set(range(int(np.min(roi_indices)), max_index + 1))
+                missing = sorted(full - set(roi_indices.tolist()))
                 log(f"Missing labels: {missing} ",type="error")
-        return roi_array
-    
-    @staticmethod
-    def _decode(data: bytes, name: str = "") -> Optional[Roi]:
-        if data[0:4] != b'Iout':
-            log(f"{name} is not a valid ROI file (missing 'Iout' signature)", type="error")
-            return None
-
-        roi_type: int = data[6]
-        if roi_type not in TinyRoiFile.SUPPORTED_ROI_TYPES:
-            log(f"File {name} contains a not supported ROI type: {roi_type}", type="error")
-            return None
 
-        
-        top, left, bottom, right, n = np.frombuffer(data, dtype='>i2', count=5, offset=8)
+        # last one wins for duplicate labels, the rows are in label order
+        _, last = np.unique(labels[::-1], return_index=True)
+        keep = len(labels) - 1 - last
+        if not np.array_equal(keep, np.arange(len(labels))):
+            counts = np.diff(offsets)[keep]
+            coords = coords[ragged_index(offsets[keep], counts)]
+            offsets = np.zeros(len(keep) + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+        labels, entries, bounds = labels[keep], entries[keep], bounds[keep]
+
+        state, tags = None, None
+        if all_l and tag_json is not None:
+            values = [tag_json.get(names[i]) for i in entries.tolist()]
+            state = np.array([Roi.str_to_state(v[0]) if v else Roi.ROI_STATE_ACTIVE for v in values], dtype=np.uint8)
+            tags = [v[1:] if v else None for v in values]
+        counts = np.diff(offsets)
+        center = np.add.reduceat(coords.astype(np.float64), offsets[:-1], axis=0) / counts[:, None] if len(labels) else None
+
+        store = RoiStore(capacity=len(labels), point_capacity=len(coords), num_threads=num_threads)
+        store.extend_buffers(labels, coords, offsets, state=state, tags=tags, bounds=bounds, center=center)
+        if measurements_data is not None:
+            TinyRoiFile._attach_measurements(store, measurements_data)
+        return RoiArray(store, num_to_use)
 
-        HEADER_SIZE=TinyRoiFile.HEADER_SIZE
-        x = np.frombuffer(data[HEADER_SIZE : HEADER_SIZE + 2 * n], dtype='>i2').astype(np.int32)
-        y = np.frombuffer(data[HEADER_SIZE + 2 * n : HEADER_SIZE + 4 * n], dtype='>i2').astype(np.int32)
+    @staticmethod
+    def _open_zip(f, zip_path: str) -> zipfile.ZipFile:
+        """the zip in f; after an update that did not finish: the complete zip before it, read in memory"""
+        try:
+            return zipfile.ZipFile(f, 'r')
+        except zipfile.BadZipFile:
+            directory = TinyRoiFile._zip_directory(f, f.seek(0, os.SEEK_END))
+            if directory is None:
+                raise
+            end = directory[0]
+            log(f"{zip_path}: the last save did not finish, the {f.tell() - end} bytes after the zip are skipped", type="warning")
+            f.seek(0)
+            return zipfile.ZipFile(io.BytesIO(f.read(end)), 'r')
 
-        xpoints = x + left
-        ypoints = y + top
+    @staticmethod
+    def _data_starts(buffer: np.ndarray, header_offsets: np.ndarray) -> np.ndarray:
+        """where the data of the entries start: after the local header, its name and its extra field"""
+        def uint16_at(at):
+            return buffer[at].astype(np.int64) | (buffer[at + 1].astype(np.int64) << 8)
+        return header_offsets + 30 + uint16_at(header_offsets + 26) + uint16_at(header_offsets + 28)
 
-        center=(np.mean(xpoints),np.mean(ypoints))
+    @staticmethod
+    def _decode_entries(buffer: np.ndarray, starts: np.ndarray, sizes: np.ndarray, names: list[str],
+                        num_threads: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+            decodes the .roi entries at buffer[starts[i]:starts[i]+sizes[i]]
+            returns (entries, coords, offsets, headers): the valid entries, their points (x,y) in 1 buffer,
+            the points of entries[i] are coords[offsets[i]:offsets[i+1]], their headers
+        """
+        HEADER_SIZE = TinyRoiFile.HEADER_SIZE
+        headers = np.zeros(len(starts), dtype=TinyRoiFile.ROI_HEADER_DTYPE)
+        complete = sizes >= HEADER_SIZE
+        headers[complete] = buffer[starts[complete, None] + np.arange(HEADER_SIZE)].view(TinyRoiFile.ROI_HEADER_DTYPE)[:, 0]
+
+        n = headers["n"].astype(np.int64)
+        # more than 65535 points: n is 0, the number of points is in the size field
+        n = np.where(n == 0, headers["size"].astype(np.int64), n)
+        subpixel = (headers["version"] >= 222) & ((headers["options"] & TinyRoiFile.SUB_PIXEL_RESOLUTION) != 0)
+        is_roi = headers["magic"] == b'Iout'
+        supported = is_roi & np.isin(headers["roi_type"], list(TinyRoiFile.SUPPORTED_ROI_TYPES))
+        valid = supported & (n > 0) & (sizes >= HEADER_SIZE + 4 * n + np.where(subpixel, 8 * n, 0))
+        for i in np.flatnonzero(~valid).tolist():
+            if not is_roi[i]:
+                log(f"{names[i]} is not a valid ROI file (missing 'Iout' signature)", type="error")
+            elif not supported[i]:
+                log(f"File {names[i]} contains a not supported ROI type: {headers['roi_type'][i]}", type="error")
+            else:
+                log(f"{names[i]} is not a valid ROI file (#coords: {n[i]}, size: {sizes[i]} bytes)", type="error")
+
+        entries = np.flatnonzero(valid)
+        headers, n, subpixel = headers[entries], n[entries], subpixel[entries]
+        x_starts = starts[entries] + HEADER_SIZE
+        bounds = TinyRoiFile._unwrap_bounds(headers)
+        top = bounds[:, 0]
+        left = bounds[:, 1]
+        offsets = np.zeros(len(entries) + 1, dtype=np.int64)
+        np.cumsum(n, out=offsets[1:])
+        coords = np.empty((offsets[-1], 2), dtype=np.int32)
+
+        def value_at(at, dtype):
+            # big-endian, at any (odd) byte position
+            return buffer[at[:, None] + np.arange(np.dtype(dtype).itemsize)].view(dtype)[:, 0]
+
+        def unsigned16_at(at):
+            # coordinates relative to left/top above 32767 are wrapped
+            return value_at(at, '>u2').astype(np.int32)
+
+        def worker(first, last):
+            entry = np.repeat(np.arange(first, last), n[first:last])
+            k = np.arange(offsets[first], offsets[last]) - offsets[entry]
+            x_at = x_starts[entry] + 2 * k
+            block = coords[offsets[first]:offsets[last]]
+            block[:, 0] = unsigned16_at(x_at) + left[entry]
+            block[:, 1] = unsigned16_at(x_at + 2 * n[entry]) + top[entry]
+            # the absolute float32 coordinates after the int16 ones, rounded to the pixel
+            points = np.flatnonzero(subpixel[entry])
+            if len(points):
+                entry, f_at = entry[points], x_starts[entry[points]] + 4 * n[entry[points]] + 4 * k[points]
+                block[points, 0] = np.rint(value_at(f_at, '>f4'))
+                block[points, 1] = np.rint(value_at(f_at + 4 * n[entry], '>f4'))
+
+        chunks = chunk_bounds(offsets, num_threads) if num_threads > 1 else np.array([0, len(entries)])
+        if len(chunks) <= 2:
+            worker(chunks[0], chunks[-1])
+        else:
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                list(executor.map(worker, chunks[:-1], chunks[1:]))
 
-        return Roi(xpoints, ypoints, name=name, state=Roi.ROI_STATE_ACTIVE, center = center, bounds=(top, left, bottom, right), n=n)
+        if subpixel.any():
+            # the 16 bit bounds can not hold these: (top, left, bottom, right) of the points
+            low = np.minimum.reduceat(coords, offsets[:-1], axis=0)
+            high = np.maximum.reduceat(coords, offsets[:-1], axis=0)
+            bounds[subpixel] = np.column_stack((low[:, 1], low[:, 0], high[:, 1], high[:, 0]))[subpixel]
+        return entries, coords, offsets, bounds
 
+    @staticmethod
+    def _unwrap_bounds(headers: np.ndarray) -> np.ndarray:
+        """
+            (top, left, bottom, right) of the headers as int32, like Fiji and roifile read them:
+            values below MIN_INT_COORD are wrapped, a bottom/right in MIN_INT_COORD..0 that is not
+            below/right of top/left is wrapped too
+        """
+        bounds = np.column_stack([headers[key].astype(np.int32) for key in ("top", "left", "bottom", "right")])
+        bounds[bounds < TinyRoiFile.MIN_INT_COORD] += 65536
+        for end, start in ((2, 0), (3, 1)):
+            wrapped = (bounds[:, end] >= TinyRoiFile.MIN_INT_COORD) & (bounds[:, end] <= 0) & (bounds[:, end] <= bounds[:, start])
+            bounds[wrapped, end] += 65536
+        return bounds
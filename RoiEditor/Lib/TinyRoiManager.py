@@ -13,14 +13,53 @@ from typing import Optional, Any
 from numpy.typing import NDArray
 import numpy as np
 from typing import Optional, Callable
+import functools
 
 from .Roi import Roi
-from .Feret import feret_index
+from .RoiStore import RoiStore, RoiArray
+from .LabelPixelIndex import LabelPixelIndex
+from .RoiSpatialIndex import RoiSpatialIndex
+from .RoiJournal import RoiJournal
+from .Feret import feret_index, shape_index
+from .LabelMoments import label_moments, moment_values, polygon_moments, pixel_moments, moments_index
 from .TinyLog import log
-from .Feret import get_values
 
 from PyQt6.QtCore import QObject
+
+def _to_lut(transition: dict[int,int]) -> np.ndarray:
+    """lookup table for the uint8 state column: new_state = LUT[state]"""
+    lut = np.arange(256, dtype=np.uint8)
+    for old_state, new_state in transition.items():
+        lut[old_state] = new_state
+    return lut
+
+def _journaled(method):
+    """
+        records the state, tag and reason changes made by a TinyRoiManager method in its journal
+        the method passes the rows it is about to change to _touch: only those rows are copied, not the columns
+    """
+    @functools.wraps(method)
+    def wrapper(self: "TinyRoiManager", *args, **kwargs):
+        if self._touched is not None:
+            # called from another journaled method: that one records
+            return method(self, *args, **kwargs)
+        self._touched = []
+        try:
+            result = method(self, *args, **kwargs)
+            touched = self._touched
+        finally:
+            self._touched = None
+        if touched:
+            self.journal.record(self._store, *(np.concatenate(column) for column in zip(*touched)))
+        return result
+    return wrapper
+
 class TinyRoiManager(QObject):
+    """
+        keeps track of all ROIs, their state and their tags
+        state changes are applied to the whole state column at once with lookup tables,
+        they return the (row) indices of the ROIs whose state changed so callers can limit redrawing to those
+    """
 
     TOGGLE: dict[int,int] = {Roi.ROI_STATE_DELETED: Roi.ROI_STATE_DELETED,
                              Roi.ROI_STATE_SELECTED: Roi.ROI_STATE_ACTIVE,
@@ -36,32 +75,76 @@ class TinyRoiManager(QObject):
                              Roi.ROI_STATE_SELECTED: Roi.ROI_STATE_ACTIVE
     }
 
-    def __init__(self, filtered_label_image: np.ndarray=None,parent=None):
+    TOGGLE_LUT: np.ndarray = _to_lut(TOGGLE)
+    DELETE_SELECTED_LUT: np.ndarray = _to_lut(DELETE_SELECTED)
+    DESELECT_LUT: np.ndarray = _to_lut(DESELECT)
+
+    def __init__(self, filtered_label_image: np.ndarray=None,parent=None,num_threads: int=1):
         super().__init__(parent=parent)
-        self._name_to_roi: dict[str, Roi] = {}
+        if filtered_label_image is not None and not TinyRoiManager._in_memory(filtered_label_image):
+            # e.g. a memory-mapped label image of the tiled backend: it is not loaded in full to index its pixels
+            log("label image is read in parts: no pixel index, deleted ROIs are not cleared from it", type="warning")
+            filtered_label_image = None
+        # threads for the geometry and Feret measurements
+        self.num_threads: int = num_threads
+        # all ROI data lives in a columnar store, the Roi objects are views on its rows
+        self._store: RoiStore = RoiStore(num_threads=num_threads)
         self.filtered_label_image=filtered_label_image
         self._use_label_image: bool= self.filtered_label_image is not None
+        # where the pixels of each label are, deleting a ROI only touches its own pixels
+        self._pixel_index: Optional[LabelPixelIndex] = LabelPixelIndex(filtered_label_image) if self._use_label_image else None
+        # pixel moments of every label, taken from the label image on the first moments()
+        self._label_moments: Optional[np.ndarray] = None
+        # grid over the ROI bounds, built on the first spatial query
+        self._spatial_index: Optional[RoiSpatialIndex] = None
+        # state and tag changes, for undo/redo and crash recovery
+        self.journal: RoiJournal = RoiJournal()
+        # (rows, state, tag_id, reason_id) before the change, while a journaled method runs
+        self._touched: Optional[list[tuple[np.ndarray, ...]]] = None
+
+    @staticmethod
+    def _in_memory(label_image) -> bool:
+        """a writable array in memory, not a np.memmap on the file or a LabelSource.TiffTileReader"""
+        return (isinstance(label_image, np.ndarray) and label_image.flags.writeable
+                and getattr(label_image, "filename", None) is None)
 
     @classmethod
     def is_valid(cls,rm: "TinyRoiManager"):
-        return rm is not None and len(rm._name_to_roi)>0
+        return rm is not None and len(rm._store)>0
+
+    @property
+    def store(self) -> RoiStore:
+        return self._store
+
+    @property
+    def spatial_index(self) -> RoiSpatialIndex:
+        if self._spatial_index is None or self._spatial_index.store is not self._store:
+            self._spatial_index = RoiSpatialIndex(self._store)
+        return self._spatial_index
 
     @property
     def num_of_rois(self):
-        return len(self._name_to_roi)
+        return len(self._store)
     
     def as_array(self):
-        arr:  NDArray[Any]=np.ndarray(self._name_to_roi.values())
+        arr:  NDArray[Any]=np.array(self._store.views(),dtype=object)
         return arr
 
     def add_from_list_unchecked(self,rois):
-        self._name_to_roi ={roi.name: roi for roi in rois if roi}
-
-        if self._use_label_image:
-            labels_to_clear = [int(roi.name[1:]) for roi in rois if roi and roi.state == Roi.ROI_STATE_DELETED]
-            if labels_to_clear:
-                mask = np.isin(self.filtered_label_image, labels_to_clear)
-                self.filtered_label_image[mask] = 0 
+        self._restore_labels(np.flatnonzero(self._store.state == Roi.ROI_STATE_DELETED))
+        self.journal.clear()
+        if isinstance(rois, RoiArray) and not rois.taken:
+            # e.g. read from a zip: the store is used as it is, no Roi objects are made
+            rois.taken = True
+            self._store = rois.store
+            self._store.num_threads = self.num_threads
+        else:
+            # last one wins for duplicate labels, like a dict would do
+            label_to_roi = {roi.label: roi for roi in rois if roi}
+            self._store = RoiStore(capacity=len(label_to_roi), num_threads=self.num_threads)
+            self._store.extend(list(label_to_roi.values()))
+
+        self._clear_labels(np.flatnonzero(self._store.state == Roi.ROI_STATE_DELETED))
 
     def add(self, rois):
         if not isinstance(rois, (list, set)):
@@ -69,192 +152,368 @@ class TinyRoiManager(QObject):
 
         for roi in rois:
             if roi:
-                self._name_to_roi[roi.name] = roi
+                self.add_unchecked(roi)
 
     def add_unchecked(self, roi):
-        if roi:
-            self._name_to_roi[roi.name] = roi
-
-    def delete(self, rois_or_names):
-        labels_to_clear: list[int] =[]
-        for roi in self.iter_rois_or_names(rois_or_names):
-            if roi:
-                roi.state = Roi.ROI_STATE_DELETED
-                if roi.reason_of_selection:
-                    roi.tags.add(roi.reason_of_selection)
-                    roi.reason_of_selection = ""
-                label = int(roi.name[1:])
-                labels_to_clear.append(label)
-        if labels_to_clear and self._use_label_image:
-            mask = np.isin(self.filtered_label_image, labels_to_clear)
-            self.filtered_label_image[mask] = 0   
-
-    def delete_selected(self,reason_of_deletion=None):
-        labels_to_clear: list[int] =[]
-        for roi in self._name_to_roi.values():
-            if roi.state == Roi.ROI_STATE_SELECTED:
-                roi.state = Roi.ROI_STATE_DELETED
-                if reason_of_deletion:
-                    roi.tags.add(reason_of_deletion)
-                elif roi.reason_of_selection:
-                    roi.tags.add(roi.reason_of_selection)
-                roi.reason_of_selection = ""
-                label = int(roi.name[1:])
-                labels_to_clear.append(label)
-        if self._use_label_image and labels_to_clear:
-            mask = np.isin(self.filtered_label_image, labels_to_clear)
-            self.filtered_label_image[mask] = 0
-   
-
-    def toggle(self, rois_or_names):
-        for roi in self.iter_rois_or_names(rois_or_names):
-            roi.state = self.TOGGLE[roi.state]
-            roi.reason_of_selection = ""
-
-    def select(self, rois_or_names, reason_of_selection=None,additive=False):
+        if not roi or roi._store is self._store:
+            return
+        row = self._store.row_of_label(roi.label)
+        if row is None:
+            self._store.append(roi)
+            row = len(self._store) - 1
+            if roi.state == Roi.ROI_STATE_DELETED:
+                self._clear_labels(np.array([row]))
+        else:
+            was_deleted = self._store.state[row] == Roi.ROI_STATE_DELETED
+            self._store.replace(row, roi)
+            is_deleted = roi.state == Roi.ROI_STATE_DELETED
+            if is_deleted and not was_deleted:
+                self._clear_labels(np.array([row]))
+            elif was_deleted and not is_deleted:
+                self._restore_labels(np.array([row]))
+        if self._spatial_index is not None and self._spatial_index.store is self._store:
+            self._spatial_index.update(row)
+
+    def _clear_labels(self, rows: np.ndarray):
+        if self._use_label_image and len(rows):
+            self._pixel_index.clear(self.filtered_label_image, self._store.label[rows])
+
+    def _restore_labels(self, rows: np.ndarray):
+        if self._use_label_image and len(rows):
+            self._pixel_index.restore(self.filtered_label_image, self._store.label[rows])
+
+    def _touch(self, rows: np.ndarray):
+        """keeps the state, tags and reason of the given rows before a journaled method changes them"""
+        if self._touched is not None and len(rows):
+            store = self._store
+            self._touched.append((rows, store.state[rows], store.tag_id[rows], store.reason_id[rows]))
+
+    def _apply(self, lut: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """applies a state transition to the given rows (None: all rows), returns the rows that changed"""
+        state = self._store.state
+        if rows is None:
+            new_state = lut[state]
+            changed = np.flatnonzero(new_state != state)
+            self._touch(changed)
+            state[changed] = new_state[changed]
+            return changed
+        self._touch(rows)
+        new_state = lut[state[rows]]
+        changed = rows[new_state != state[rows]]
+        state[rows] = new_state
+        return np.unique(changed)
+
+    @_journaled
+    def delete(self, rois_or_names) -> np.ndarray:
+        store = self._store
+        rows = self._rows_of(rois_or_names)
+        self._touch(rows)
+        changed = rows[store.state[rows] != Roi.ROI_STATE_DELETED]
+        store.state[rows] = Roi.ROI_STATE_DELETED
+        store.tag_with_reason(rows)
+        store.set_reason(rows, None)
+        self._clear_labels(rows)
+        return np.unique(changed)
+
+    @_journaled
+    def delete_selected(self,reason_of_deletion=None) -> np.ndarray:
+        store = self._store
+        rows = np.flatnonzero(store.state == Roi.ROI_STATE_SELECTED)
+        self._touch(rows)
+        if reason_of_deletion:
+            store.add_tag(rows, reason_of_deletion)
+        else:
+            store.tag_with_reason(rows)
+        store.set_reason(rows, None)
+        self._apply(self.DELETE_SELECTED_LUT, rows)
+        self._clear_labels(rows)
+        return rows
+
+    @_journaled
+    def toggle(self, rois_or_names) -> np.ndarray:
+        """toggles each ROI once per time it is given: a ROI given twice ends up as it was (TOGGLE is its own inverse)"""
+        rows = self._rows_of(rois_or_names)
+        self._touch(rows)
+        self._store.set_reason(rows, None)
+        rows, counts = np.unique(rows, return_counts=True)
+        return self._apply(self.TOGGLE_LUT, rows[counts % 2 == 1])
+
+    @_journaled
+    def select(self, rois_or_names, reason_of_selection=None,additive=False) -> np.ndarray:
+        store = self._store
+        rows = self._rows_of(rois_or_names)
+        # only the selected ROIs and the given ones can change state
+        candidates = rows if additive else np.union1d(np.flatnonzero(store.state == Roi.ROI_STATE_SELECTED), rows)
+        before = store.state[candidates]
         if not additive:
-            for roi in self._name_to_roi.values():
-                roi.state = self.DESELECT[roi.state]
-                roi.reason_of_selection=""
-        for roi in self.iter_rois_or_names(rois_or_names):
-            if roi:
-                roi.state = Roi.ROI_STATE_SELECTED
-                roi.reason_of_selection = reason_of_selection
-
-    def select_within(self, rectangle, additive=False):
+            self._clear_reasons()
+            self._apply(self.DESELECT_LUT)
+        self._touch(rows)
+        store.state[rows] = Roi.ROI_STATE_SELECTED
+        store.set_reason(rows, reason_of_selection)
+        return np.unique(candidates[store.state[candidates] != before])
+
+    @_journaled
+    def select_within(self, rectangle, additive=False) -> np.ndarray:
         """Select all ROIs whose bounding rectangles are fully within the given rectangle."""
-        if not additive:
-            for roi in self._name_to_roi.values():
-                roi.state = self.DESELECT[roi.state]
+        store = self._store
+        changed = np.empty(0, dtype=np.int64) if additive else self._apply(self.DESELECT_LUT)
         rect_xmin = int(rectangle.x())
         rect_ymin = int(rectangle.y())
         rect_xmax = int(rectangle.x() + rectangle.width())
         rect_ymax = int(rectangle.y() + rectangle.height())
         log(f"Set rectangle: ({rect_xmin},{rect_ymin}) ({rect_xmax},{rect_ymax})")
 
-        for roi in self._name_to_roi.values():
-            if roi.state != Roi.ROI_STATE_ACTIVE:
-                continue
-            (top, left, bottom, right) = roi.bounds
-            if (rect_xmin <= left and
-                rect_ymin <= top and
-                rect_xmax >= right and
-                rect_ymax >= bottom):
-                roi.state = Roi.ROI_STATE_SELECTED
-                roi.reason_of_selection = ""
-
-    def unselect_all(self):
-        for roi in self._name_to_roi.values():
-            roi.state = self.DESELECT[roi.state]
-            roi.reason_of_selection = ""
-
-    def set_state(self, rois_or_names, new_state):
-        for name in self._resolve_names(rois_or_names):
-            roi = self._name_to_roi.get(name)
-            if roi:
-                roi.state = new_state
-                roi.reason_of_selection = ""
+        rows = self.spatial_index.within(rect_ymin, rect_xmin, rect_ymax, rect_xmax)
+        rows = rows[store.state[rows] == Roi.ROI_STATE_ACTIVE]
+        self._touch(rows)
+        store.state[rows] = Roi.ROI_STATE_SELECTED
+        store.set_reason(rows, None)
+        return np.union1d(changed, rows)
+
+    @_journaled
+    def unselect_all(self) -> np.ndarray:
+        self._clear_reasons()
+        return self._apply(self.DESELECT_LUT)
+
+    def _clear_reasons(self):
+        rows = np.flatnonzero(self._store.reason_id)
+        self._touch(rows)
+        self._store.reason_id[rows] = 0
+
+    @_journaled
+    def set_state(self, rois_or_names, new_state) -> np.ndarray:
+        store = self._store
+        rows = self._rows_of(rois_or_names)
+        self._touch(rows)
+        changed = np.unique(rows[store.state[rows] != new_state])
+        undeleted = changed[store.state[changed] == Roi.ROI_STATE_DELETED]
+        store.state[rows] = new_state
+        store.set_reason(rows, None)
+        if new_state == Roi.ROI_STATE_DELETED:
+            self._clear_labels(changed)
+        else:
+            self._restore_labels(undeleted)
+        return changed
+
+    def _apply_transaction(self, labels: np.ndarray, state: np.ndarray, tag_id: np.ndarray, reason_id: np.ndarray) -> np.ndarray:
+        """sets state, tags and reason of the ROIs with the given labels, returns their rows"""
+        store = self._store
+        rows = store.rows_of_labels(labels)
+        known = rows >= 0
+        rows = rows[known]
+        was_deleted = store.state[rows] == Roi.ROI_STATE_DELETED
+        is_deleted = state[known] == Roi.ROI_STATE_DELETED
+        store.state[rows] = state[known]
+        store.tag_id[rows] = tag_id[known]
+        store.reason_id[rows] = reason_id[known]
+        self._clear_labels(rows[is_deleted & ~was_deleted])
+        self._restore_labels(rows[was_deleted & ~is_deleted])
+        return np.unique(rows)
+
+    def undo(self) -> np.ndarray:
+        delta = self.journal.undo(self._store)
+        if delta is None:
+            log("Nothing to undo")
+            return np.empty(0, dtype=np.int64)
+        return self._apply_transaction(delta["label"], delta["new_state"], delta["new_tags"], delta["new_reason"])
+
+    def redo(self) -> np.ndarray:
+        delta = self.journal.redo(self._store)
+        if delta is None:
+            log("Nothing to redo")
+            return np.empty(0, dtype=np.int64)
+        return self._apply_transaction(delta["label"], delta["new_state"], delta["new_tags"], delta["new_reason"])
+
+    def replay_journal(self, journal_path: str) -> int:
+        """replays the changes in a journal file on the ROIs of the full save it started from, returns the #changes"""
+        _, transactions, tag_sets, reasons = RoiJournal.read(journal_path)
+        store = self._store
+        # ids in the file -> ids in this store
+        tag_map = np.zeros(max(tag_sets) + 1, dtype=np.uint32)
+        for tag_id, tags in tag_sets.items():
+            tag_map[tag_id] = store.intern_tags(tags)
+        reason_map = np.zeros(max(reasons) + 1, dtype=np.uint32)
+        for reason_id, reason in reasons.items():
+            reason_map[reason_id] = store.intern_reason(reason)
+        for delta in transactions:
+            self._apply_transaction(delta["label"], delta["new_state"], tag_map[delta["new_tags"]], reason_map[delta["new_reason"]])
+        return sum(len(delta) for delta in transactions)
 
     def get_measurements_by_filter(self, filter: Optional[Callable[[Roi], None]] = None) -> dict[str, list[float]]:
-        keys = ["Area"] + list(feret_index.keys())+["Roi"]
-        result = {key: [] for key in keys}
-        filter = filter or (lambda _: True)
-        for _, roi in self.iter_by_filter(filter):
-            result["Area"].append(roi.area)
-            ferets = roi.feret_values
-            for feret_name, index in feret_index.items():
-                result[feret_name].append(ferets[index])
-            result["Roi"].append(roi)
-        for key in keys:
-            result[key]=np.array(result[key])
+        store = self._store
+        rois = self.as_array()
+        if filter:
+            mask = np.fromiter((bool(filter(roi)) for roi in rois), dtype=bool, count=len(rois))
+        else:
+            mask = np.ones(len(rois), dtype=bool)
+        result = {"Area": store.areas()[mask].copy()}
+        ferets = store.ferets()[mask]
+        for feret_name, index in feret_index.items():
+            result[feret_name] = ferets[:, index].copy()
+        shapes = store.shapes()[mask]
+        for shape_name, index in shape_index.items():
+            result[shape_name] = shapes[:, index].copy()
+        moments = self.moments()[mask]
+        for moments_name, index in moments_index.items():
+            result[moments_name] = moments[:, index].copy()
+        result["Roi"] = rois[mask]
         return result
 
     def get_measurements_by_state(self, state: int = None) -> dict[str, list[float]]:
-        keys = ["Area"] + list(feret_index.keys())
-        result = {key: [] for key in keys}
         state = state or Roi.ROI_STATE_ACTIVE
-        for _, roi in self.iter_by_state(state):
-            result["Area"].append(roi.area)
-            ferets = roi.feret_values()
-            for feret_name, index in feret_index.items():
-                result[feret_name].append(ferets[index])
+        store = self._store
+        mask = store.state == state
+        result = {"Area": store.areas()[mask].tolist()}
+        ferets = store.ferets()[mask]
+        for feret_name, index in feret_index.items():
+            result[feret_name] = ferets[:, index].tolist()
+        shapes = store.shapes()[mask]
+        for shape_name, index in shape_index.items():
+            result[shape_name] = shapes[:, index].tolist()
+        moments = self.moments()[mask]
+        for moments_name, index in moments_index.items():
+            result[moments_name] = moments[:, index].tolist()
 
         return result
 
-    def get_roi(self, name):
-        return self._name_to_roi.get(name)
-
-    def get_state(self, name):
-        roi = self._name_to_roi.get(name)
-        return roi.state if roi else None
-
-    def get_tags(self, name):
-        roi = self._name_to_roi.get(name)
-        return roi.tags if roi else set()
-
-    def set_tags(self, name, tags):
-        roi = self._name_to_roi.get(name)
-        if roi:
-            roi.tags = set(tags)
+    def moments(self) -> np.ndarray:
+        """
+            the measurements from the pixels of each ROI, columns as in LabelMoments.moments_index
+            they are kept per row in the store, only rows without them are computed
+        """
+        store = self._store
+        rows = np.flatnonzero((store.flags & store.HAS_MOMENTS) == 0)
+        if len(rows):
+            store.set_moments(rows, moment_values(self._moments_of(rows)))
+        return store.moments()
+
+    def _moments_of(self, rows: np.ndarray) -> np.ndarray:
+        """
+            the moments (rows as in LabelMoments.label_moments) of the given rows
+            -from the label image: the moments of all labels in 1 bincount pass, on the first call
+            -the labels of deleted ROIs are cleared from the image: from their pixels in the pixel index
+            -without label image, or for a ROI without pixels: from its filled polygon
+        """
+        labels = self._store.label[rows].astype(np.int64)
+        moments = np.zeros((len(rows), 6), dtype=np.float64)
+        known = np.zeros(len(rows), dtype=bool)
+        if self._use_label_image:
+            if self._label_moments is None:
+                self._label_moments = label_moments(self.filtered_label_image)
+            inside = (labels >= 0) & (labels < len(self._label_moments))
+            known[inside] = self._label_moments[labels[inside], 0] > 0
+            moments[known] = self._label_moments[labels[known]]
+            width = self._pixel_index.shape[1]
+            for i in np.flatnonzero(~known):
+                pixels = self._pixel_index.pixels_of(labels[i])
+                if len(pixels):
+                    y, x = np.divmod(pixels, width)
+                    moments[i] = pixel_moments(x, y)
+                    known[i] = True
+        missing = np.flatnonzero(~known)
+        if len(missing):
+            moments[missing] = polygon_moments(*self._store.coords_of(rows[missing]))
+        return moments
+
+    def _row_of(self, name_or_label) -> Optional[int]:
+        if isinstance(name_or_label, (int, np.integer)):
+            return self._store.row_of_label(int(name_or_label))
+        return self._store.row_of(name_or_label)
+
+    def get_roi(self, name_or_label):
+        row = self._row_of(name_or_label)
+        return self._store.view(row) if row is not None else None
+
+    def get_state(self, name_or_label):
+        row = self._row_of(name_or_label)
+        return int(self._store.state[row]) if row is not None else None
+
+    def get_tags(self, name_or_label):
+        row = self._row_of(name_or_label)
+        return self._store.tags(row) if row is not None else set()
+
+    @_journaled
+    def set_tags(self, name_or_label, tags):
+        row = self._row_of(name_or_label)
+        if row is not None:
+            self._touch(np.array([row]))
+            self._store.set_tags(row, tags)
+
+    def get_roi_at(self, x: float, y: float) -> Optional[Roi]:
+        """the ROI whose polygon contains (x,y), the one drawn last when they overlap"""
+        rows = self.spatial_index.contains_point(x, y)
+        return self._store.view(int(rows.max())) if len(rows) else None
 
     def get_all_names(self, exclude_deleted=False):
-        return [
-            name for name, roi in self._name_to_roi.items()
-            if not exclude_deleted or roi.state != Roi.ROI_STATE_DELETED
-        ]
+        names = self._store.names
+        if not exclude_deleted:
+            return list(names)
+        keep = self._store.state != Roi.ROI_STATE_DELETED
+        return [names[row] for row in np.flatnonzero(keep)]
 
     def list_rois(self):
-        return list(self._name_to_roi.values())
+        return self._store.views()
 
     def __len__(self):
-        return len(self._name_to_roi)
+        return len(self._store)
 
     def __iter__(self):
-        for name, roi in self._name_to_roi.items():
-            if roi.state != Roi.ROI_STATE_DELETED:
-                yield name, roi
+        store = self._store
+        for row in np.flatnonzero(store.state != Roi.ROI_STATE_DELETED):
+            roi = store.view(int(row))
+            yield roi.name, roi
 
     def iter_all(self):
-        return iter(self._name_to_roi.items())
+        store = self._store
+        return ((roi.name, roi) for roi in store.views())
 
     def iter_by_state(self, target_state):
-        for name, roi in self._name_to_roi.items():
-            if roi.state == target_state:
-                yield name, roi
+        store = self._store
+        for row in np.flatnonzero(store.state == target_state):
+            roi = store.view(int(row))
+            yield roi.name, roi
 
     def iter_by_filter(self, filter_fn):
-        for name, roi in self._name_to_roi.items():
+        for roi in self._store.views():
             if filter_fn(roi):
-                yield name, roi
+                yield roi.name, roi
 
     def map_over_rois(self, func):
-        return [func(roi) for roi in self._name_to_roi.values() if roi.state != Roi.ROI_STATE_DELETED]
+        return [func(roi) for _, roi in self]
 
     def get_sample(self):
-        for roi in self._name_to_roi.values():
-            return roi
+        if len(self._store):
+            return self._store.view(0)
         return None
 
     def iter_rois_or_names(self, rois_or_names):
-        if not isinstance(rois_or_names, (list, np.ndarray, tuple)):
-            rois_or_names = np.array([rois_or_names])
-        if not len(rois_or_names)>0:
-            return None
-        if isinstance(rois_or_names[0],str):
-            names = rois_or_names
-            for name in names:
-                roi = self._name_to_roi.get(name)
-                if roi:
-                    yield roi
-                else:
-                    log("Unexpected empty ROI encountered",type ="warning")                    
-        if isinstance(rois_or_names[0],Roi):
-            rois= rois_or_names
-            for roi in rois:
-                if roi:
-                    yield roi
-                else:
-                    log("Unexpected empty ROI encountered",type ="warning")
+        store = self._store
+        for row in self._rows_of(rois_or_names):
+            yield store.view(int(row))
+
+    def _rows_of(self, rois_or_names) -> np.ndarray:
+        """row indices in the store for a (list of) labels, names or Roi objects, unknown ones are skipped"""
+        store = self._store
+        if isinstance(rois_or_names, np.ndarray) and rois_or_names.dtype.kind in "iu":
+            rows = store.rows_of_labels(rois_or_names)
+            if np.any(rows < 0):
+                log("Unexpected empty ROI encountered",type ="warning")
+            return rows[rows >= 0]
+        if not isinstance(rois_or_names, (list, set, np.ndarray, tuple)):
+            rois_or_names = [rois_or_names]
+        rows: list[int] = []
+        for item in rois_or_names:
+            if isinstance(item, Roi) and item._store is store:
+                rows.append(item._row)
+                continue
+            # a label, a name or a Roi from elsewhere: use the one of this manager with the same label
+            row = store.row_of_label(item.label) if isinstance(item, Roi) else self._row_of(item)
+            if row is None:
+                log("Unexpected empty ROI encountered",type ="warning")
+            else:
+                rows.append(row)
+        return np.array(rows, dtype=np.int64)
 
     def _resolve_names(self, rois_or_names):
         if not isinstance(rois_or_names, (list, set,np.ndarray)):
@@ -266,15 +525,15 @@ class TinyRoiManager(QObject):
 
 
     def force_feret(self):
-        for roi in self._name_to_roi.values():
-
-            roi.feret_values=get_values(roi.xpoints, roi.ypoints)
-            #_ = roi.feret_values
+        """computes the Feret values and shape descriptors that are not known yet, e.g. not read from the zip"""
+        store = self._store
+        known = store.HAS_FERET | store.HAS_SHAPE
+        store.fill_feret(np.flatnonzero((store.flags & known) != known))
         
     def idx_to_name(self,idx) -> str:
-        max_digits: int = len(str(self.num_of_rois))
-        return f"L{idx:0{max_digits}d}"
+        return self._store.label_to_name(idx)
+    
+    @staticmethod
+    def name_to_idx(name: str) -> Optional[int]:
+        return Roi.name_to_label(name)
     
-    def name_to_idx(name: str) -> int:
-        return int(name[1:])
-    
\ No newline at end of file
@@ -20,9 +20,12 @@ from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QWidget
 from typing import Callable
 
-from .LabelToRoiDiff import process_label_image as lbl_process_label_image
-from .NumpyToRoi import process_label_image as np_process_label_image
+from .LabelToRoiBackends import process_labels, is_out_of_core
+from .LabelSource import open_label_source
+from .RoiSimplify import simplify_rois
+from .CellposeSeg import load_seg
 from .TinyRoiManager import TinyRoiManager
+from .RoiJournal import RoiJournal
 from .TinyRoiFile import TinyRoiFile
 
 from .RoiImage import RoiImageWindow
@@ -101,6 +104,10 @@ class Workbench(QWidget):
         self.roi_dir = normalize_path(self.working_dir + "/RoiBackup/")
         os.makedirs(self.roi_dir, exist_ok=True)
         log(f"Backups of ROIs will be stored in: {self.roi_dir}")
+        # every state/tag change since the last full save of the ROIs
+        self.journal_path = normalize_path(f"{self.roi_dir}{self.base_name}_journal.bin")
+        # the journal of a crashed session started from the label image: replayed once the ROIs are made again
+        self.replay_on_label_image: bool = False
       
 
         self.window = None
@@ -121,7 +128,9 @@ class Workbench(QWidget):
 
         interceptor_key_action = {      Qt.Key.Key_Escape: (self.on_escape_key_pressed,None, True),
                                         Qt.Key.Key_Delete: (self.on_delete_key_pressed,None, True),
-                                        Qt.Key.Key_F1: (self.on_f1_key_pressed,None, True)
+                                        Qt.Key.Key_F1: (self.on_f1_key_pressed,None, True),
+                                        (Qt.Key.Key_Z, Qt.KeyboardModifier.ControlModifier): (self.on_undo,None, True),
+                                        (Qt.Key.Key_Y, Qt.KeyboardModifier.ControlModifier): (self.on_redo,None, True)
         }
         for name,label in key_to_label_map.items():
             interceptor_key_action[name_to_code[name]] = (self.on_tagged_delete,label,True)
@@ -131,17 +140,24 @@ class Workbench(QWidget):
     def build(self):
         import cv2
         _, file_extension = os.path.splitext(self.label_file)
+        backend = gvars["npy_to_roi_backend"] if file_extension == '.npy' else gvars["label_to_roi_backend"]
+        # the tiled backend reads the label image in parts: it is never loaded in full
+        out_of_core = is_out_of_core(backend)
         if file_extension== '.npy':
             log("Using cellpose numpy data")
-            data = np.load(self.label_file, allow_pickle=True).item()
+            data = load_seg(self.label_file, use_sidecars=gvars["seg_npy_sidecars"])
             self.label_image: np.ndarray = data["masks"]
+        elif out_of_core:
+            self.label_image = open_label_source(self.label_file)
+            data = {"masks": self.label_image}
         else:
             self.label_image: np.ndarray= cv2.imread(self.label_file, cv2.IMREAD_UNCHANGED)
+            data = {"masks": self.label_image}
     
         lbl_h, lbl_w = self.label_image.shape[:2]
         #self.label_image: np.ndarray = imread(self.label_file)
-        # in the filtered image, the labels of deleted ROIs will be zeroed
-        self.filtered_label_image: np.ndarray = self.label_image.copy()
+        # in the filtered image, the labels of deleted ROIs will be zeroed, not in a label image that is read in parts
+        self.filtered_label_image: np.ndarray = None if out_of_core else self.label_image.copy()
 
         from PyQt6.QtGui import QImage
         self.background_image = QImage(self.original_file)
@@ -167,7 +183,8 @@ class Workbench(QWidget):
                 image_size_str = f"width x height: {bkg_w_mm:.3f} x {bkg_h_mm:.3f} millimeter"
 
 
-        self.rm = TinyRoiManager(self.filtered_label_image,parent=self)
+        self.recover_journal()
+        self.rm = TinyRoiManager(self.filtered_label_image,parent=self,num_threads=gvars["measurement_num_threads"])
 
         if self.roi_file and not self.roi_file=="<no name>":
             log("Reading ROIs from zip")
@@ -176,14 +193,24 @@ class Workbench(QWidget):
         else:
             log("Creating ROIs from label file")
             StopWatch.start('process label image')
-            if file_extension == '.npy':
-                np_process_label_image(self.rm, data, remove_edges=True, remove_small=True, size_threshold=gvars["roi_minimum_size"])
-            else:
-                lbl_process_label_image(self.rm, self.label_image, remove_edges=True, remove_small=True, size_threshold=gvars["roi_minimum_size"])
+            process_labels(self.rm, data, backend, remove_edges=True, remove_small=True, size_threshold=gvars["roi_minimum_size"])
             StopWatch.stop('process label image')
+            if gvars["simplify_tolerance"] > 0:
+                simplify_rois(self.rm.store, gvars["simplify_tolerance"])
 
         self.rm.force_feret()
 
+        if self.replay_on_label_image:
+            num_changes = self.rm.replay_journal(self.journal_path)
+            log(f"Previous session did not end cleanly: {num_changes} changes recovered on the ROIs of the label image",type="warning")
+            # the recovered changes need a full save to start a new journal on, the old journal stays till it is written
+            if self.on_backup_rois():
+                self.rm.journal.wait_for_save()
+        else:
+            # the journal starts on top of what the ROIs were made from: the zip that was read or the label image
+            base = self.roi_file if self.roi_file and not self.roi_file=="<no name>" else self.label_file
+            self.rm.journal.start(self.journal_path, base=base)
+
         unit_and_scale=gvars["selected_unit_and_scale"]
         self.measurements=RoiMeasurements(rm=self.rm,delayed_compute=True,unit_and_scale=unit_and_scale,parent=self)
 
@@ -230,15 +257,50 @@ class Workbench(QWidget):
         if self.backup_timer:
             self.backup_timer.stop()
         log("ROIs will be backed up")
-        if self.on_backup_rois(): # and self.on_backup_measurements():
+        backed_up = self.on_backup_rois()
+        if backed_up: # and self.on_backup_measurements():
             log("ROIs backed up, safe to close",type="happy")
         else:
             log("No ROIs to be backed up, safe to close",type="happy")
         if self.rm:
+            # clean end of the session: the journal is no longer needed
+            self.rm.journal.close(remove=backed_up)
             self.rm.deleteLater()
             self.rm=None
 
 
+    def recover_journal(self):
+        """
+            a journal that is still there comes from a session that did not end cleanly,
+            this session continues with its changes replayed on what it started from
+            -a zip: the replayed ROIs are saved as a new backup, that backup is opened instead of the given ROI file
+            -the label image: the ROIs are made from it again, build replays the journal on them
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        base, transactions, _, _ = RoiJournal.read(self.journal_path)
+        if transactions and base and os.path.abspath(base) == os.path.abspath(self.label_file):
+            if self.roi_file and not self.roi_file=="<no name>":
+                log(f"Previous session started from the label image, {self.roi_file} is not opened",type="warning")
+            self.roi_file = None
+            self.replay_on_label_image = True
+            return
+        if transactions and base and base.lower().endswith(".zip") and os.path.exists(base):
+            # only state and tags are replayed: no label image needed
+            rm = TinyRoiManager()
+            rm.add_from_list_unchecked(TinyRoiFile.read_parallel(zip_path=base, label_image=self.label_image, num_threads=gvars["read_parallel_num_threads"]))
+            num_changes = rm.replay_journal(self.journal_path)
+            full_name = normalize_path(f"{self.roi_dir}{get_timestamp_string()}_{self.base_name}_recovered_RoiSet.zip")
+            TinyRoiFile.write_parallel(zip_path=full_name, roi_list=[None] + rm.list_rois(), num_threads=gvars["save_rois_num_threads"]).join()
+            rm.deleteLater()
+            if not os.path.exists(full_name):
+                # the journal is kept: the next start tries again
+                log(f"Previous session did not end cleanly, cannot write the recovered ROIs to: {full_name}",type="error")
+                return
+            log(f"Previous session did not end cleanly: {num_changes} changes recovered in: {full_name}, opening that file",type="warning")
+            self.roi_file = full_name
+        os.remove(self.journal_path)
+
     def make_backup(self):
         log("Timed backup triggered")
         #self.on_backup_measurements()
@@ -248,9 +310,9 @@ class Workbench(QWidget):
         self.window.on_select_measurement(msmt_name)
         
 
-    def on_any_change(self,message=""):
+    def on_any_change(self,message="",changed_rows=None):
         log("Updating: "+ message)
-        self.window.draw_image()
+        self.window.draw_image(changed_rows)
         compute_and_plot(self.rm,self.hist_plot,self.measurements)
 
     def on_toggle_show_deleted(self):
@@ -262,19 +324,27 @@ class Workbench(QWidget):
         self.window.draw_image()
         
     def on_delete_key_pressed(self,argument):
-        self.rm.delete_selected()
-        self.on_any_change("DELETE key pressed")
+        changed_rows = self.rm.delete_selected()
+        self.on_any_change("DELETE key pressed", changed_rows)
 
     def on_escape_key_pressed(self,argument):
-        self.rm.unselect_all()
-        self.on_any_change("ESCAPE key pressed")
+        changed_rows = self.rm.unselect_all()
+        self.on_any_change("ESCAPE key pressed", changed_rows)
         
+    def on_undo(self,argument):
+        changed_rows = self.rm.undo()
+        self.on_any_change("Undo", changed_rows)
+
+    def on_redo(self,argument):
+        changed_rows = self.rm.redo()
+        self.on_any_change("Redo", changed_rows)
+
     def on_f1_key_pressed(self,argument):
         log("F1 key pressed: No function: use right-click and drag for rectangle select",type="warning")
 
     def on_tagged_delete(self,tag):
-        self.rm.delete_selected(tag)
-        self.on_any_change(f"Function key pressed for tagged delete: {tag}")
+        changed_rows = self.rm.delete_selected(tag)
+        self.on_any_change(f"Function key pressed for tagged delete: {tag}", changed_rows)
 
     def on_select_outliers(self):
         if not self.measurements:
@@ -287,13 +357,14 @@ class Workbench(QWidget):
         selected_measurement = self.hist_plot.selected_measurement
         outliers = self.measurements.stats['ACTIVE'][selected_measurement]["outliers"]
 
-        self.rm.select(rois_or_names=outliers,reason_of_selection=selected_measurement+".outlier",additive=True)
-        self.on_any_change(f"outliers selected for: {selected_measurement}")
+        changed_rows = self.rm.select(rois_or_names=outliers,reason_of_selection=selected_measurement+".outlier",additive=True)
+        self.on_any_change(f"outliers selected for: {selected_measurement}", changed_rows)
 
     def on_select_outer(self):
         from .RoiSelect import select_outer_rois_vdb5
         if not TinyRoiManager.is_valid(self.rm) or self.filtered_label_image is None:
             log("No ROIs or no label image",type="warning")
+            return
         select_outer_rois_vdb5(rm=self.rm, filtered_label_image=self.filtered_label_image)
         self.on_any_change(f"outer edge selected")
 
@@ -334,11 +405,12 @@ class Workbench(QWidget):
             log("No ROIs available",type="warning")
             return False
         now = get_timestamp_string()
-        roi_list = [None] + [roi for roi in self.rm._name_to_roi.values()]
+        roi_list = [None] + self.rm.list_rois()
         full_name = normalize_path(f"{self.roi_dir}{now}_{self.base_name}_RoiSet.zip")
         if Workbench.is_writable(full_name):
             log(f"Backing up ROIs to: {full_name}")
-            TinyRoiFile.write_parallel(zip_path=full_name, roi_list=roi_list, num_threads=gvars["save_rois_num_threads"])
+            save = TinyRoiFile.write_parallel(zip_path=full_name, roi_list=roi_list, num_threads=gvars["save_rois_num_threads"])
+            self.rm.journal.start_after(save, self.journal_path, base=full_name, store=self.rm.store)
             return True
 
         log(f"Cannot backup ROIs to: {full_name}",type="error")
@@ -351,12 +423,17 @@ class Workbench(QWidget):
         if not TinyRoiManager.is_valid(self.rm):
             log("No ROIs available",type="warning")
             return False
-        roi_list = [None] + [roi for roi in self.rm._name_to_roi.values()]
+        roi_list = [None] + self.rm.list_rois()
 
         full_name = normalize_path(f"{self.working_dir}{self.base_name}_RoiSet.zip")
         if Workbench.is_writable(full_name):
             log(f"Saving ROIs to: {full_name}")
-            TinyRoiFile.write_parallel(zip_path=full_name, roi_list=roi_list, num_threads=gvars["save_rois_num_threads"])
+            if gvars["roi_zip_incremental_save"]:
+                save = TinyRoiFile.update_parallel(zip_path=full_name, roi_list=roi_list, num_threads=gvars["save_rois_num_threads"],
+                                                   max_dead_fraction=gvars["roi_zip_max_dead_fraction"])
+            else:
+                save = TinyRoiFile.write_parallel(zip_path=full_name, roi_list=roi_list, num_threads=gvars["save_rois_num_threads"])
+            self.rm.journal.start_after(save, self.journal_path, base=full_name, store=self.rm.store)
             return True
         log(f"Cannot save ROIs to: {full_name}",type="error")
         self.on_fail_to_write(full_name)
@@ -0,0 +1,65 @@
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.CellposeSeg import load_seg, sidecar_path, SEG_KEYS
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.NumpyToRoi import process_label_image
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def test_cellposeseg():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        seg_path = os.path.join(tmp_dir, "A_stitch_seg.npy")
+        shutil.copyfile(test_path+"A_stitch_seg.npy", seg_path)
+        expected = np.load(seg_path, allow_pickle=True).item()
+
+        StopWatch.start("first open: unpickle and write the sidecars")
+        data = load_seg(seg_path)
+        StopWatch.stop("first open: unpickle and write the sidecars")
+        assert set(data) == set(SEG_KEYS)
+        for key in SEG_KEYS:
+            assert os.path.exists(sidecar_path(seg_path, key))
+            assert np.array_equal(data[key], expected[key])
+
+        StopWatch.start("second open: memory-mapped sidecars")
+        data = load_seg(seg_path)
+        StopWatch.stop("second open: memory-mapped sidecars")
+        for key in SEG_KEYS:
+            assert isinstance(data[key], np.memmap)
+            assert data[key].dtype == expected[key].dtype
+            assert np.array_equal(data[key], expected[key])
+
+        # the memory-mapped arrays give the same ROIs
+        rm_expected, rm = TinyRoiManager(), TinyRoiManager()
+        process_label_image(rm_expected, expected)
+        process_label_image(rm, data)
+        assert np.array_equal(rm.store.label, rm_expected.store.label)
+        assert np.array_equal(rm.store.coords, rm_expected.store.coords)
+        del data
+
+        # cellpose ran again: the sidecars are outdated and get rewritten
+        expected["masks"][:10, :10] = 0
+        np.save(seg_path, np.array(expected, dtype=object), allow_pickle=True)
+        future = os.stat(sidecar_path(seg_path, "masks")).st_mtime_ns + 10**9
+        os.utime(seg_path, ns=(future, future))
+        data = load_seg(seg_path)
+        assert np.array_equal(data["masks"], expected["masks"])
+        del data
+
+        # without sidecars nothing is written
+        os.remove(sidecar_path(seg_path, "masks"))
+        data = load_seg(seg_path, keys=["masks"], use_sidecars=False)
+        assert list(data) == ["masks"]
+        assert not isinstance(data["masks"], np.memmap)
+        assert not os.path.exists(sidecar_path(seg_path, "masks"))
+
+
+if __name__ == "__main__":
+    test_cellposeseg()
@@ -0,0 +1,48 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.Feret import get_values, get_values_batch
+from RoiEditor.Lib.StopWatch import StopWatch
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+
+def test_feretbatch():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"A_Stitch"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rois = [roi for roi in TinyRoiFile.read_parallel(base_name + "_rois.zip", label_image, num_threads=12) if roi]
+    print(f"#rois: {len(rois)}")
+
+    coords = np.concatenate([np.column_stack((roi.xpoints, roi.ypoints)) for roi in rois]).astype(np.int32)
+    offsets = np.zeros(len(rois) + 1, dtype=np.int64)
+    np.cumsum([roi.n for roi in rois], out=offsets[1:])
+
+    # first call compiles the kernel
+    get_values_batch(coords[:offsets[1]], offsets[:2])
+
+    StopWatch.start("Feret per ROI")
+    expected = np.array([get_values(roi.xpoints, roi.ypoints) for roi in rois])
+    StopWatch.stop("Feret per ROI")
+    StopWatch.start("Feret batch")
+    values = get_values_batch(coords, offsets)
+    StopWatch.stop("Feret batch")
+
+    assert values.shape == expected.shape
+    # same hull, same projections, same tie breaking: bit identical
+    assert np.array_equal(values, expected)
+
+    # chunks of ROIs on several threads: deterministic, the same values as serial
+    for num_threads in (2, 8, 16):
+        StopWatch.start(f"Feret batch, {num_threads} threads")
+        parallel = get_values_batch(coords, offsets, num_threads=num_threads)
+        StopWatch.stop(f"Feret batch, {num_threads} threads")
+        assert np.array_equal(parallel, values)
+
+
+if __name__ == "__main__":
+    test_feretbatch()
@@ -0,0 +1,88 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.Feret import get_values, get_values_batch
+from RoiEditor.Lib.StopWatch import StopWatch
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.LabelToRoiDiff import process_label_image
+
+def get_values_projection(x_points, y_points):
+    # the Feret values as get_values computed them before the rotating calipers:
+    # every hull point projected on the direction of every hull edge
+    points = np.stack((np.array(x_points, dtype=np.float32), np.array(y_points, dtype=np.float32)), axis=1)
+    hull_pts = cv2.convexHull(points).squeeze()
+
+    dxy = np.roll(hull_pts, -1, axis=0) - hull_pts
+    dx, dy = dxy[:, 0], dxy[:, 1]
+    h = np.hypot(dx, dy)
+    sin_a = -dy / h
+    cos_a = dx / h
+    RTs = np.stack([
+        np.stack([cos_a, sin_a], axis=1),
+        np.stack([-sin_a, cos_a], axis=1)
+    ], axis=2)
+    rotated = np.array([hull_pts @ R.T for R in RTs], dtype=np.float32)
+    x_proj = rotated[:, :, 0]
+    y_proj = rotated[:, :, 1]
+
+    lengths = x_proj.max(axis=1) - x_proj.min(axis=1)
+    widths = y_proj.max(axis=1) - y_proj.min(axis=1)
+    idx_max = np.argmax(lengths)
+    max_diameter = lengths[idx_max]
+    min_width = widths[np.argmin(widths)]
+
+    proj = x_proj[idx_max]
+    pt1 = hull_pts[np.argmax(proj)]
+    pt2 = hull_pts[np.argmin(proj)]
+    if (pt1[0] < pt2[0]) or (pt1[0] == pt2[0] and pt1[1] < pt2[1]):
+        feret, vec = pt1, pt2 - pt1
+    else:
+        feret, vec = pt2, pt1 - pt2
+    angle_of_max = np.degrees(np.arctan2(vec[1], vec[0])) % 180
+    feret_ratio = max_diameter/min_width if min_width >= 1 else max_diameter
+    angle_shifted = (angle_of_max + 90.0) % 180
+    return np.array([max_diameter, angle_of_max, angle_shifted, min_width, feret[0], feret[1], feret_ratio], dtype=np.float32)
+
+def test_feretcalipers():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    polygons = []
+    for base_name in ["A_stitch", "B_stitch", "C_stitch"]:
+        label_image: np.ndarray= cv2.imread(test_path+base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+        rois = TinyRoiFile.read_parallel(test_path+base_name+"_rois.zip", label_image, num_threads=12)
+        polygons += [np.column_stack((roi.xpoints, roi.ypoints)) for roi in rois if roi]
+        rm = TinyRoiManager()
+        process_label_image(rm, label_image)
+        polygons += [np.column_stack((roi.xpoints, roi.ypoints)) for _, roi in rm.iter_all()]
+    print(f"#rois: {len(polygons)}")
+
+    StopWatch.start("Feret projection of the whole hull")
+    expected = np.array([get_values_projection(p[:, 0], p[:, 1]) for p in polygons])
+    StopWatch.stop("Feret projection of the whole hull")
+    StopWatch.start("Feret rotating calipers")
+    values = np.array([get_values(p[:, 0], p[:, 1]) for p in polygons])
+    StopWatch.stop("Feret rotating calipers")
+    # same hull order, same float32 rounding, same tie breaking
+    assert np.array_equal(values, expected)
+
+    coords = np.concatenate(polygons).astype(np.int32)
+    offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in polygons], out=offsets[1:])
+    assert np.array_equal(get_values_batch(coords, offsets), expected)
+
+    # big ROIs with many hull points
+    t = np.linspace(0, 2*np.pi, 4000, endpoint=False)
+    for angle in np.linspace(0, np.pi, 7):
+        x = np.round(3000 + 700*np.cos(t + angle)).astype(np.int32)
+        y = np.round(2000 + 300*np.sin(t)).astype(np.int32)
+        assert np.array_equal(get_values(x, y), get_values_projection(x, y))
+
+
+if __name__ == "__main__":
+    test_feretcalipers()
@@ -0,0 +1,46 @@
+import os
+import sys
+import numpy as np
+import cv2
+from skimage.measure import regionprops
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.LabelToRoi import label_bounds
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def test_labelbounds():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    # labels with gaps, 1 pixel labels, labels touching the image edge
+    rng = np.random.default_rng(7)
+    synthetic = np.zeros((300, 400), dtype=np.int32)
+    for label in range(1, 400, 3):
+        row, col = rng.integers(0, 295), rng.integers(0, 395)
+        h, w = rng.integers(1, 12, 2)
+        synthetic[row:row + h, col:col + w] = label
+
+    images = {base_name: cv2.imread(test_path+base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED) for base_name in ["A_stitch", "B_stitch", "C_stitch"]}
+    images["synthetic int32"] = synthetic
+    images["synthetic uint16"] = synthetic.astype(np.uint16)
+    for name, label_image in images.items():
+        label_bounds(label_image)
+        StopWatch.start(f"{name}: label_bounds")
+        bounds, counts = label_bounds(label_image)
+        StopWatch.stop(f"{name}: label_bounds")
+        StopWatch.start(f"{name}: regionprops")
+        regions = regionprops(label_image=label_image)
+        StopWatch.stop(f"{name}: regionprops")
+
+        # the same labels, bounding boxes and areas as skimage
+        assert list(np.flatnonzero(counts)) == [region.label for region in regions]
+        for region in regions:
+            assert tuple(bounds[region.label]) == region.bbox
+            assert counts[region.label] == region.area
+
+    assert not label_bounds(np.zeros((5, 5), dtype=np.uint16))[1].any()
+
+
+if __name__ == "__main__":
+    test_labelbounds()
@@ -0,0 +1,93 @@
+import os
+import sys
+import numpy as np
+import cv2
+from skimage.measure import regionprops
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.LabelMoments import label_moments, moment_values, moments_index
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.Roi import Roi
+from RoiEditor.Lib.LabelToRoi import process_label_image
+from RoiEditor.Lib.RoiMeasurements import RoiMeasurements
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def test_labelmoments():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    for base_name in ["A_stitch", "B_stitch", "C_stitch"]:
+        label_image: np.ndarray= cv2.imread(test_path+base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+        StopWatch.start(f"{base_name}: label_moments")
+        moments = label_moments(label_image)
+        StopWatch.stop(f"{base_name}: label_moments")
+        values = moment_values(moments)
+        # the image in blocks gives the same moments
+        assert np.allclose(label_moments(label_image, block_rows=37), moments)
+
+        # against opencv (central moments) and skimage (area, centroid)
+        for region in regionprops(label_image):
+            label = region.label
+            assert values[label, moments_index["PixelArea"]] == region.area
+            cy, cx = region.centroid
+            assert np.isclose(values[label, moments_index["CentroidX"]], cx)
+            assert np.isclose(values[label, moments_index["CentroidY"]], cy)
+            M = cv2.moments((label_image[region.slice] == label).astype(np.uint8), True)
+            assert np.allclose(moments[label, 3:], [M["mu20"], M["mu11"], M["mu02"]], rtol=1e-9, atol=1e-6)
+
+    # an ellipse: a=60, b=20, rotated over 30 degrees
+    ellipse = np.zeros((800, 1000), dtype=np.uint16)
+    cv2.ellipse(ellipse, (500, 400), (60, 20), 30, 0, 360, color=5, thickness=-1)
+    values = moment_values(label_moments(ellipse))
+    assert abs(values[5, moments_index["Orientation"]] - 30) < 0.5
+    assert abs(values[5, moments_index["Eccentricity"]] - np.sqrt(1 - (20/60)**2)) < 0.01
+    assert abs(values[5, moments_index["CentroidX"]] - 500) < 0.1
+    # labels without pixels are all 0, 1 pixel is a circle
+    assert np.array_equal(values[1:5], np.zeros((4, len(moments_index))))
+    single = moment_values(label_moments(np.array([[0, 1]], dtype=np.uint8)))
+    assert single[1, moments_index["Eccentricity"]] == 0
+
+    # the measurement columns: from the label image, or from the filled polygons without it
+    label_image = cv2.imread(test_path+"C_stitch_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rm = TinyRoiManager(label_image.copy())
+    process_label_image(rm, label_image)
+    # nothing is computed before it is asked for
+    assert rm._label_moments is None
+    # a ROI deleted before: its label is cleared from the image, its pixels are still known
+    rm.delete([rm.store.view(5)])
+    rm_polygons = TinyRoiManager()
+    rm_polygons.add_from_list_unchecked([rm.store.views([row])[0] for row in range(len(rm.store))])
+    StopWatch.start("moments from the filled polygons")
+    polygon_values = rm_polygons.moments()
+    StopWatch.stop("moments from the filled polygons")
+    msmts = RoiMeasurements(rm)
+    expected = moment_values(label_moments(label_image))[rm.store.label]
+    for name, index in moments_index.items():
+        assert name in msmts.measurement_names
+        assert np.allclose(msmts.orig["ALL"][name], expected[:, index], rtol=1e-12)
+        assert msmts.stats["ALL"][name]["N"] == len(rm.store)
+    # the contours go through the centres of the border pixels: filling them gives the pixels of the label
+    print(f"#rois: {len(rm.store)}, mean eccentricity: {msmts.stats['ALL']['Eccentricity']['mean']:.3f}")
+    assert np.allclose(polygon_values, expected)
+
+    # kept per row: computed again only after the ROI changed
+    assert np.shares_memory(rm.moments(), rm.store.moments())
+    assert (rm.store.flags & rm.store.HAS_MOMENTS).all()
+    rm.store.view(5).label = int(rm.store.label.max()) + 1
+    assert not rm.store.flags[5] & rm.store.HAS_MOMENTS
+    rm.moments()
+    assert rm.store.flags[5] & rm.store.HAS_MOMENTS
+
+    # overlapping polygons each have all their pixels, far from the origin nothing large is allocated
+    big = Roi(np.array([100000, 100039, 100039, 100000]), np.array([200000, 200000, 200039, 200039]), label=2)
+    small = Roi(np.array([100005, 100014, 100014, 100005]), np.array([200005, 200005, 200014, 200014]), label=1)
+    rm_overlap = TinyRoiManager()
+    rm_overlap.add_from_list_unchecked([small, big])
+    values = rm_overlap.moments()
+    assert values[0, moments_index["PixelArea"]] == 100 and values[1, moments_index["PixelArea"]] == 1600
+    assert values[0, moments_index["CentroidX"]] == 100009.5 and values[0, moments_index["CentroidY"]] == 200009.5
+    assert values[1, moments_index["CentroidX"]] == 100019.5
+
+if __name__ == "__main__":
+    test_labelmoments()
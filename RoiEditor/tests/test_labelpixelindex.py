@@ -0,0 +1,61 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.LabelPixelIndex import LabelPixelIndex
+from RoiEditor.Lib.LabelToRoiDiff import process_label_image
+from RoiEditor.Lib.StopWatch import StopWatch
+from RoiEditor.Lib.Roi import Roi
+
+def test_labelpixelindex():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    label_path = test_path+"C_stitch_cp_masks.png"
+    label_image: np.ndarray= cv2.imread(label_path, cv2.IMREAD_UNCHANGED)
+
+    StopWatch.start("index build")
+    index = LabelPixelIndex(label_image)
+    StopWatch.stop("index build")
+    print(f"max label: {index.max_label}, #pixels: {len(index.pixels)}")
+
+    labels = np.unique(label_image)[1:]
+    assert index.max_label == labels.max()
+    for label in labels[::7]:
+        rows, cols = np.nonzero(label_image == label)
+        assert index.count(label) == len(rows)
+        assert index.bbox(label) == (slice(rows.min(), rows.max()+1), slice(cols.min(), cols.max()+1))
+    assert index.bbox(0) is None
+
+    # clearing through the index == clearing with np.isin over the whole image
+    to_clear = labels[::3]
+    expected = label_image.copy()
+    StopWatch.start("np.isin clear")
+    expected[np.isin(expected, to_clear)] = 0
+    StopWatch.stop("np.isin clear")
+    cleared = label_image.copy()
+    StopWatch.start("index clear")
+    index.clear(cleared, to_clear)
+    StopWatch.stop("index clear")
+    assert np.array_equal(cleared, expected)
+
+    index.restore(cleared, to_clear)
+    assert np.array_equal(cleared, label_image)
+
+    # delete and undelete through the manager
+    rm = TinyRoiManager(label_image.copy())
+    process_label_image(rm, label_image)
+    active = [roi.label for _, roi in rm.iter_by_state(Roi.ROI_STATE_ACTIVE)][:5]
+    rm.delete(active)
+    assert not np.isin(rm.filtered_label_image, active).any()
+    rm.set_state(active, Roi.ROI_STATE_ACTIVE)
+    for label in active:
+        assert np.array_equal(rm.filtered_label_image == label, label_image == label)
+
+
+if __name__ == "__main__":
+    test_labelpixelindex()
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.LabelToRoiBackends import backends, process_labels
+from RoiEditor.Lib.CellposeSeg import load_seg
+
+def benchmark_backends(datasets: dict[str, dict]) -> list[dict]:
+    """ runs every backend on every dataset ({"masks": ..., "outlines": ...})
+        -time: wall time in ms
+        -peak: peak of the memory allocated by python and numpy in MB, not by opencv
+        -deviation: mean relative deviation of the ROI area from the pixel count of the label
+    """
+    results = []
+    for data_name, data in datasets.items():
+        pixel_counts = np.bincount(np.asarray(data["masks"]).ravel())
+        for name, backend in backends.items():
+            if backend.needs_outlines and data.get("outlines") is None:
+                continue
+            # the first run compiles the numba kernels
+            process_labels(TinyRoiManager(), data, name)
+            rm = TinyRoiManager()
+            start = time.perf_counter()
+            process_labels(rm, data, name)
+            wall_time = time.perf_counter() - start
+            # tracing slows down the allocations: a separate run for the memory
+            tracemalloc.start()
+            process_labels(TinyRoiManager(), data, name)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            store = rm.store
+            counts = pixel_counts[store.label]
+            deviation = float(np.mean((store.areas() - counts)/counts)) if len(store) else 0.0
+            results.append({"data": data_name, "backend": name, "time": wall_time*1000, "peak": peak/2**20,
+                            "rois": len(store), "labels": int(np.count_nonzero(pixel_counts[1:])), "deviation": deviation})
+    return results
+
+def print_results(results: list[dict]):
+    print(f"{'data':16s} {'backend':10s} {'time ms':>8s} {'peak MB':>8s} {'#rois':>6s} {'#labels':>8s} {'area dev':>9s}")
+    for r in results:
+        print(f"{r['data']:16s} {r['backend']:10s} {r['time']:8.1f} {r['peak']:8.1f} {r['rois']:6d} {r['labels']:8d} {r['deviation']:+9.3%}")
+
+def test_labeltoroibackends():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    datasets = {base_name: {"masks": cv2.imread(test_path+base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)}
+                for base_name in ["A_stitch", "B_stitch", "C_stitch"]}
+    datasets["A_stitch_seg.npy"] = load_seg(test_path+"A_stitch_seg.npy", use_sidecars=False)
+    results = benchmark_backends(datasets)
+    print_results(results)
+
+    assert {"exact", "tiled", "trace", "diff", "outlines"} <= set(backends)
+    by_key = {(r["data"], r["backend"]): r for r in results}
+    # the outlines backend only runs on the _seg.npy
+    assert ("A_stitch", "outlines") not in by_key and ("A_stitch_seg.npy", "outlines") in by_key
+    for data_name in datasets:
+        exact, tiled, trace = by_key[(data_name, "exact")], by_key[(data_name, "tiled")], by_key[(data_name, "trace")]
+        assert exact["rois"] == tiled["rois"] == trace["rois"] == exact["labels"]
+        assert exact["deviation"] == tiled["deviation"] == trace["deviation"]
+        # a contour through the centers of the border pixels: a bit less than the pixel count
+        assert -0.25 < exact["deviation"] < 0
+        # the diff backend shrinks the labels by 1 pixel
+        assert by_key[(data_name, "diff")]["deviation"] < exact["deviation"]
+        assert by_key[(data_name, "diff")]["rois"] > 0.9*exact["labels"]
+
+    # the fall back for a backend that cannot handle the data
+    rm = TinyRoiManager()
+    process_labels(rm, datasets["A_stitch"], "outlines")
+    assert len(rm.store) == by_key[("A_stitch", "diff")]["rois"]
+    rm = TinyRoiManager()
+    process_labels(rm, datasets["A_stitch"], "no such backend")
+    assert len(rm.store) == by_key[("A_stitch", "diff")]["rois"]
+
+
+if __name__ == "__main__":
+    test_labeltoroibackends()
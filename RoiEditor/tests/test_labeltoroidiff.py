@@ -11,7 +11,7 @@ import math
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
-from RoiEditor.Lib.LabelToRoiDiff import process_label_image
+from RoiEditor.Lib.LabelToRoiDiff import process_label_image, edge_free_foreground
 from RoiEditor.Lib.StopWatch import StopWatch
 from RoiEditor.Lib.Roi import Roi
 
@@ -94,6 +94,31 @@ def test_labeltoroidiff():
     for name, roi in last_3:
         print(f"{name:8s} | {roi.n:3d} punten | state: {Roi.state_to_str(roi.state)} | tags: {roi.tags}")
 
+def test_labeltoroidiff_many_labels():
+    # 71k labels of 6x6 pixels in a uint32 image: labels above 65535 and multiples of 256
+    labels = np.arange(250, 250 + 280*255, dtype=np.uint32)
+    label_image = np.kron(labels.reshape(280, 255), np.ones((6, 6), dtype=np.uint32))
+
+    StopWatch.start("edge free foreground")
+    foreground = edge_free_foreground(label_image)
+    StopWatch.stop("edge free foreground")
+    # the same as the diff of the labels in numpy
+    expected = np.full(label_image.shape, 255, dtype=np.uint8)
+    for diff, first, second in [(label_image[:, :-1] != label_image[:, 1:], np.s_[:, :-1], np.s_[:, 1:]),
+                                (label_image[:-1, :] != label_image[1:, :], np.s_[:-1, :], np.s_[1:, :])]:
+        expected[first][diff] = 0
+        expected[second][diff] = 0
+    assert np.array_equal(foreground, expected)
+
+    rm = TinyRoiManager()
+    StopWatch.start("Detection of 71k labels")
+    process_label_image(rm, label_image)
+    StopWatch.stop("Detection of 71k labels")
+    assert np.array_equal(np.sort(rm.store.label), labels)
+    for label in (256, 512, 65536, 65792):
+        assert rm.store.row_of_label(label) is not None
+
 
 if __name__ == "__main__":
     test_labeltoroidiff()
+    test_labeltoroidiff_many_labels()
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.LabelToRoi import process_label_image
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def detect(label_image, num_threads):
+    rm = TinyRoiManager()
+    start = time.perf_counter()
+    process_label_image(rm, label_image, num_threads=num_threads)
+    return rm, time.perf_counter() - start
+
+def test_labeltoroiparallel():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    for base_name in ["A_stitch", "B_stitch", "C_stitch"]:
+        label_image: np.ndarray= cv2.imread(test_path+base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+        StopWatch.start(f"{base_name}: serial")
+        serial, t_serial = detect(label_image, num_threads=1)
+        StopWatch.stop(f"{base_name}: serial")
+        expected = serial.store
+
+        for num_threads in (2, 4, 8):
+            StopWatch.start(f"{base_name}: {num_threads} threads")
+            parallel, t_parallel = detect(label_image, num_threads=num_threads)
+            StopWatch.stop(f"{base_name}: {num_threads} threads")
+            print(f"{base_name}: #rois: {len(expected)}, {num_threads} threads, speedup: {t_serial/t_parallel:.2f}x")
+
+            # the same ROIs in the same (label) order
+            store = parallel.store
+            assert len(store) == len(expected)
+            assert np.array_equal(store.label, expected.label)
+            assert np.array_equal(store.state, expected.state)
+            assert np.array_equal(store.offsets, expected.offsets)
+            assert np.array_equal(store.coords, expected.coords)
+            for row in range(len(store)):
+                assert store.tags(row) == expected.tags(row)
+                assert store.area(row) == expected.area(row)
+                assert store.bounds(row) == expected.bounds(row)
+
+
+if __name__ == "__main__":
+    test_labeltoroiparallel()
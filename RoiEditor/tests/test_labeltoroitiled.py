@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import numpy as np
+import cv2
+import tifffile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.LabelToRoi import process_label_image, process_label_image_tiled
+from RoiEditor.Lib.LabelSource import TiffTileReader, open_label_source
+from RoiEditor.Lib.LabelToRoiBackends import process_labels, is_out_of_core
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def assert_same_rois(store, expected):
+    assert len(store) == len(expected)
+    assert np.array_equal(store.label, expected.label)
+    assert np.array_equal(store.state, expected.state)
+    assert np.array_equal(store.offsets, expected.offsets)
+    assert np.array_equal(store.coords, expected.coords)
+    for row in range(len(store)):
+        assert store.tags(row) == expected.tags(row)
+        assert store.area(row) == expected.area(row)
+        assert store.bounds(row) == expected.bounds(row)
+
+def test_labeltoroitiled():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    for base_name in ["A_stitch", "B_stitch", "C_stitch"]:
+        label_image: np.ndarray= cv2.imread(test_path+base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+        expected = TinyRoiManager()
+        StopWatch.start(f"{base_name}: in memory")
+        process_label_image(expected, label_image)
+        StopWatch.stop(f"{base_name}: in memory")
+
+        # small tiles: many ROIs cross a seam, some do not fit in the overlap
+        for tile_size, overlap in [(100, 0), (128, 16), (256, 64), (5000, 0)]:
+            rm = TinyRoiManager()
+            StopWatch.start(f"{base_name}: tiles of {tile_size}, overlap {overlap}")
+            process_label_image_tiled(rm, label_image, tile_size=tile_size, overlap=overlap, num_threads=3)
+            StopWatch.stop(f"{base_name}: tiles of {tile_size}, overlap {overlap}")
+            assert_same_rois(rm.store, expected.store)
+
+    # read from disk: a memory-mapped .npy, a tiled and a stripped compressed TIFF
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {name: os.path.join(tmp_dir, name) for name in ["masks.npy", "tiled.tif", "stripped.tif"]}
+        np.save(paths["masks.npy"], label_image)
+        tifffile.imwrite(paths["tiled.tif"], label_image, tile=(64, 64), compression="zlib")
+        tifffile.imwrite(paths["stripped.tif"], label_image, rowsperstrip=50, compression="zlib")
+
+        source = open_label_source(paths["masks.npy"])
+        assert isinstance(source, np.memmap)
+        # like the app does for an out-of-core backend: the label image is not loaded to index its pixels
+        assert is_out_of_core("tiled") and not is_out_of_core("diff")
+        rm = TinyRoiManager(source)
+        assert rm.filtered_label_image is None and rm._pixel_index is None
+        process_labels(rm, {"masks": source}, "tiled")
+        assert_same_rois(rm.store, expected.store)
+        del source
+        with TiffTileReader(paths["tiled.tif"]) as reader:
+            assert np.array_equal(reader[100:300, 50:250], label_image[100:300, 50:250])
+            assert np.array_equal(reader[:, :], label_image)
+            # the labels under points, e.g. the centers of ROIs in a zip
+            rng = np.random.default_rng(3)
+            rows, cols = rng.integers(0, label_image.shape[0], 500), rng.integers(0, label_image.shape[1], 500)
+            assert np.array_equal(reader[rows, cols], label_image[rows, cols])
+
+        for name, path in paths.items():
+            rm = TinyRoiManager()
+            StopWatch.start(f"{name}: tiles of 256")
+            process_label_image_tiled(rm, path, tile_size=256, overlap=32)
+            StopWatch.stop(f"{name}: tiles of 256")
+            assert_same_rois(rm.store, expected.store)
+
+
+if __name__ == "__main__":
+    test_labeltoroitiled()
@@ -0,0 +1,60 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.LabelToRoi import process_label_image, label_bounds
+from RoiEditor.Lib.LabelToRoiTrace import process_label_image as process_label_image_traced, trace_label_contours
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def opencv_contour(label_image, label, bbox):
+    min_row, min_col, max_row, max_col = bbox
+    mask = (label_image[min_row:max_row, min_col:max_col] == label).astype(np.uint8)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours[-1].reshape(-1, 2) + [min_col, min_row]
+
+def test_labeltoroitrace():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    # labels in pieces, with holes, 1 pixel wide lines, single pixels, touching the image edge
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        label_image = rng.integers(0, 4, rng.integers(1, 20, 2)).astype(np.int32)
+        label_image[rng.random(label_image.shape) < 0.3] = 0
+        bounds, _ = label_bounds(label_image)
+        for num_threads in (1, 3):
+            labels, coords, offsets = trace_label_contours(label_image, num_threads=num_threads)
+            for i, label in enumerate(labels):
+                assert np.array_equal(coords[offsets[i]:offsets[i + 1]], opencv_contour(label_image, label, bounds[label]))
+
+    for base_name in ["A_stitch", "B_stitch", "C_stitch"]:
+        label_image: np.ndarray= cv2.imread(test_path+base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+        trace_label_contours(label_image)
+        StopWatch.start(f"{base_name}: trace")
+        traced = TinyRoiManager()
+        process_label_image_traced(traced, label_image, num_threads=1)
+        StopWatch.stop(f"{base_name}: trace")
+        StopWatch.start(f"{base_name}: findContours per label")
+        expected = TinyRoiManager()
+        process_label_image(expected, label_image, num_threads=1)
+        StopWatch.stop(f"{base_name}: findContours per label")
+
+        # the same ROIs as the per label crop and cv2.findContours
+        store, expected = traced.store, expected.store
+        assert len(store) == len(expected)
+        assert np.array_equal(store.label, expected.label)
+        assert np.array_equal(store.state, expected.state)
+        assert np.array_equal(store.offsets, expected.offsets)
+        assert np.array_equal(store.coords, expected.coords)
+        for row in range(len(store)):
+            assert store.tags(row) == expected.tags(row)
+            assert store.area(row) == expected.area(row)
+            assert store.bounds(row) == expected.bounds(row)
+
+
+if __name__ == "__main__":
+    test_labeltoroitrace()
@@ -0,0 +1,62 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.RoiGeometry import polygon_geometry
+from RoiEditor.Lib.StopWatch import StopWatch
+from RoiEditor.Lib.Roi import Roi
+
+def test_roigeometry():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"B_stitch"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rois = [roi for roi in TinyRoiFile.read_parallel(base_name+"_rois.zip", label_image, num_threads=1) if roi]
+
+    StopWatch.start("per ROI geometry")
+    # the bounds in the zip are exclusive, the ones of the vertices inclusive
+    expected = [(roi.area, (np.min(roi.ypoints), np.min(roi.xpoints), np.max(roi.ypoints), np.max(roi.xpoints)), roi.center) for roi in rois]
+    StopWatch.stop("per ROI geometry")
+
+    rm = TinyRoiManager()
+    rm.add_from_list_unchecked(rois)
+    store = rm.store
+    StopWatch.start("batch geometry")
+    geometry = polygon_geometry(store.coords, store.offsets)
+    StopWatch.stop("batch geometry")
+
+    for row, (area, bounds, center) in enumerate(expected):
+        assert geometry["area"][row] == area
+        assert tuple(geometry["bounds"][row]) == bounds
+        assert tuple(geometry["center"][row]) == tuple(center)
+        # the centroid of the polygon == the one from its moments
+        M = cv2.moments(np.column_stack((store.xpoints(row), store.ypoints(row))))
+        if M["m00"]:
+            assert np.allclose(geometry["centroid"][row], (M["m10"]/M["m00"], M["m01"]/M["m00"]))
+
+    # the columns are filled when the ROIs are added
+    assert np.all(store.flags & store.GEOMETRY == store.GEOMETRY)
+    assert np.array_equal(store.areas(), geometry["area"])
+    assert np.array_equal(store.centroids(), geometry["centroid"])
+
+    # chunks on several threads: the same values
+    StopWatch.start("batch geometry, 8 threads")
+    parallel = polygon_geometry(store.coords, store.offsets, num_threads=8)
+    StopWatch.stop("batch geometry, 8 threads")
+    for name, values in geometry.items():
+        assert np.array_equal(parallel[name], values)
+
+    # the center of a detached Roi is kept once known
+    roi = Roi(np.array([0, 4, 4, 0]), np.array([0, 0, 2, 2]), label=1, center=(1.0, 1.0))
+    assert roi.center == (1.0, 1.0)
+    assert roi.centroid == (2.0, 1.0)
+
+
+if __name__ == "__main__":
+    test_roigeometry()
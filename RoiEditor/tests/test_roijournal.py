@@ -0,0 +1,125 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.RoiJournal import RoiJournal
+from RoiEditor.Lib.Roi import Roi
+
+def snapshot(rm):
+    return {roi.label: (roi.state, roi.tags, roi.reason_of_selection) for _, roi in rm.iter_all()}
+
+def test_roijournal():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"C_stitch"
+    zip_path = base_name+"_rois.zip"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    journal_path = os.path.join(tempfile.gettempdir(), "C_stitch_journal.bin")
+
+    rm = TinyRoiManager(label_image.copy())
+    rm.add_from_list_unchecked(TinyRoiFile.read_parallel(zip_path, label_image, num_threads=1))
+    rm.journal.start(journal_path, base=zip_path)
+    start = snapshot(rm)
+    start_image = rm.filtered_label_image.copy()
+
+    labels = rm.store.label[:len(rm)]
+    rm.select(labels[:10], reason_of_selection="Area.outlier")
+    rm.delete_selected()
+    after_delete = snapshot(rm)
+    rm.toggle(labels[20:25])
+    rm.delete_selected("freeze")
+    rm.set_tags(int(labels[30]), {"fold"})
+    end = snapshot(rm)
+    end_image = rm.filtered_label_image.copy()
+    assert "Area.outlier" in rm.get_tags(int(labels[0]))
+
+    # undo everything, the deleted labels are back in the filtered image
+    for _ in range(5):
+        rm.undo()
+    assert not rm.journal.can_undo
+    assert snapshot(rm) == start
+    assert np.array_equal(rm.filtered_label_image, start_image)
+
+    rm.redo()
+    rm.redo()
+    assert snapshot(rm) == after_delete
+    for _ in range(3):
+        rm.redo()
+    assert snapshot(rm) == end
+    assert np.array_equal(rm.filtered_label_image, end_image)
+    rm.journal.close()
+
+    # replay the file on top of the zip it started from
+    base, transactions, _, _ = RoiJournal.read(journal_path)
+    assert base == zip_path
+    print(f"#transactions: {len(transactions)}, journal size: {os.path.getsize(journal_path)} bytes")
+    replayed = TinyRoiManager(label_image.copy())
+    replayed.add_from_list_unchecked(TinyRoiFile.read_parallel(base, label_image, num_threads=1))
+    replayed.replay_journal(journal_path)
+    assert snapshot(replayed) == end
+    assert np.array_equal(replayed.filtered_label_image, end_image)
+
+    # a crash while writing leaves an incomplete last change: it is skipped
+    with open(journal_path, "rb") as f:
+        data = f.read()
+    with open(journal_path, "wb") as f:
+        f.write(data[:-3])
+    _, truncated, _, _ = RoiJournal.read(journal_path)
+    assert len(truncated) == len(transactions) - 1
+    os.remove(journal_path)
+
+    # a full save on a thread: the journal stays on top of the previous save till the new one is on disk
+    rm.journal.start(journal_path, base=zip_path)
+    rm.toggle(labels[40:42])
+    new_base = os.path.join(tempfile.gettempdir(), "C_stitch_saved_rois.zip")
+    if os.path.exists(new_base):
+        os.remove(new_base)
+    # a slow disk: the save is only on disk when written is set
+    staged = new_base + ".staged"
+    TinyRoiFile.write_parallel(staged, [None] + rm.list_rois(), num_threads=1).join()
+    written = threading.Event()
+    save = threading.Thread(target=lambda: (written.wait(), shutil.move(staged, new_base)))
+    save.start()
+    rm.journal.start_after(save, journal_path, base=new_base, store=rm.store)
+    rm.delete(labels[43:45])
+    base, pending, _, _ = RoiJournal.read(journal_path)
+    assert base == zip_path and len(pending) == 2
+    written.set()
+    save.join()
+    rm.set_tags(int(labels[46]), {"fold"})
+    base, switched, _, _ = RoiJournal.read(journal_path)
+    # the delete made while saving and the change after it, on top of the new save
+    assert base == new_base and len(switched) == 2
+    assert {int(label) for label in switched[0]["label"]} == {int(label) for label in labels[43:45]}
+    end = snapshot(rm)
+    rm.journal.close()
+    replayed = TinyRoiManager(label_image.copy())
+    replayed.add_from_list_unchecked(TinyRoiFile.read_parallel(new_base, label_image, num_threads=1))
+    replayed.replay_journal(journal_path)
+    assert snapshot(replayed) == end
+
+    # a save that fails: the journal keeps its file and base
+    rm.journal.start(journal_path, base=zip_path)
+    failed = threading.Thread(target=lambda: None)
+    failed.start()
+    failed.join()
+    rm.journal.start_after(failed, journal_path, base=new_base + ".missing", store=rm.store)
+    rm.toggle(labels[50:51])
+    rm.journal.close()
+    base, kept, _, _ = RoiJournal.read(journal_path)
+    assert base == zip_path and len(kept) == 1
+    os.remove(journal_path)
+    os.remove(new_base)
+
+
+if __name__ == "__main__":
+    test_roijournal()
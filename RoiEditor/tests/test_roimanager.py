@@ -8,6 +8,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
 from RoiEditor.Lib.TinyRoiFile import TinyRoiFile as TRF
 from RoiEditor.Lib.StopWatch import StopWatch
+from RoiEditor.Lib.Roi import Roi
 
 
 def test_roimanager():
@@ -114,5 +115,61 @@ def test_roimanager():
     # print("")
     # print(np.mean(ns))
 
+def test_state_transitions():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name=test_path+"C_stitch"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rm = TinyRoiManager()
+    rm.add_from_list_unchecked(TRF.read_parallel(base_name+"_rois.zip", label_image))
+    names = rm.get_all_names()
+    num_rois = len(names)
+
+    changed = rm.select(names[:20], reason_of_selection="Area.outlier")
+    assert np.array_equal(changed, np.arange(20))
+    assert rm.get_roi(names[3]).reason_of_selection == "Area.outlier"
+
+    # toggling a selected ROI makes it active again and drops the reason
+    changed = rm.toggle(names[0])
+    assert np.array_equal(changed, [0])
+    assert rm.get_state(names[0]) == Roi.ROI_STATE_ACTIVE
+    assert not rm.get_roi(names[0]).reason_of_selection
+
+    # a ROI given more than once is toggled once per time, like toggling the names one after the other
+    changed = rm.toggle([names[0], names[1], names[1], names[2], names[2], names[2]])
+    assert np.array_equal(changed, [0, 2])
+    assert rm.get_state(names[0]) == Roi.ROI_STATE_SELECTED
+    assert rm.get_state(names[1]) == Roi.ROI_STATE_SELECTED
+    assert rm.get_state(names[2]) == Roi.ROI_STATE_ACTIVE
+    assert not rm.get_roi(names[1]).reason_of_selection
+    rm.toggle([names[0], names[2]])
+    rm.set_state(names[1:3], Roi.ROI_STATE_SELECTED)
+    assert rm.get_state(names[0]) == Roi.ROI_STATE_ACTIVE
+
+    StopWatch.start("delete selected")
+    changed = rm.delete_selected()
+    StopWatch.stop("delete selected")
+    assert np.array_equal(changed, np.arange(1, 20))
+    assert "Area.outlier" in rm.get_tags(names[5])
+    assert "Area.outlier" not in rm.get_tags(names[0])
+
+    rm.select(names[20:30], reason_of_selection="edge.outer")
+    changed = rm.delete_selected("freeze")
+    assert np.array_equal(changed, np.arange(20, 30))
+    assert rm.get_tags(names[25]) == {"freeze"}
+
+    rm.select(names[30:40])
+    StopWatch.start("unselect all")
+    changed = rm.unselect_all()
+    StopWatch.stop("unselect all")
+    assert np.array_equal(changed, np.arange(30, 40))
+    assert len(list(rm.iter_by_state(Roi.ROI_STATE_DELETED))) == 29
+    assert len(list(rm)) == num_rois - 29
+
+    # a second escape changes nothing
+    assert len(rm.unselect_all()) == 0
+
 if __name__ == "__main__":
-    test_roimanager()
\ No newline at end of file
+    test_roimanager()
+    test_state_transitions()
\ No newline at end of file
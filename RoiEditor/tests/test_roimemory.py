@@ -0,0 +1,89 @@
+import os
+import sys
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.Roi import Roi
+from RoiEditor.Lib.RoiStore import RoiStore
+
+class BaselineRoi:
+    """
+        the memory layout of a Roi before the RoiStore: a per-instance __dict__, int64 coordinates,
+        the bounds, center and area cached as Python objects, the tags set shared per state (like LabelToRoiDiff did)
+    """
+    def __init__(self, xpoints, ypoints, name, state, tags, bounds, center, area):
+        self.xpoints = xpoints
+        self.ypoints = ypoints
+        self.name = name
+        self.state = state
+        self.tags = tags
+        self.reason_of_selection = None
+        self.n = len(xpoints)
+        self._bounds = bounds
+        self._center = center
+        self._area = area
+
+def synthetic_polygons(num_rois: int, num_points: int = 32) -> tuple[np.ndarray, np.ndarray]:
+    """polygons on a grid, coordinates as np.int_ like cv2/numpy hand them out"""
+    rng = np.random.default_rng(0)
+    angles = np.linspace(0, 2*np.pi, num_points, endpoint=False)
+    side = int(np.ceil(np.sqrt(num_rois)))
+    labels = np.arange(1, num_rois+1)
+    r = rng.uniform(8, 16, size=(num_rois, 1))
+    xs = np.round(40*(labels % side)[:, None] + 20 + r*np.cos(angles)).astype(np.int_)
+    ys = np.round(40*(labels // side)[:, None] + 20 + r*np.sin(angles)).astype(np.int_)
+    return xs, ys
+
+def baseline_rois(num_rois: int) -> list[BaselineRoi]:
+    xs, ys = synthetic_polygons(num_rois)
+    tags = set()
+    return [BaselineRoi(xs[i].copy(), ys[i].copy(), f"L{i+1}", Roi.ROI_STATE_ACTIVE, tags,
+                        (int(ys[i].min()), int(xs[i].min()), int(ys[i].max()), int(xs[i].max())),
+                        (float(xs[i].mean()), float(ys[i].mean())), float(i))
+            for i in range(num_rois)]
+
+def synthetic_rois(num_rois: int) -> list[Roi]:
+    xs, ys = synthetic_polygons(num_rois)
+    labels = np.arange(1, num_rois+1)
+    return [Roi(xs[i].copy(), ys[i].copy(), name=f"L{label}", state=Roi.ROI_STATE_ACTIVE) for i, label in enumerate(labels)]
+
+def bytes_per_roi(build, num_rois: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size / num_rois
+
+# int32 x and y per point + the per-ROI columns of the store (state, bounds, measurements,...)
+POINT_BUDGET = 8
+ROW_BUDGET = 320
+
+def test_roimemory():
+    num_points = 32
+    for num_rois in (10_000, 100_000):
+        baseline = bytes_per_roi(lambda: baseline_rois(num_rois), num_rois)
+        detached = bytes_per_roi(lambda: synthetic_rois(num_rois), num_rois)
+        rois = synthetic_rois(num_rois)
+        def fill_store():
+            store = RoiStore(capacity=num_rois, point_capacity=sum(roi.n for roi in rois))
+            store.extend(rois)
+            return store
+        stored = bytes_per_roi(fill_store, num_rois)
+        print(f"#ROIs: {num_rois:>7}  baseline Roi: {baseline:7.1f}  detached Roi: {detached:7.1f}  "
+              f"in RoiStore: {stored:7.1f} bytes/ROI")
+        assert stored < POINT_BUDGET*num_points + ROW_BUDGET
+        # the reduction compared to the Roi objects before the RoiStore
+        assert stored < 0.5 * baseline
+        assert stored < detached
+        assert rois[0].xpoints.dtype == np.int32
+        assert not hasattr(rois[0], "__dict__")
+        assert rois[0].tags is rois[1].tags
+
+
+if __name__ == "__main__":
+    test_roimemory()
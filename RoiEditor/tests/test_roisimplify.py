@@ -0,0 +1,71 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.LabelToRoiDiff import process_label_image
+from RoiEditor.Lib.RoiSimplify import simplify_batch, simplify_rois
+from RoiEditor.Lib.Feret import get_values
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def test_roisimplify():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    label_image: np.ndarray= cv2.imread(test_path+"B_stitch_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rm = TinyRoiManager()
+    process_label_image(rm, label_image)
+    store = rm.store
+    coords, offsets = store.coords.copy(), store.offsets.copy()
+
+    for tolerance in (0.5, 1.0, 2.0):
+        StopWatch.start(f"simplify, tolerance {tolerance}")
+        simple_coords, simple_offsets = simplify_batch(coords, offsets, tolerance)
+        StopWatch.stop(f"simplify, tolerance {tolerance}")
+        print(f"tolerance {tolerance}: {len(coords)} -> {len(simple_coords)} points")
+        assert len(simple_coords) < len(coords)
+        for num_threads in (2, 8):
+            parallel = simplify_batch(coords, offsets, tolerance, num_threads=num_threads)
+            assert np.array_equal(parallel[0], simple_coords) and np.array_equal(parallel[1], simple_offsets)
+        for i in range(len(offsets) - 1):
+            polygon = simple_coords[simple_offsets[i]:simple_offsets[i+1]]
+            assert len(polygon) >= 3
+            # no original point is further than the tolerance from the simplified outline
+            contour = polygon.reshape(-1, 1, 2).astype(np.float32)
+            for x, y in coords[offsets[i]:offsets[i+1]]:
+                assert abs(cv2.pointPolygonTest(contour, (float(x), float(y)), True)) <= tolerance + 1e-6
+
+    # a triangle and a straight line are kept as they are
+    tiny = np.array([[0, 0], [5, 0], [0, 5], [0, 0], [1, 0], [2, 0], [3, 0], [4, 0]], dtype=np.int32)
+    tiny_offsets = np.array([0, 3, 8])
+    assert np.array_equal(simplify_batch(tiny, tiny_offsets, 1.0)[0], tiny)
+
+    ferets_known = (store.flags & store.HAS_FERET) != 0
+    stats = simplify_rois(store, 1.0, feret_sample=100)
+    assert stats["num_points"] == len(coords) and stats["num_points_simplified"] == len(store.coords)
+    assert 0 <= stats["area_error_mean"] <= stats["area_error_max"] < 0.2
+    assert 0 <= stats["feret_error_mean"] <= stats["feret_error_max"] < 0.2
+    # only the sample is measured: no Feret pass over all ROIs
+    assert ((store.flags & store.HAS_FERET) != 0).sum() <= 100 + ferets_known.sum()
+    expected_coords, expected_offsets = simplify_batch(coords, offsets, 1.0)
+    assert np.array_equal(store.coords, expected_coords)
+    assert np.array_equal(store.offsets, expected_offsets)
+    # the views show the simplified polygons, the geometry and the bounds are of the simplified polygons
+    for row in range(0, len(store), 17):
+        roi = store.view(row)
+        x, y = roi.xpoints.astype(np.int64), roi.ypoints.astype(np.int64)
+        assert roi.bounds == (y.min(), x.min(), y.max(), x.max())
+        assert np.isclose(roi.area, 0.5*abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1))))
+        assert np.array_equal(roi.feret_values, get_values(roi.xpoints, roi.ypoints))
+
+    # without a sample no Feret statistics
+    rm = TinyRoiManager()
+    process_label_image(rm, label_image)
+    assert "feret_error_mean" not in simplify_rois(rm.store, 1.0)
+
+
+if __name__ == "__main__":
+    test_roisimplify()
@@ -0,0 +1,62 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.StopWatch import StopWatch
+from RoiEditor.Lib.Roi import Roi
+
+def test_roispatialindex():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"C_stitch"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rois = TinyRoiFile.read_parallel(base_name+"_rois.zip", label_image, num_threads=1)
+
+    rm = TinyRoiManager()
+    rm.add_from_list_unchecked(rois)
+    StopWatch.start("spatial index build")
+    index = rm.spatial_index
+    StopWatch.stop("spatial index build")
+    print(f"cell size: {index.cell_size}")
+
+    def brute_force(top, left, bottom, right):
+        t, l, b, r = rm.store.all_bounds().T
+        within = np.flatnonzero((top <= t) & (left <= l) & (bottom >= b) & (right >= r))
+        intersects = np.flatnonzero((top <= b) & (left <= r) & (bottom >= t) & (right >= l))
+        return within, intersects
+
+    height, width = label_image.shape
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        top, bottom = np.sort(rng.integers(-20, height+20, 2))
+        left, right = np.sort(rng.integers(-20, width+20, 2))
+        within, intersects = brute_force(top, left, bottom, right)
+        assert np.array_equal(index.within(top, left, bottom, right), within)
+        assert np.array_equal(index.intersects(top, left, bottom, right), intersects)
+
+    # hit-test on the polygons agrees with the label image inside the ROIs
+    for _, roi in list(rm.iter_all())[::10]:
+        cx, cy = (int(round(c)) for c in roi.center)
+        label = label_image[cy, cx]
+        if label and cv2.pointPolygonTest(np.column_stack((roi.xpoints, roi.ypoints)).astype(np.int32), (cx, cy), False) > 0:
+            assert rm.get_roi_at(cx, cy).label == label
+    assert rm.get_roi_at(-5, -5) is None
+
+    # incremental update: a replaced ROI is found at its new place, not at the old one
+    old = rm.get_sample()
+    (top, left, bottom, right) = old.bounds
+    moved = Roi(old.xpoints + width, old.ypoints, label=old.label, state=Roi.ROI_STATE_ACTIVE)
+    rm.add(moved)
+    assert rm.spatial_index is index
+    assert old.label not in rm.store.label[index.within(top, left, bottom, right)]
+    assert list(rm.store.label[index.within(top, left+width, bottom, right+width)]) == [old.label]
+
+
+if __name__ == "__main__":
+    test_roispatialindex()
@@ -0,0 +1,79 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.RoiStore import RoiStore
+from RoiEditor.Lib.StopWatch import StopWatch
+from RoiEditor.Lib.Roi import Roi
+
+def test_roistore():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"C_stitch"
+    zip_path = base_name+"_rois.zip"
+    label_path = base_name+"_cp_masks.png"
+    label_image: np.ndarray= cv2.imread(label_path, cv2.IMREAD_UNCHANGED)
+
+    rois = TinyRoiFile.read_parallel(zip_path, label_image, num_threads=1)
+    expected = {roi.label: (roi.xpoints.copy(), roi.ypoints.copy(), roi.area, roi.bounds) for roi in rois if roi}
+
+    rm = TinyRoiManager()
+    StopWatch.start("store fill")
+    rm.add_from_list_unchecked(rois)
+    StopWatch.stop("store fill")
+    store: RoiStore = rm.store
+    print(f"#rows: {len(store)}, #points: {len(store.coords)}, coords dtype: {store.coords.dtype}")
+
+    assert len(store) == len(expected)
+    assert store.coords.dtype == np.int32
+    for name, roi in rm.iter_all():
+        xpoints, ypoints, area, bounds = expected[roi.label]
+        assert np.array_equal(roi.xpoints, xpoints)
+        assert np.array_equal(roi.ypoints, ypoints)
+        assert roi.area == area
+        assert roi.bounds == tuple(int(b) for b in bounds)
+        # the same view is handed out every time
+        assert rm.get_roi(name) is roi
+        assert rm.get_roi(roi.label) is roi
+
+    # labels are the key, names are only formatted from them
+    labels = store.label[:len(store)]
+    assert np.array_equal(store.rows_of_labels(labels), np.arange(len(store)))
+    assert store.rows_of_labels(np.array([0, labels.max() + 1]))[1] == -1
+    assert all(rm.name_to_idx(name) == label for name, label in zip(store.names, labels))
+    assert rm.idx_to_name(int(labels[0])) == store.names[0]
+
+    StopWatch.start("Feret")
+    rm.force_feret()
+    StopWatch.stop("Feret")
+
+    # tags are interned: all ROIs with the same tags share 1 frozenset
+    names = rm.get_all_names()
+    rm.select(names[:10])
+    rm.delete_selected("freeze")
+    tags = [rm.get_tags(name) for name in names[:10]]
+    assert all(t is tags[0] for t in tags)
+    assert "freeze" in tags[0]
+    assert "freeze" not in rm.get_tags(names[10])
+
+    # replacing a ROI by one with more points repacks the coordinate buffer
+    old = rm.get_roi(names[5])
+    new = Roi(np.array([0, 10, 10, 0, 0]), np.array([0, 0, 10, 10, 5]), name=names[5], state=Roi.ROI_STATE_ACTIVE)
+    rm.add(new)
+    assert rm.get_roi(names[5]) is new
+    assert new.n == 5 and new.area == 100.0
+    assert old.n == len(expected[new.label][0])
+    assert np.array_equal(rm.get_roi(names[6]).xpoints, expected[rm.name_to_idx(names[6])][0])
+
+    msmts = rm.get_measurements_by_filter(lambda roi: roi.state == Roi.ROI_STATE_ACTIVE)
+    print(f"#active: {len(msmts['Roi'])}, mean area: {np.mean(msmts['Area']):.1f}, mean Feret: {np.mean(msmts['Feret']):.1f}")
+
+
+if __name__ == "__main__":
+    test_roistore()
@@ -0,0 +1,76 @@
+import os
+import sys
+import zipfile
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.Roi import Roi
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def square(label, x0, y0, size):
+    x = np.array([x0, x0 + size, x0 + size, x0], dtype=np.int32)
+    y = np.array([y0, y0, y0 + size, y0 + size], dtype=np.int32)
+    return Roi(x, y, label=label)
+
+def circle(label, x0, y0, n):
+    # n points, no 2 the same
+    t = np.arange(n) * 2 * np.pi / n
+    radius = n / 4
+    return Roi(np.round(x0 + radius * np.cos(t) * 1.01).astype(np.int32),
+               np.round(y0 + radius * np.sin(t)).astype(np.int32), label=label)
+
+def test_roizipbig():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+    zip_path = test_path+"big_OUT.zip"
+
+    # a stitched mosaic of 150000 x 150000 px
+    rois = [None,
+            square(1, 100, 200, 30),           # int16
+            square(2, 40000, 35000, 50),       # wrapped int16, as Fiji reads it
+            square(3, 32750, 32700, 40),       # across 32767
+            square(4, 100000, 120000, 25),     # subpixel block
+            square(5, 60500, 10, 70),          # across 60535
+            circle(6, 70000, 80000, 70000),    # more than 65535 points
+            circle(7, 15000, 16000, 40000)]    # more than 32767 points, int16
+    for num_threads in (1, 3):
+        StopWatch.start(f"write, {num_threads} threads")
+        TinyRoiFile.write_parallel(zip_path, roi_list=rois, num_threads=num_threads).join()
+        StopWatch.stop(f"write, {num_threads} threads")
+        StopWatch.start(f"read, {num_threads} threads")
+        decoded = TinyRoiFile.read_parallel(zip_path, None, num_threads=num_threads)
+        StopWatch.stop(f"read, {num_threads} threads")
+        for roi in rois[1:]:
+            back = decoded[roi.label]
+            assert np.array_equal(back.xpoints, roi.xpoints) and np.array_equal(back.ypoints, roi.ypoints)
+            assert tuple(back.bounds) == tuple(int(b) for b in roi.bounds)
+
+    with zipfile.ZipFile(zip_path) as zipf:
+        entries = {name[:-4]: zipf.read(name) for name in zipf.namelist() if name.endswith(".roi")}
+    header = {name: np.frombuffer(data[:64], dtype=TinyRoiFile.ROI_HEADER_DTYPE)[0] for name, data in entries.items()}
+    # ROIs that fit in 16 bits are written as before: no subpixel block, no version
+    for name in ("L1", "L2", "L3", "L7"):
+        assert header[name]["version"] == 0 and header[name]["options"] == 0
+        assert len(entries[name]) == 64 + 4 * int(header[name]["n"])
+    assert np.frombuffer(entries["L2"], dtype='>u2', count=4, offset=8).tolist() == [35000, 40000, 35050, 40050]
+    # the others get the absolute float32 coordinates
+    for name in ("L4", "L5", "L6"):
+        assert header[name]["version"] >= 222 and header[name]["options"] & TinyRoiFile.SUB_PIXEL_RESOLUTION
+        n = int(header[name]["n"] or header[name]["size"])
+        x = np.frombuffer(entries[name], dtype='>f4', count=n, offset=64 + 4 * n)
+        assert np.array_equal(x, decoded[int(name[1:])].xpoints)
+    assert header["L6"]["n"] == 0 and header["L6"]["size"] == 70000
+
+    # subpixel coordinates (e.g. from Fiji) are rounded to the pixel
+    data = bytearray(entries["L4"])
+    np.frombuffer(data, dtype='>f4', count=4, offset=64 + 16)[:] += np.float32(0.4)
+    with zipfile.ZipFile(zip_path, "w") as zipf:
+        zipf.writestr("L4.roi", bytes(data))
+    assert np.array_equal(TinyRoiFile.read_parallel(zip_path, None, num_threads=1)[4].xpoints, rois[4].xpoints)
+    os.remove(zip_path)
+
+
+if __name__ == "__main__":
+    test_roizipbig()
@@ -0,0 +1,81 @@
+import os
+import sys
+import zipfile
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.RoiStore import RoiArray
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def decode_one(data: bytes):
+    """1 .roi file, the straightforward way"""
+    top, left, bottom, right, n = np.frombuffer(data, dtype='>i2', count=5, offset=8)
+    x = np.frombuffer(data, dtype='>i2', count=n, offset=64).astype(np.int32) + left
+    y = np.frombuffer(data, dtype='>i2', count=n, offset=64 + 2*n).astype(np.int32) + top
+    return x, y, (top, left, bottom, right)
+
+def test_roizipdecode():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"C_stitch"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    for zip_name in ["C_stitch_RoiSet.zip", "C_stitch_rois.zip"]:
+        with zipfile.ZipFile(test_path+zip_name) as zipf:
+            entries = {name[:-4]: zipf.read(name) for name in zipf.namelist() if name.endswith(".roi")}
+        for num_threads in (1, 4):
+            StopWatch.start(f"{zip_name}: read_parallel, {num_threads} threads")
+            rois = TinyRoiFile.read_parallel(test_path+zip_name, label_image, num_threads=num_threads)
+            StopWatch.stop(f"{zip_name}: read_parallel, {num_threads} threads")
+            assert isinstance(rois, RoiArray)
+            # no Roi objects are made while reading
+            assert all(view is None for view in rois.store._views)
+            store = rois.store
+            assert len(store) == len(entries)
+            for name, data in entries.items():
+                x, y, bounds = decode_one(data)
+                label = int(name[1:]) if name.startswith("L") else int(label_image[int(np.mean(y)), int(np.mean(x))])
+                roi = rois[label]
+                assert np.array_equal(roi.xpoints, x) and np.array_equal(roi.ypoints, y)
+                assert roi.bounds == tuple(int(b) for b in bounds)
+
+    # the manager takes the decoded store as it is
+    rois = TinyRoiFile.read_parallel(test_path+"C_stitch_RoiSet.zip", label_image, num_threads=1)
+    rm = TinyRoiManager()
+    rm.add_from_list_unchecked(rois)
+    assert rm.store is rois.store
+    assert all(view is None for view in rm.store._views)
+    # a second manager gets its own copy
+    rm2 = TinyRoiManager()
+    rm2.add_from_list_unchecked(rois)
+    assert rm2.store is not rm.store and np.array_equal(rm2.store.coords, rm.store.coords)
+
+    # a compressed zip and a zip with broken entries
+    with zipfile.ZipFile(test_path+"C_stitch_RoiSet.zip") as zipf:
+        entries = {name: zipf.read(name) for name in zipf.namelist()}
+    zip_path = base_name+"_deflated_OUT.zip"
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
+        for name, data in entries.items():
+            zipf.writestr(name, data)
+    deflated = TinyRoiFile.read_parallel(zip_path, label_image, num_threads=1)
+    assert np.array_equal(deflated.store.coords, rm.store.coords)
+    assert np.array_equal(deflated.store.state, rm.store.state)
+
+    entries["L005.roi"] = b"XXXX" + entries["L005.roi"][4:]
+    entries["L007.roi"] = entries["L007.roi"][:70]
+    with zipfile.ZipFile(zip_path, "w") as zipf:
+        for name, data in entries.items():
+            zipf.writestr(name, data)
+    broken = TinyRoiFile.read_parallel(zip_path, label_image, num_threads=1)
+    assert broken[5] is None and broken[7] is None
+    assert len(broken.store) == len(rm.store) - 2
+    assert len(broken) == len(rois)
+    os.remove(zip_path)
+
+
+if __name__ == "__main__":
+    test_roizipdecode()
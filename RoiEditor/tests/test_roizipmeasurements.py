@@ -0,0 +1,66 @@
+import os
+import sys
+import zipfile
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.StopWatch import StopWatch
+from RoiEditor.Lib.Feret import get_values, feret_index
+
+def test_roizipmeasurements():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"C_stitch"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rm = TinyRoiManager()
+    rm.add_from_list_unchecked(TinyRoiFile.read_parallel(base_name+"_rois.zip", label_image, num_threads=1))
+    StopWatch.start("force feret")
+    rm.force_feret()
+    StopWatch.stop("force feret")
+    ferets, shapes = rm.store.ferets().copy(), rm.store.shapes().copy()
+
+    zip_path = base_name+"_measurements_OUT.zip"
+    TinyRoiFile.write_parallel(zip_path, roi_list=[None] + rm.list_rois(), num_threads=4).join()
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert TinyRoiFile.MEASUREMENTS_NAME in zipf.namelist()
+
+    # reopening: all measurements come from the zip, nothing is recomputed
+    rm2 = TinyRoiManager()
+    rm2.add_from_list_unchecked(TinyRoiFile.read_parallel(zip_path, label_image, num_threads=1))
+    known = rm2.store.HAS_FERET | rm2.store.HAS_SHAPE
+    assert np.all(rm2.store.flags & known == known)
+    assert np.array_equal(rm2.store.ferets(), ferets)
+    assert np.array_equal(rm2.store.shapes(), shapes)
+
+    # a ROI whose coordinates changed (e.g. edited in Fiji) gets its measurements recomputed
+    with zipfile.ZipFile(zip_path) as zipf:
+        entries = {name: zipf.read(name) for name in zipf.namelist()}
+    name = sorted(n for n in entries if n.endswith(".roi"))[3]
+    data = bytearray(entries[name])
+    left = int.from_bytes(data[10:12], "big", signed=True)
+    data[10:12] = (left + 3).to_bytes(2, "big", signed=True)
+    entries[name] = bytes(data)
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as zipf:
+        for entry, content in entries.items():
+            zipf.writestr(entry, content)
+
+    rm3 = TinyRoiManager()
+    rm3.add_from_list_unchecked(TinyRoiFile.read_parallel(zip_path, label_image, num_threads=1))
+    row = rm3.store.row_of(name[:-4])
+    missing = np.flatnonzero(rm3.store.flags & known != known)
+    assert list(missing) == [row]
+    rm3.force_feret()
+    others = np.arange(len(rm3.store)) != row
+    assert np.array_equal(rm3.store.ferets()[others], ferets[others])
+    assert np.array_equal(rm3.store.ferets()[row], get_values(rm3.store.xpoints(row), rm3.store.ypoints(row)))
+    assert rm3.store.ferets()[row, feret_index["FeretX"]] == ferets[row, feret_index["FeretX"]] + 3
+    os.remove(zip_path)
+
+
+if __name__ == "__main__":
+    test_roizipmeasurements()
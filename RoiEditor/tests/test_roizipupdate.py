@@ -0,0 +1,169 @@
+import os
+import sys
+import zipfile
+import zlib
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.Roi import Roi
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def sequential_entries(zip_path):
+    """(name, data) of the local headers one after the other, as Fiji (ZipInputStream) reads the zip"""
+    with open(zip_path, "rb") as f:
+        data = f.read()
+    entries, pos = [], 0
+    while data[pos:pos + 4] == b"PK\x03\x04":
+        crc = int.from_bytes(data[pos + 14:pos + 18], "little")
+        size = int.from_bytes(data[pos + 18:pos + 22], "little")
+        name_length = int.from_bytes(data[pos + 26:pos + 28], "little")
+        extra_length = int.from_bytes(data[pos + 28:pos + 30], "little")
+        start = pos + 30 + name_length + extra_length
+        entry = data[start:start + size]
+        # ZipInputStream checks the CRC of every entry, the dead ones too
+        assert zlib.crc32(entry) == crc
+        entries.append((data[pos + 30:pos + 30 + name_length].decode(), entry))
+        pos = start + size
+    return entries
+
+def sequential_names(zip_path):
+    return [name for name, _ in sequential_entries(zip_path)]
+
+def check_zip(zip_path, rm):
+    sequential = sequential_entries(zip_path)
+    # Fiji only opens a zip as a ROI zip when the first entry is a .roi file
+    assert sequential[0][0].endswith(".roi")
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert zipf.testzip() is None
+        roi_names = sorted(name for name in zipf.namelist() if name.endswith(".roi"))
+        # Fiji sees every ROI once, with the data of the central directory, the dead entries do not end in .roi
+        rois = [(name, data) for name, data in sequential if name.endswith(".roi")]
+        assert sorted(name for name, _ in rois) == roi_names
+        assert all(zipf.read(name) == data for name, data in rois)
+    read = TinyRoiManager()
+    read.add_from_list_unchecked(TinyRoiFile.read_parallel(zip_path, None, num_threads=1))
+    expected = rm.store
+    assert np.array_equal(read.store.label, expected.label)
+    assert np.array_equal(read.store.state, expected.state)
+    assert np.array_equal(read.store.coords, expected.coords)
+    assert all(read.store.tags(row) == expected.tags(row) for row in range(len(expected)))
+
+def test_roizipupdate():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"C_stitch"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rm = TinyRoiManager()
+    rm.add_from_list_unchecked(TinyRoiFile.read_parallel(test_path+"C_stitch_RoiSet.zip", label_image, num_threads=1))
+    rm.force_feret()
+    zip_path = base_name+"_update_OUT.zip"
+    if os.path.exists(zip_path):
+        os.remove(zip_path)
+
+    # no zip yet: a full write
+    TinyRoiFile.update_parallel(zip_path, [None] + rm.list_rois(), num_threads=4).join()
+    check_zip(zip_path, rm)
+    with zipfile.ZipFile(zip_path) as zipf:
+        offsets = {info.filename: info.header_offset for info in zipf.infolist()}
+    size = os.path.getsize(zip_path)
+    with open(zip_path, "rb") as f:
+        # the size of the central directory, in the end record
+        directory_size = int.from_bytes(f.read()[-10:-6], "little")
+
+    # only states and tags change: the .roi entries stay where they are
+    rm.delete(rm.get_all_names()[:10])
+    rm.set_tags(rm.get_all_names()[20], {"checked"})
+    StopWatch.start("update: tags only")
+    TinyRoiFile.update_parallel(zip_path, [None] + rm.list_rois(), num_threads=4).join()
+    StopWatch.stop("update: tags only")
+    check_zip(zip_path, rm)
+    with zipfile.ZipFile(zip_path) as zipf:
+        for info in zipf.infolist():
+            if info.filename.endswith(".roi"):
+                assert info.header_offset == offsets[info.filename]
+        tags_size = zipf.getinfo("tags.json").file_size
+    # appended: tags.json and the new central directory
+    assert os.path.getsize(zip_path) < size + 2 * tags_size + directory_size
+    assert "tags.jso~" in sequential_names(zip_path)
+
+    # a ROI with other points and a ROI that is gone
+    row = rm.store.row_of(rm.get_all_names()[30])
+    roi = rm.store.view(row)
+    moved = Roi(roi.xpoints + 1, roi.ypoints, label=roi.label, state=roi.state, tags=roi.tags)
+    rm.store.replace(row, moved)
+    gone = rm.get_all_names()[40]
+    roi_list = [None] + [roi for roi in rm.list_rois() if roi.name != gone]
+    TinyRoiFile.update_parallel(zip_path, roi_list, num_threads=4).join()
+    with zipfile.ZipFile(zip_path) as zipf:
+        names = zipf.namelist()
+        assert gone + ".roi" not in names
+        assert offsets[moved.name + ".roi"] != zipf.getinfo(moved.name + ".roi").header_offset
+    assert gone + ".ro~" in sequential_names(zip_path)
+    kept = TinyRoiManager()
+    kept.add_from_list_unchecked([roi for roi in roi_list if roi])
+    check_zip(zip_path, kept)
+
+    # the first ROI changes: its entry would be dead space at the start of the zip, the zip is compacted
+    first = kept.store.view(0)
+    kept.store.replace(0, Roi(first.xpoints + 1, first.ypoints, label=first.label, state=first.state, tags=first.tags))
+    TinyRoiFile.update_parallel(zip_path, [None] + kept.list_rois(), num_threads=4).join()
+    assert not any(name.endswith("~") for name in sequential_names(zip_path))
+    check_zip(zip_path, kept)
+
+    # too much dead space: the zip is compacted
+    TinyRoiFile.update_parallel(zip_path, [None] + kept.list_rois(), num_threads=4, max_dead_fraction=0.0).join()
+    assert not any(name.endswith("~") for name in sequential_names(zip_path))
+    check_zip(zip_path, kept)
+
+    # a crash during an update: the zip is read as it was before, whatever part of the update is on disk
+    before = os.path.getsize(zip_path)
+    # moved ROIs: more than the 64 kB in which zip readers look for the end record
+    crashed = TinyRoiManager()
+    # (the first ROI stays: else the zip is written in full)
+    crashed.add_from_list_unchecked([Roi(roi.xpoints + (i > 0), roi.ypoints, label=roi.label, state=roi.state, tags=roi.tags)
+                                     for i, roi in enumerate(kept.list_rois()[:1] + kept.list_rois()[5:])])
+    crashed.delete(crashed.get_all_names()[:50])
+    entries = TinyRoiFile._encode_entries([None] + crashed.list_rois(), num_threads=1)
+    fsync = os.fsync
+    def crash(fd):
+        raise OSError("disk full")
+    os.fsync = crash
+    try:
+        TinyRoiFile._update_zip(zip_path, entries, max_dead_fraction=1.0)
+        assert False, "the update should not finish"
+    except OSError:
+        pass
+    finally:
+        os.fsync = fsync
+    with open(zip_path, "rb") as f:
+        unfinished = f.read()
+    assert len(unfinished) > before + 2**16
+    for cut in [before, before + 1, before + 1000, before + 2**16 + 100, (before + len(unfinished)) // 2, len(unfinished)]:
+        with open(zip_path, "wb") as f:
+            f.write(unfinished[:cut])
+        read = TinyRoiManager()
+        read.add_from_list_unchecked(TinyRoiFile.read_parallel(zip_path, None, num_threads=1))
+        assert np.array_equal(read.store.label, kept.store.label)
+        assert np.array_equal(read.store.state, kept.store.state)
+        assert sorted(name for name in sequential_names(zip_path) if name.endswith(".roi")) == sorted(n + ".roi" for n in kept.get_all_names())
+    # the next save cuts off what is left of the update
+    TinyRoiFile.update_parallel(zip_path, [None] + crashed.list_rois(), num_threads=4, max_dead_fraction=1.0).join()
+    check_zip(zip_path, crashed)
+    TinyRoiFile.update_parallel(zip_path, [None] + kept.list_rois(), num_threads=4, max_dead_fraction=1.0).join()
+    check_zip(zip_path, kept)
+
+    # a full write gives the same ROIs
+    full_path = base_name+"_full_OUT.zip"
+    TinyRoiFile.write_parallel(full_path, [None] + kept.list_rois(), num_threads=4).join()
+    check_zip(full_path, kept)
+    os.remove(full_path)
+    os.remove(zip_path)
+
+
+if __name__ == "__main__":
+    test_roizipupdate()
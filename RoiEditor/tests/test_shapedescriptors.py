@@ -0,0 +1,74 @@
+import os
+import sys
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from RoiEditor.Lib.TinyRoiManager import TinyRoiManager
+from RoiEditor.Lib.TinyRoiFile import TinyRoiFile
+from RoiEditor.Lib.Feret import get_values_and_shape_batch, get_values_batch, shape_index
+from RoiEditor.Lib.RoiMeasurements import RoiMeasurements
+from RoiEditor.Lib.StopWatch import StopWatch
+
+def test_shapedescriptors():
+    base_path = os.path.dirname(__file__)
+    test_path = os.path.join(base_path, "TestData")+'/'
+
+    base_name = test_path+"C_stitch"
+    label_image: np.ndarray= cv2.imread(base_name+"_cp_masks.png", cv2.IMREAD_UNCHANGED)
+    rois = [roi for roi in TinyRoiFile.read_parallel(base_name+"_rois.zip", label_image, num_threads=1) if roi]
+    rm = TinyRoiManager()
+    rm.add_from_list_unchecked(rois)
+    store = rm.store
+
+    StopWatch.start("Feret and shape batch")
+    ferets, shapes = get_values_and_shape_batch(store.coords, store.offsets)
+    StopWatch.stop("Feret and shape batch")
+    # the shape descriptors do not change the Feret values
+    assert np.array_equal(ferets, get_values_batch(store.coords, store.offsets))
+    assert np.array_equal(store.shapes(), shapes)
+
+    # against opencv: arc length, area of the hull, moments
+    for row in range(len(store)):
+        points = np.column_stack((store.xpoints(row), store.ypoints(row)))
+        perimeter, circularity, solidity, convex_area, roundness, major, minor, angle, aspect_ratio = shapes[row]
+        area = store.area(row)
+        assert np.isclose(perimeter, cv2.arcLength(points, True))
+        assert np.isclose(convex_area, cv2.contourArea(cv2.convexHull(points)))
+        assert np.isclose(circularity, min(4*np.pi*area/perimeter**2, 1.0))
+        assert np.isclose(solidity, area/convex_area)
+        M = cv2.moments(points)
+        mu20, mu11, mu02 = M["mu20"]/M["m00"], M["mu11"]/M["m00"], M["mu02"]/M["m00"]
+        common = np.sqrt(((mu20 - mu02)/2)**2 + mu11**2)
+        ratio = np.sqrt(((mu20 + mu02)/2 + common)/((mu20 + mu02)/2 - common))
+        assert np.isclose(aspect_ratio, ratio)
+        # the ellipse has the area of the ROI
+        assert np.isclose(np.pi*major*minor/4, area)
+        assert np.isclose(roundness, 4*area/(np.pi*major**2))
+        assert 0 <= angle < 180
+
+    # an ellipse: a=60, b=20, rotated over 30 degrees
+    t = np.linspace(0, 2*np.pi, 2000, endpoint=False)
+    theta = np.radians(30)
+    x = 500 + 60*np.cos(t)*np.cos(theta) - 20*np.sin(t)*np.sin(theta)
+    y = 400 + 60*np.cos(t)*np.sin(theta) + 20*np.sin(t)*np.cos(theta)
+    coords = np.column_stack((x, y)).round().astype(np.int32)
+    _, shape = get_values_and_shape_batch(coords, np.array([0, len(coords)]))
+    assert abs(shape[0, shape_index["Major"]] - 120) < 1
+    assert abs(shape[0, shape_index["Minor"]] - 40) < 1
+    assert abs(shape[0, shape_index["EllipseAngle"]] - 30) < 1
+    # rounding to pixels makes the outline a bit jagged
+    assert abs(shape[0, shape_index["Solidity"]] - 1) < 0.05
+
+    # the descriptors are measurement columns
+    msmts = RoiMeasurements(rm)
+    for name in shape_index:
+        assert name in msmts.measurement_names
+        assert np.array_equal(msmts.orig["ALL"][name], shapes[:, shape_index[name]])
+        assert msmts.stats["ALL"][name]["N"] == len(store)
+    print(f"mean circularity: {msmts.stats['ALL']['Circularity']['mean']:.3f}, mean solidity: {msmts.stats['ALL']['Solidity']['mean']:.3f}")
+
+
+if __name__ == "__main__":
+    test_shapedescriptors()